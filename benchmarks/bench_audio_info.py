@@ -0,0 +1,82 @@
+"""Reading sample metadata from WAV headers instead of decoding the audio.
+
+Writes a synthetic library of 24-bit stereo loops (sparse files of about
+2 MB, with acid and smpl chunks after the audio data, as Splice loops have)
+and compares fill_audio_info with the stdlib wave module (which stops at the
+data chunk, so it never sees acid/smpl) and with reading the whole file, the
+lower bound for anything that decodes it.
+
+Usage: python benchmarks/bench_audio_info.py [n_files]
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+from splice_cooker.audio_info import fill_audio_info
+from splice_cooker.samples import SampleTable
+
+FRAMES = 44100 * 8
+FILES_PER_DIR = 500
+
+
+def write_loop(path: str, frames: int = FRAMES):
+    data_size = frames * 6
+    fmt = struct.pack("<HHIIHH", 1, 2, 44100, 44100 * 6, 6, 24)
+    acid = struct.pack("<IHHfIHHf", 0x02, 60, 0x8000, 0.0, 16, 4, 4, 120.0)
+    smpl = struct.pack("<9I6I", 0, 0, 22675, 60, 0, 0, 0, 1, 0, 0, 0, 0, frames, 0, 0)
+    trailer = b"acid" + struct.pack("<I", len(acid)) + acid
+    trailer += b"smpl" + struct.pack("<I", len(smpl)) + smpl
+    riff_size = 4 + 8 + len(fmt) + 8 + data_size + len(trailer)
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + struct.pack("<I", riff_size) + b"WAVE")
+        f.write(b"fmt " + struct.pack("<I", len(fmt)) + fmt)
+        f.write(b"data" + struct.pack("<I", data_size))
+        f.seek(data_size, os.SEEK_CUR)  # leave the audio as a hole
+        f.write(trailer)
+
+
+def main(n_files: int = 20_000):
+    with tempfile.TemporaryDirectory() as root:
+        samples = SampleTable()
+        for i in range(n_files):
+            dirname = os.path.join(root, f"pack_{i // FILES_PER_DIR:03d}")
+            os.makedirs(dirname, exist_ok=True)
+            filename = f"loop_{i:06d}.wav"
+            write_loop(os.path.join(dirname, filename))
+            samples.append(dirname, filename)
+        paths = [sample.path for sample in samples]
+        print(f"{n_files} files, {FRAMES * 6 / 1e6:.1f} MB of audio each (sparse)")
+
+        start = time.perf_counter()
+        read = fill_audio_info(samples)
+        elapsed = time.perf_counter() - start
+        print(
+            f"fill_audio_info: {elapsed:6.2f} s ({n_files / elapsed:8.0f} files/s, "
+            f"{read} read, bpm {samples[0].bpm}, loop {samples[0].loop_end})"
+        )
+
+        start = time.perf_counter()
+        for path in paths:
+            with wave.open(path) as w:
+                w.getparams()
+        elapsed = time.perf_counter() - start
+        print(f"wave.open:       {elapsed:6.2f} s ({n_files / elapsed:8.0f} files/s)")
+
+        subset = paths[: max(1, n_files // 100)]
+        start = time.perf_counter()
+        for path in subset:
+            with open(path, "rb") as f:
+                f.read()
+        elapsed = time.perf_counter() - start
+        print(
+            f"read whole file: {elapsed:6.2f} s ({len(subset) / elapsed:8.0f} files/s, "
+            f"on {len(subset)} files)"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,67 @@
+"""Time to first oscilloscope frame: open_audio vs decoding the whole file.
+
+For 24-bit stereo WAV files of growing length, times opening the file and
+gathering one oscilloscope frame (100 samples around the 1 s mark, as
+run_splice_cooker.update does) with open_audio, against reading the whole
+file into a mono float32 array first (what librosa.load(sr=None, mono=True)
+does before the UI can open). The FLAC row exercises DecodedSource.
+
+Usage: python benchmarks/bench_audio_source.py
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+import soundfile
+
+from splice_cooker.audio_source import open_audio
+
+LENGTHS = (10, 60, 600)
+SAMPLERATE = 44100
+
+
+def first_frame(source):
+    indices = int(1.0 * SAMPLERATE) + (np.arange(100) - 50) * 20
+    return source[np.clip(indices, 0, len(source) - 1)]
+
+
+def timed(function, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        for seconds in LENGTHS:
+            frames = seconds * SAMPLERATE
+            noise = np.random.default_rng(0).uniform(-0.5, 0.5, (frames, 2))
+            for extension, subtype in (("wav", "PCM_24"), ("flac", "PCM_24")):
+                if extension == "flac" and seconds > 60:
+                    continue
+                path = os.path.join(root, f"stem_{seconds}.{extension}")
+                soundfile.write(path, noise, SAMPLERATE, subtype=subtype)
+
+                def stream():
+                    with open_audio(path) as source:
+                        first_frame(source)
+
+                def decode():
+                    data, _ = soundfile.read(path, dtype="float32")
+                    first_frame(data.mean(axis=1))
+
+                print(
+                    f"{seconds:4d} s {extension:4s}: open_audio "
+                    f"{timed(stream) * 1e3:8.2f} ms, full decode "
+                    f"{timed(decode) * 1e3:8.2f} ms "
+                    f"({frames * 4 / 1e6:.0f} MB as float32)"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Per-file classification cost: SampleTypeMatcher vs ClassificationEngine.
+
+Builds a synthetic Splice-like library and times classifying every file the
+way get_sample_meta does (one SampleTypeMatcher per sample, three calls)
+against a single ClassificationEngine.classify call.
+
+Usage: python benchmarks/bench_classify.py [n_files]
+"""
+
+import random
+import sys
+import time
+
+from splice_cooker.classify import ClassificationEngine, SampleTypeMatcher
+
+PACK_DIRS = [
+    ["one_shots", "drums"],
+    ["one_shots", "synth_sounds"],
+    ["loops", "melodic_loops"],
+    ["drum_loops"],
+    ["fx"],
+    ["vocals", "spoken"],
+]
+WORDS = [
+    "kick", "snare", "hat", "ride", "crash", "perc", "bass", "keys", "synth",
+    "brass", "vocal", "fx", "loop", "one_shot", "120", "128", "Cmin", "Amaj",
+    "dusty", "warm", "punchy", "01", "02", "03",
+]  # fmt: skip
+
+
+def synthetic_library(n_files: int, seed: int = 0):
+    rng = random.Random(seed)
+    library = []
+    for i in range(n_files):
+        dir_strings = [f"pack_{i // 400:04d}"] + rng.choice(PACK_DIRS)
+        filename_strings = ["PACK"] + rng.sample(WORDS, rng.randint(2, 5))
+        library.append((dir_strings, filename_strings))
+    return library
+
+
+def legacy(library):
+    for dir_strings, filename_strings in library:
+        stm = SampleTypeMatcher()
+        stm.get_sample_type(dir_strings, filename_strings)
+        stm.get_drum_type(dir_strings, filename_strings)
+        stm.get_inst_type(dir_strings, filename_strings)
+
+
+def engine(library):
+    classifier = ClassificationEngine()
+    for dir_strings, filename_strings in library:
+        classifier.classify(dir_strings, filename_strings)
+
+
+def per_file_us(func, library, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(library)
+        best = min(best, time.perf_counter() - start)
+    return best / len(library) * 1e6
+
+
+def main(n_files: int = 100_000):
+    library = synthetic_library(n_files)
+    before = per_file_us(legacy, library)
+    after = per_file_us(engine, library)
+    print(f"{n_files} files")
+    print(f"SampleTypeMatcher:    {before:8.2f} us/file")
+    print(f"ClassificationEngine: {after:8.2f} us/file ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
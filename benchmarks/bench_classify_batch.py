@@ -0,0 +1,62 @@
+"""Scaling of classify_batch over worker counts.
+
+Builds a synthetic SampleTable (one million files by default) and times
+classify_table against classify_batch with 1, 2, 4 and 8 workers.
+
+Usage: python benchmarks/bench_classify_batch.py [n_files]
+"""
+
+import os
+import random
+import sys
+import time
+
+from splice_cooker.classify import classify_batch, classify_table
+from splice_cooker.samples import SampleTable
+
+PACK_DIRS = [
+    "one_shots/drums",
+    "one_shots/synth_sounds",
+    "loops/melodic_loops",
+    "drum_loops",
+    "fx",
+    "vocals/spoken",
+]
+WORDS = [
+    "kick", "snare", "hat", "ride", "crash", "perc", "bass", "keys", "synth",
+    "brass", "vocal", "fx", "loop", "one_shot", "120", "128", "Cmin", "Amaj",
+    "dusty", "warm", "punchy", "01", "02", "03",
+]  # fmt: skip
+
+
+def synthetic_table(n_files: int, seed: int = 0) -> SampleTable:
+    rng = random.Random(seed)
+    samples = SampleTable()
+    for i in range(n_files):
+        origdir = f"/splice/packs/vendor/pack_{i // 400:04d}/{rng.choice(PACK_DIRS)}"
+        filename = "_".join(["PACK"] + rng.sample(WORDS, rng.randint(2, 5)))
+        samples.append(origdir, filename + ".wav")
+    return samples
+
+
+def main(n_files: int = 1_000_000):
+    print(f"{n_files} files, {os.cpu_count()} cpus")
+    samples = synthetic_table(n_files)
+    start = time.perf_counter()
+    classify_table(samples, "/splice", "/dest")
+    serial = time.perf_counter() - start
+    print(f"classify_table:          {serial:6.2f} s")
+
+    for workers in (1, 2, 4, 8):
+        samples = synthetic_table(n_files)
+        start = time.perf_counter()
+        classify_batch(samples, "/splice", "/dest", workers=workers)
+        elapsed = time.perf_counter() - start
+        print(
+            f"classify_batch({workers} workers): {elapsed:6.2f} s "
+            f"({serial / elapsed:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
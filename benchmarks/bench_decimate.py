@@ -0,0 +1,67 @@
+"""Per-frame cost of oscilloscope bars at growing zoom levels.
+
+For a ten minute mono float32 source and 1000 bars, times one frame of
+Decimator.bars against reducing every sample of the window with a reshape
+(the direct min/max/RMS) and against the strided single-sample picks
+run_splice_cooker.update used to make. Also times building the pyramid.
+
+Usage: python benchmarks/bench_decimate.py [n_bars]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from splice_cooker.decimate import Decimator
+
+SAMPLERATE = 44100
+WINDOWS = (0.1, 1, 10, 60, 600)  # seconds
+
+
+def timed(function, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def reshape_bars(samples, start, stop, n_bars):
+    window = samples[start : start + (stop - start) // n_bars * n_bars]
+    window = window.reshape(n_bars, -1)
+    return window.min(axis=1), window.max(axis=1), np.sqrt((window**2).mean(axis=1))
+
+
+def strided_picks(samples, start, stop, n_bars):
+    indices = start + np.arange(n_bars) * ((stop - start) // n_bars)
+    return samples[np.clip(indices, 0, len(samples) - 1)]
+
+
+def main(n_bars: int = 1000):
+    samples = np.random.default_rng(0).uniform(-1, 1, 600 * SAMPLERATE)
+    samples = samples.astype(np.float32)
+    decimator = Decimator(samples)
+    start = time.perf_counter()
+    decimator.levels
+    print(f"pyramid build: {(time.perf_counter() - start) * 1e3:.0f} ms (once)")
+
+    for seconds in WINDOWS:
+        stop = int(seconds * SAMPLERATE)
+        times = [
+            timed(lambda: reduce(*args, 0, stop, n_bars))
+            for reduce, *args in (
+                (decimator.bars,),
+                (reshape_bars, samples),
+                (strided_picks, samples),
+            )
+        ]
+        print(
+            f"{seconds:5g} s window: decimator {times[0]:7.3f} ms, "
+            f"reshape {times[1]:8.3f} ms, strided picks {times[2]:6.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,89 @@
+"""CPU used by the UI loop: redrawing at 60 fps vs FrameScheduler.
+
+Runs the pyglet event loop for a few seconds per mode with an OScope whose
+update writes new amplitudes each frame, and reports frames drawn and the
+process CPU time. "fixed" is the old schedule_interval(update, 1 / 60) with
+pyglet.app.run(); "idle" and "playing" use FrameScheduler with the player
+stopped and playing. Runs without a display with PYGLET_HEADLESS=true.
+
+Usage: python benchmarks/bench_frames.py [seconds]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pyglet
+
+from splice_cooker.components import OScope
+from splice_cooker.frames import FrameScheduler, FrameStats
+
+THEME = {"fg": (0, 255, 0)}
+
+
+class Player:
+    def __init__(self, playing):
+        self.playing = playing
+
+
+def run(window, mode, seconds):
+    batch = pyglet.graphics.Batch()
+    oscope = OScope(window, batch, THEME, n_rectangles=1000)
+    rng = np.random.default_rng(0)
+    stats = FrameStats()
+
+    def update(dt):
+        oscope.set_amplitudes(rng.uniform(-1, 1, oscope.n_rectangles))
+
+    def on_draw():
+        with stats.time("batch"):
+            window.clear()
+            batch.draw()
+
+    window.push_handlers(on_draw=on_draw)
+
+    if mode == "fixed":
+        counter = FrameStats()
+
+        def counted(dt):
+            update(dt)
+            counter.frames += 1
+
+        pyglet.clock.schedule_interval(counted, 1 / 60)
+        interval = 1 / 60
+    else:
+        scheduler = FrameScheduler(
+            window, Player(mode == "playing"), update, stats=stats
+        )
+        interval = None
+
+    pyglet.clock.schedule_once(lambda dt: pyglet.app.exit(), seconds)
+    start = time.process_time()
+    pyglet.app.run(interval)
+    cpu = time.process_time() - start
+
+    if mode == "fixed":
+        pyglet.clock.unschedule(counted)
+        frames = counter.frames
+    else:
+        scheduler.stop()
+        frames = stats.frames
+    window.remove_handlers(on_draw=on_draw)
+    oscope.delete()
+    return frames, cpu
+
+
+def main(seconds: float = 3.0):
+    window = pyglet.window.Window(960, 540)
+    # Last: pyglet.app.run(1 / 60) leaves its redraw scheduled after exiting.
+    for mode in ("idle", "playing", "fixed"):
+        frames, cpu = run(window, mode, seconds)
+        print(
+            f"{mode:8s}: {frames:4d} frames in {seconds:g} s, "
+            f"{cpu / seconds * 100:5.1f}% of a core"
+        )
+    window.close()
+
+
+if __name__ == "__main__":
+    main(*(float(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,79 @@
+"""Per-record cost of hash_utils.get_hash: JSON (version 0) vs binary (version 2).
+
+Hashes sample-record-sized dataclasses, one with only scalar fields and one
+that also carries a tuple of tags, with both encodings, then rehashes them
+through get_hashes with the memo enabled.
+
+Usage: python benchmarks/bench_hash_utils.py [n_records]
+"""
+
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from splice_cooker.hash_utils import _JSON_VERSION, _VERSION, get_hash, get_hashes
+
+
+@dataclass(frozen=True)
+class SampleRecord:
+    filename: str
+    origdir: str
+    newdir: Optional[str]
+    sampletype: str
+    isdrum: bool
+    drumtype: Optional[str] = None
+    insttype: Optional[str] = None
+    key: Optional[str] = None
+    bpm: Optional[int] = None
+    status: str = "not_moved"
+    _hash_exclude_ = ("status",)
+
+
+@dataclass(frozen=True)
+class TaggedRecord(SampleRecord):
+    tags: Tuple[str, ...] = ()
+
+
+def records(n_records: int, cls=SampleRecord, **extra):
+    return [
+        cls(
+            filename=f"PACK_kick_dusty_{i:05d}.wav",
+            origdir=f"/splice/packs/vendor/pack_{i // 400:04d}/one_shots/drums",
+            newdir="/dest/one_shots/drums/kick",
+            sampletype="one_shot",
+            isdrum=True,
+            drumtype="kick",
+            bpm=120 if i % 2 else None,
+            **extra,
+        )
+        for i in range(n_records)
+    ]
+
+
+def main(n_records: int = 100_000):
+    for label, batch in [
+        ("scalar fields", records(n_records)),
+        ("with tags", records(n_records, TaggedRecord, tags=("dusty", "warm"))),
+    ]:
+        timings = {}
+        for version in (_JSON_VERSION, _VERSION):
+            start = time.perf_counter()
+            for record in batch:
+                get_hash(record, version)
+            timings[version] = (time.perf_counter() - start) / n_records * 1e6
+        print(
+            f"{label:14} json {timings[_JSON_VERSION]:6.2f} us/record, "
+            f"binary {timings[_VERSION]:6.2f} us/record "
+            f"({timings[_JSON_VERSION] / timings[_VERSION]:.1f}x)"
+        )
+
+        get_hashes(batch, workers=1, memo=True)
+        start = time.perf_counter()
+        get_hashes(batch, workers=1, memo=True)
+        memo = (time.perf_counter() - start) / n_records * 1e6
+        print(f"{label:14} memoized rehash {memo:6.2f} us/record")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
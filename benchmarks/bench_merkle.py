@@ -0,0 +1,53 @@
+"""Diffing two Merkle snapshots of a large library where one pack changed.
+
+Builds a synthetic SampleTable (400,000 files in 1,000 packs by default),
+reclassifies every file of one pack, and compares the cost of MerkleTree.diff
+with a full record-by-record comparison of the two snapshots.
+
+Usage: python benchmarks/bench_merkle.py [n_files]
+"""
+
+import os
+import sys
+import time
+
+from splice_cooker.merkle import MerkleTree, record_hashes
+from splice_cooker.samples import SampleTable
+
+FILES_PER_PACK = 400
+SUBDIRS = ("one_shots/drums", "one_shots/synth_sounds", "loops/melodic_loops", "fx")
+
+
+def synthetic_table(n_files: int, changed_pack: int = None) -> SampleTable:
+    samples = SampleTable()
+    for i in range(n_files):
+        pack = i // FILES_PER_PACK
+        origdir = f"/splice/packs/pack_{pack:04d}/{SUBDIRS[i % len(SUBDIRS)]}"
+        sample = samples.append(origdir, f"sample_{i:07d}.wav")
+        sample.sampletype = "Melodic Loop" if pack == changed_pack else "One Shot"
+    return samples
+
+
+def main(n_files: int = 400_000):
+    print(f"{n_files} files, {os.cpu_count()} cpus")
+    old_samples = synthetic_table(n_files)
+    new_samples = synthetic_table(n_files, changed_pack=n_files // FILES_PER_PACK // 2)
+
+    start = time.perf_counter()
+    old = MerkleTree.build(old_samples, "/splice/packs")
+    print(f"build:     {time.perf_counter() - start:8.3f} s")
+    new = MerkleTree.build(new_samples, "/splice/packs")
+
+    start = time.perf_counter()
+    diff = old.diff(new)
+    print(f"diff:      {(time.perf_counter() - start) * 1e3:8.3f} ms ({diff})")
+
+    start = time.perf_counter()
+    changed = sum(
+        a != b for a, b in zip(record_hashes(old_samples), record_hashes(new_samples))
+    )
+    print(f"full scan: {time.perf_counter() - start:8.3f} s ({changed} changed)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
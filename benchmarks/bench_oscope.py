@@ -0,0 +1,89 @@
+"""Per-frame Python time of the OScope: one vertex list vs a Rectangle per bar.
+
+For growing bar counts, times updating every bar from one frame of audio
+values the way run_splice_cooker.update used to (height, y and opacity set
+on a shapes.Rectangle per bar) against OScope.set_amplitudes, which writes
+all amplitudes into one vertex list. Each timed frame includes batch.draw().
+ShaderScope rows time uploading growing sample windows as a texture, with
+the trace drawn in the fragment shader.
+Runs without a display with PYGLET_HEADLESS=true.
+
+Usage: python benchmarks/bench_oscope.py [frames]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pyglet
+from pyglet import shapes
+
+from splice_cooker.components import OScope, ShaderScope
+
+BAR_COUNTS = (25, 250, 1000, 4000)
+SAMPLE_COUNTS = (2048, 8192, 16384)  # GL_MAX_TEXTURE_SIZE on llvmpipe
+THEME = {"fg": (0, 255, 0)}
+
+
+def rectangles_frame(rectangles, values):
+    for rect, amplitude in zip(rectangles, values):
+        scaled_height = abs(amplitude) * 300
+        rect.height = max(scaled_height, 2)
+        rect.y = 270 - (scaled_height / 2)
+        rect.opacity = int(100 + (abs(amplitude) * 155))
+
+
+def timed(update, batch, frames, n_bars):
+    rng = np.random.default_rng(0)
+    frames_values = rng.uniform(-1, 1, (frames, n_bars)).astype(np.float32)
+    update_time = draw_time = 0.0
+    for values in frames_values:
+        start = time.perf_counter()
+        update(values)
+        middle = time.perf_counter()
+        batch.draw()
+        pyglet.gl.glFinish()
+        update_time += middle - start
+        draw_time += time.perf_counter() - middle
+    return update_time / frames * 1e3, draw_time / frames * 1e3
+
+
+def main(frames: int = 120):
+    window = pyglet.window.Window(960, 540, visible=False)
+    for n_bars in BAR_COUNTS:
+        batch = pyglet.graphics.Batch()
+        oscope = OScope(window, batch, THEME, n_rectangles=n_bars)
+        left = oscope.x + np.arange(n_bars) * (oscope.rectangle_width + oscope.gap)
+        bars_update, bars_draw = timed(oscope.set_amplitudes, batch, frames, n_bars)
+        oscope.delete()
+
+        batch = pyglet.graphics.Batch()
+        rectangles = [
+            shapes.Rectangle(
+                x, 270, oscope.rectangle_width, 2, color=THEME["fg"], batch=batch
+            )
+            for x in left
+        ]
+        rects = lambda values: rectangles_frame(rectangles, values)  # noqa: E731
+        rects_update, rects_draw = timed(rects, batch, frames, n_bars)
+
+        print(
+            f"{n_bars:5d} bars: vertex list {bars_update:7.3f} ms "
+            f"(+{bars_draw:6.3f} ms draw), rectangles {rects_update:7.3f} ms "
+            f"(+{rects_draw:6.3f} ms draw)"
+        )
+
+    for n_samples in SAMPLE_COUNTS:
+        batch = pyglet.graphics.Batch()
+        scope = ShaderScope(window, batch, THEME, n_samples=n_samples)
+        upload, draw = timed(scope.set_samples, batch, frames, n_samples)
+        scope.delete()
+        print(
+            f"{n_samples:5d} samples: shader trace {upload:7.3f} ms "
+            f"(+{draw:6.3f} ms draw)"
+        )
+    window.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
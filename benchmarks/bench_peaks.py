@@ -0,0 +1,90 @@
+"""Waveform thumbnails from a PeakCache vs decoding every sample.
+
+Writes a synthetic library of 16-bit stereo loops, builds their peak
+records with PeakBuilder, and then times drawing a 100-column thumbnail for
+every file from the cache against reading and reducing the audio of each
+file with the stdlib wave module (a lower bound for librosa.load).
+
+Usage: python benchmarks/bench_peaks.py [n_files] [seconds]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import wave
+from array import array
+
+from splice_cooker.peaks import PeakBuilder, PeakCache
+from splice_cooker.samples import SampleTable
+
+WIDTH = 100
+
+
+def write_loop(path: str, seconds: float):
+    frames = int(44100 * seconds)
+    level = random.randint(1000, 32000)
+    samples = array("h", (random.randint(-level, level) for _ in range(2048)))
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(44100)
+        data = samples.tobytes()
+        w.writeframes(data * (frames * 4 // len(data)))
+
+
+def decode_thumbnail(path: str):
+    with wave.open(path) as w:
+        samples = array("h", w.readframes(w.getnframes()))
+    step = max(len(samples) // WIDTH, 1)
+    return [
+        (min(samples[i : i + step]), max(samples[i : i + step]))
+        for i in range(0, step * WIDTH, step)
+    ]
+
+
+def main(n_files: int = 2000, seconds: float = 4.0):
+    with tempfile.TemporaryDirectory() as root:
+        samples = SampleTable()
+        for i in range(n_files):
+            filename = f"loop_{i:05d}.wav"
+            write_loop(os.path.join(root, filename), seconds)
+            samples.append(root, filename)
+        digests = [i.to_bytes(16, "big") for i in range(n_files)]
+        mb = n_files * seconds * 44100 * 4 / 1e6
+        print(f"{n_files} files, {mb:.0f} MB of audio, {os.cpu_count()} cpus")
+
+        with PeakCache(os.path.join(root, "peaks.bin")) as cache:
+            start = time.perf_counter()
+            PeakBuilder(cache).build_samples(samples, digests)
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(cache.path)
+            print(
+                f"build:               {elapsed:7.2f} s "
+                f"({n_files / elapsed:6.0f} files/s, {size / n_files:.0f} B/file)"
+            )
+
+        start = time.perf_counter()
+        with PeakCache(os.path.join(root, "peaks.bin")) as cache:
+            for digest in digests:
+                cache.get(digest).thumbnail(WIDTH)
+        elapsed = time.perf_counter() - start
+        print(
+            f"thumbnails (cache):  {elapsed:7.3f} s "
+            f"({n_files / elapsed:6.0f} files/s, including opening the cache)"
+        )
+
+        subset = [sample.path for sample in samples][: max(1, n_files // 20)]
+        start = time.perf_counter()
+        for path in subset:
+            decode_thumbnail(path)
+        elapsed = time.perf_counter() - start
+        print(
+            f"thumbnails (decode): {elapsed:7.3f} s "
+            f"({len(subset) / elapsed:6.0f} files/s, on {len(subset)} files)"
+        )
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if "." in arg else int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,83 @@
+"""Stage-at-a-time vs streaming Pipeline, end to end.
+
+Creates a synthetic library on disk (2,000 files of 256 KiB by default) and
+copies it twice: once running scan, classify, hash and copy one after the
+other over the whole library, once through Pipeline. Prints wall time and
+the time each stage was busy.
+
+The page cache is warm after the first run; drop it between runs
+(echo 3 > /proc/sys/vm/drop_caches) for a cold-library comparison.
+
+Usage: python benchmarks/bench_pipeline.py [n_files] [file_kib]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from splice_cooker.classify import classify_batch
+from splice_cooker.content_hash import ContentHasher
+from splice_cooker.copier import CopyExecutor
+from splice_cooker.crawler import LibraryCrawler
+from splice_cooker.pipeline import Pipeline
+from splice_cooker.samples import SampleTable
+
+PACK_DIRS = ["one_shots/drums", "loops/melodic_loops", "drum_loops", "fx"]
+WORDS = ["kick", "snare", "hat", "bass", "keys", "synth", "fx", "loop"]
+
+
+def make_library(root: str, n_files: int, file_kib: int):
+    data = os.urandom(file_kib * 1024)
+    for i in range(n_files):
+        origdir = os.path.join(root, f"pack_{i // 200:03d}", PACK_DIRS[i % 4])
+        os.makedirs(origdir, exist_ok=True)
+        filename = f"PACK_{WORDS[i % len(WORDS)]}_{i:06d}.wav"
+        with open(os.path.join(origdir, filename), "wb") as f:
+            f.write(data[: len(data) - (i % 1024)])
+
+
+def staged(root: str, dest: str):
+    busy = {}
+    start = time.perf_counter()
+    sample_list = SampleTable()
+    sample_list.extend(LibraryCrawler(root).crawl())
+    busy["scan"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    classify_batch(sample_list, root, dest)
+    busy["classify"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ContentHasher().hash_samples(sample_list)
+    busy["hash"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for newdir in sample_list.newdirs.strings[1:]:
+        os.makedirs(newdir, exist_ok=True)
+    CopyExecutor().copy_samples(sample_list)
+    busy["copy"] = time.perf_counter() - start
+    return busy
+
+
+def main(n_files: int = 2000, file_kib: int = 256):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "splice")
+        make_library(root, n_files, file_kib)
+        print(f"{n_files} files of {file_kib} KiB, {os.cpu_count()} cpus")
+
+        start = time.perf_counter()
+        busy = staged(root, os.path.join(tmp, "staged"))
+        wall = time.perf_counter() - start
+        stages = ", ".join(f"{name} {t:.2f} s" for name, t in busy.items())
+        print(f"staged:   {wall:6.2f} s ({stages})")
+        shutil.rmtree(os.path.join(tmp, "staged"))
+
+        stats = Pipeline(root, os.path.join(tmp, "pipeline")).run()
+        stages = ", ".join(f"{name} {t:.2f} s" for name, t in stats.busy.items())
+        print(f"pipeline: {stats.elapsed:6.2f} s ({stages} busy)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,85 @@
+"""Frame time of the FBO and dither passes at each render scale.
+
+Draws a 1920x1080 window's worth of UI (a full-window box and a 1000-bar
+OScope) into AppContext's offscreen framebuffer and presents it through the
+dither pass at render scales 1, 1/2 and 1/4, waiting for the GPU each
+frame. The dither shader is also timed on its own: on a software renderer
+such as llvmpipe, writing the full-resolution window at all (even a clear)
+costs as much as the whole dither pass at scale 1, while on a GPU the
+nearest-neighbour blit is close to free.
+Runs without a display with PYGLET_HEADLESS=true.
+
+Usage: python benchmarks/bench_render_scale.py [frames]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pyglet
+from pyglet import shapes
+from pyglet.gl import glFinish, glViewport
+
+from splice_cooker.app_context import AppContext
+from splice_cooker.components import OScope
+from splice_cooker.user import User
+
+SCALES = (1.0, 0.5, 0.25)
+THEME = {"fg": (0, 255, 0)}
+
+
+def timed(function, frames):
+    glFinish()
+    start = time.perf_counter()
+    for _ in range(frames):
+        function()
+        glFinish()
+    return (time.perf_counter() - start) / frames * 1e3
+
+
+def dither_pass(ctx):
+    if ctx.dither_fbo is None:  # scale 1 dithers straight onto the window
+        ctx.main_window.clear()
+        ctx.screen_sprite.draw()
+        return
+    ctx.dither_fbo.bind()
+    glViewport(0, 0, *ctx.fbo_size)
+    ctx.screen_sprite.draw()
+    ctx.dither_fbo.unbind()
+
+
+def main(frames: int = 60):
+    window = pyglet.window.Window(1920, 1080)
+    batch = pyglet.graphics.Batch()
+    box = shapes.Box(0, 0, 1920, 1080, thickness=24.0, color=(90, 90, 90), batch=batch)
+    oscope = OScope(window, batch, THEME, n_rectangles=1000)
+    oscope.set_amplitudes(np.random.default_rng(0).uniform(-1, 1, 1000))
+
+    # Only the framebuffer is needed: skip loading resources and audio.
+    ctx = AppContext.__new__(AppContext)
+    ctx.main_window = window
+    ctx.user = User("bench", {})
+    for scale in SCALES:
+        ctx.init_framebuffer(scale)
+
+        def scene():
+            ctx.begin_scene()
+            window.clear()
+            batch.draw()
+            ctx.end_scene()
+
+        times = [
+            timed(f, frames) for f in (scene, ctx.present, lambda: dither_pass(ctx))
+        ]
+        print(
+            f"scale {scale:4g}: FBO {ctx.fbo_size[0]:4d}x{ctx.fbo_size[1]:<4d} "
+            f"scene {times[0]:6.2f} ms, present {times[1]:6.2f} ms "
+            f"(dither shader alone {times[2]:6.2f} ms)"
+        )
+    box.delete()
+    oscope.delete()
+    window.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
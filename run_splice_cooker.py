@@ -17,11 +17,31 @@ import struct
 
 # from collections import Counter
 from splice_cooker.app_context import AppContext
-from splice_cooker.components import ControlStrip, OScope
+from splice_cooker.audio_info import fill_audio_info
+from splice_cooker.catalog import Rescan, SampleCatalog
+from splice_cooker.classify import (
+    DirectoryCache,
+    apply_sample_meta,
+    apply_tempo_key,
+    classifier,
+    classify_batch,
+)
+from splice_cooker.components import ControlStrip, OScope, ShaderScope
+from splice_cooker.content_hash import ContentHasher, HashCache
+from splice_cooker.copier import CopyExecutor
+from splice_cooker.crawler import LibraryCrawler
 from splice_cooker.icons import create_icons, load_icons
+from splice_cooker.journal import Journal, plan_digest
+from splice_cooker.merkle import MerkleTree
+from splice_cooker.peaks import PeakBuilder, PeakCache
+from splice_cooker.pipeline import Pipeline
+from splice_cooker.plan import PlanExecutor, make_plan, read_plan, write_plan
+from splice_cooker.samples import SampleTable
 from splice_cooker.utils import timeit
 from splice_cooker.user import User
+from splice_cooker.tempo_key import TempoKeyAnalyzer, TempoKeyCache
 from splice_cooker.theme import theme
+from splice_cooker.watch import LibraryWatcher, sync_changes
 from splice_cooker.file_dialog import FileOpenDialog, FileSaveDialog
 
 # from hash_utils import _
@@ -56,11 +76,32 @@ def parse_arguments():
     #     default="category_first",
     # )
     parser.add_argument("-c", "--copy_only", default=True, action="store_true")
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="Keep running and sync new downloads from the Splice directory",
+    )
+    parser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help="Scan, classify, hash and copy concurrently (fastest on a cold library)",
+    )
+    parser.add_argument(
+        "-g",
+        "--gpu_scope",
+        action="store_true",
+        help="Draw the oscilloscope in a shader from a texture of samples",
+    )
 
     arguments = parser.parse_args()
     user_config = arguments.user_config
     copy_only = arguments.copy_only
-    return user_config, copy_only
+    watch = arguments.watch
+    stream = arguments.stream
+    gpu_scope = arguments.gpu_scope
+    return user_config, copy_only, watch, stream, gpu_scope
 
 
 # def load_user_config():
@@ -73,7 +114,20 @@ def create_dirs(
     drum_types: list,
     inst_types: list,
     sample_hierarchy: str,
+    sample_list: SampleTable = None,
 ):
+    """Create the destination tree under DEST_DIR.
+
+    With SAMPLE_LIST, only the directories its samples go to are created;
+    otherwise every directory SAMPLE_HIERARCHY can use is.
+
+    """
+    if sample_list is not None:
+        # Planned destinations are interned, so this is one makedirs per
+        # distinct newdir rather than per sample.
+        for newdir in sample_list.newdirs.strings[1:]:
+            os.makedirs(newdir, exist_ok=True)
+        return 0
 
     if sample_hierarchy == "category_first":
         for sample_type in sample_types:
@@ -136,30 +190,17 @@ def find_samples(splice_root: str, ignore: list):
     """Looks for sample files in directory SPLICE_ROOT.
 
     Ignores files that match IGNORE and Ableton analysis files.
-    Adds sample files to and return sample_list.
+    Adds sample files to and return sample_list, a SampleTable.
 
     """
-    sample_list = []
-    for dirname, _, filenames in os.walk(splice_root):
-        for filename in filenames:
-            if filename not in ignore and not filename.endswith(".asd"):
-                file_dict = {
-                    "filename": filename,
-                    "origdir": dirname,
-                    "newdir": None,
-                    "sampletype": None,
-                    "isdrum": None,
-                    "drumtype": None,
-                    "isinst": None,
-                    "insttype": None,
-                    "key": None,
-                    "bpm": None,
-                    "status": "not_moved",
-                    "sample_match_failed": False,
-                }
-                sample_list.append(file_dict)
-
-    print(f"{len(sample_list)} samples detected.")
+    crawler = LibraryCrawler(splice_root, ignore)
+    sample_list = SampleTable()
+    sample_list.extend(crawler.crawl())
+
+    print(
+        f"{len(sample_list)} samples detected "
+        f"({crawler.files_per_sec:.0f} files/sec)."
+    )
 
     return sample_list
 
@@ -170,166 +211,96 @@ def find_samples(splice_root: str, ignore: list):
 #             return "One Shot"
 
 
-class Sample:
-    """Class to facilitate metadata storage for"""
-
-
-class SampleTypeMatcher:
-    """Class to handle learning sample types from file paths and names."""
-
-    def __init__(self):
-        self.sample_type = None
-        self.drum_type = None
-        self.inst_type = None
-
-    def get_sample_type(self, dir_strings: list, filename_strings: list):
-        default = "Unknown"
-        self.sample_type = default
-        for string in dir_strings:
-            if re.search(
-                "one|shot|one_shot|one_shots|one-shot|one-shots|808|percussion|fx|samples|synth_sounds|drum_hits}",
-                string.lower(),
-            ):
-                self.sample_type = "One Shot"
-            elif re.search("melodic_Loops|loops", string.lower()):
-                self.sample_type = "Melodic Loop"
-            elif re.search("percussion_loops|cymbals_loops", string.lower()):
-                self.sample_type = "Perc Loop"
-            elif re.search("spoken", string.lower()):
-                self.sample_type = "Spoken Loop"
-            elif re.search("drum_loops|breaks|break_loops", string.lower()):
-                self.sample_type = "Break"
-
-        for string in filename_strings:
-            if self.sample_type == default:
-                if re.search(
-                    "one_shot|one_shots|one-shot|one-shots|808|percussion|fx|samples|synth_sounds}",
-                    string.lower(),
-                ):
-                    self.sample_type = "One Shot"
-                elif re.search("melodic_Loops|loops", string.lower()):
-                    self.sample_type = "Melodic Loop"
-                elif re.search("percussion_loops|cymbals_loops", string.lower()):
-                    self.sample_type = "Percussion Loop"
-                elif re.search("spoken", string.lower()):
-                    self.sample_type = "Spoken Loop"
-                elif re.search("drum_loops|breaks|break_loops", string.lower()):
-                    self.sample_type = "Break"
-
-        return self.sample_type
-
-    def get_drum_type(self, dir_strings: list, filename_strings: list):
-        default = "Unknown"
-        self.drum_type = default
-        for string in filename_strings:
-            if re.search("kick", string):
-                self.drum_type = "Kick"
-            elif re.search("snare", string.lower()):
-                self.drum_type = "Snare"
-            elif re.search("cymbal", string.lower()):
-                self.drum_type = "Cymbal"
-            elif re.search("hat", string.lower()):
-                self.drum_type = "Hat"
-            elif re.search("ride", string.lower()):
-                self.drum_type = "Ride"
-            elif re.search("crash", string.lower()):
-                self.drum_type = "Crash"
-            elif re.search("perc", string.lower()):
-                self.drum_type = "Perc"
-        return self.drum_type
-
-    def get_inst_type(self, dir_strings: list, filename_strings: list):
-        default = "Unknown"
-        self.inst_type = default
-        for string in filename_strings:
-            if re.search("bass|subbass", string.lower()):
-                self.inst_type = "Bass"
-            if re.search("keys|piano", string.lower()):
-                self.inst_type = "Keys"
-            if re.search("synth", string.lower()):
-                self.inst_type = "Synth"
-            if re.search("brass", string.lower()):
-                self.inst_type = "Brass"
-            if re.search("woodwind", string.lower()):
-                self.inst_type = "Woodwind"
-            if re.search("strings", string.lower()):
-                self.inst_type = "Strings"
-            if re.search("fx", string.lower()):
-                self.inst_type = "FX"
-            if re.search("vocal", string.lower()):
-                self.inst_type = "Vox"
-        return self.inst_type
-
-    # def case_one_shots(self):
-    #     return "One Shot"
-
-    # def case_melodic_loop(self):
-    #     return "Melodic Loop"
-
-    # def case_break(self):
-    #     return "Break"
-
-
 # @timeit
-def get_sample_meta(splice_root: str, dest_dir: str, sample_list: list):
-    sample_types = []
-    drum_types = []
-    inst_types = []
-    for idx, sample in enumerate(sample_list):
-        filename = sample["filename"]
-        origdir_strings = sample["origdir"].partition(splice_root)[2].split("/")[3:]
-        filename_strings = sample["filename"].partition(".")[0].split("_")
+def get_sample_meta(
+    splice_root: str, dest_dir: str, sample_list: SampleTable, workers: int = 1
+):
+    if workers > 1:
+        # Batch mode: no per-sample output, unmatched samples are only flagged.
+        classify_batch(sample_list, splice_root, dest_dir, workers)
+        return
+
+    dir_cache = DirectoryCache(splice_root)
+    for sample in sample_list:
+        filename = sample.filename
+        origdir_strings, dir_sample = dir_cache.lookup(sample.origdir)
+        filename_strings = filename.partition(".")[0].split("_")
         print(f"Filename: {filename}")
         print(f"Original dir: {origdir_strings}")
         print(f"Filename strings: {filename_strings}")
 
-        stm = SampleTypeMatcher()
+        sample_type, drum_type, inst_type = classifier.classify(
+            origdir_strings, filename_strings, dir_sample
+        )
+        apply_sample_meta(sample, dest_dir, sample_type, drum_type, inst_type)
+        apply_tempo_key(sample, filename, sample_type, drum_type)
 
-        sample_type = stm.get_sample_type(origdir_strings, filename_strings)
-        drum_type = stm.get_drum_type(origdir_strings, filename_strings)
-        inst_type = stm.get_inst_type(origdir_strings, filename_strings)
+        if sample_type == "Unknown":
+            raise Exception("Sample match failed.")
 
-        if sample_type != "Unknown":
-            print(f"Sample type: {sample_type}")
-            if sample_type == "Break" or sample_type == "Melodic Loop":
-                sample_list[idx]["newdir"] = os.path.join(dest_dir, f"{sample_type}/")
-                sample_list[idx]["sampletype"] = sample_type
+        print(f"Sample type: {sample_type}")
+        if sample.isdrum:
+            print(f"Drum type: {drum_type}")
+        if sample.isinst:
+            print(f"Instrument type: {inst_type}")
+        if sample.bpm or sample.key:
+            print(f"BPM: {sample.bpm}, key: {sample.key}")
+        print("============")
 
-            elif sample_type == "One Shot":
-                if drum_type != "Unknown":
-                    print(f"Drum type: {drum_type}")
-                    sample_list[idx]["newdir"] = os.path.join(
-                        dest_dir, f"{sample_type}/{drum_type}s/"
-                    )
-                    sample_list[idx]["sampletype"] = sample_type
-                    sample_list[idx]["isdrum"] = True
-                    sample_list[idx]["drumtype"] = drum_type
-
-                if inst_type != "Unknown":
-                    print(f"Instrument type: {inst_type}")
-                    sample_list[idx]["newdir"] = os.path.join(
-                        dest_dir, f"{sample_type}/{inst_type}/"
-                    )
-                    sample_list[idx]["isinst"] = True
-                    sample_list[idx]["insttype"] = inst_type
+    print(dir_cache.report())
+    # print(sample_list[0:20])
 
-                elif (drum_type == "Unknown") and (inst_type == "Unknown"):
-                    sample_list[idx]["sample_match_failed"] = True
 
-            elif (sample_type == "Spoken Loop") or (sample_type == "Percussion Loop"):
-                sample_list[idx]["newdir"] = os.path.join(dest_dir, f"{sample_type}/")
+def update_catalog(splice_root: str, dest_dir: str, ignore: list, catalog_path: str):
+    """Rescan SPLICE_ROOT against the catalog at CATALOG_PATH.
 
-        else:
-            sample_list[idx]["sample_match_failed"] = True
-            raise Exception("Sample match failed.")
+    Only new or changed samples are classified and have their headers read.
+    Returns every cataloged sample record.
 
-        print("============")
+    """
+    with SampleCatalog(catalog_path) as catalog:
+        rescan = catalog.rescan(LibraryCrawler(splice_root, ignore))
+        print(
+            f"{rescan.new} new, {rescan.changed} changed, "
+            f"{len(rescan.removed)} removed, {rescan.unchanged} unchanged samples."
+        )
+        get_sample_meta(splice_root, dest_dir, rescan.samples)
+        fill_audio_info(rescan.samples)
+        catalog.store(rescan)
+        return catalog.load()
+
+
+def catalog_batches(catalog: SampleCatalog, cache: HashCache, algorithm: str):
+    """Return a Pipeline on_batch that stores every streamed chunk in CATALOG
+    and its digests in CACHE, so the next run starts from them.
 
-    # print(sample_list[0:20])
+    """
+
+    def on_batch(chunk: SampleTable, digests: list, keys: list):
+        # Classification is done by the pipeline, header metadata isn't.
+        fill_audio_info(chunk)
+        rescan = Rescan(samples=chunk)
+        for sample, key in zip(chunk, keys):
+            if key is not None:
+                _, inode, size, mtime_ns = key
+                rescan.stats[sample.path] = (size, mtime_ns, inode)
+        catalog.store(rescan)
+        cache.store(
+            algorithm,
+            [(key, digest) for key, digest in zip(keys, digests) if digest is not None],
+        )
+
+    return on_batch
 
 
 @timeit
-def main(user_config_file: str, copy_only: True):
+def main(
+    user_config_file: str,
+    copy_only: True,
+    watch: bool = False,
+    stream: bool = False,
+    gpu_scope: bool = False,
+):
 
     # RESOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources")
     # ICON_DIR = os.path.join(RESOURCE_DIR, "icons")
@@ -406,7 +377,10 @@ def main(user_config_file: str, copy_only: True):
     #     rect.original_x = x
     #     rectangles.append(rect)
 
-    oscope = OScope(ctx.main_window, ctx.batch, ctx.user_theme)
+    if gpu_scope:
+        oscope = ShaderScope(ctx.main_window, ctx.batch, ctx.user_theme)
+    else:
+        oscope = OScope(ctx.main_window, ctx.batch, ctx.user_theme)
     ctrlstrip = ControlStrip(
         ctx.main_window, ctx.player, ctx.icons, ctx.batch, ctx.user_theme
     )
@@ -442,6 +416,7 @@ def main(user_config_file: str, copy_only: True):
             ctx.player.pause()
         else:
             ctx.player.play()
+        ctx.invalidate()
 
     def pause_button_handler():
         pass
@@ -450,6 +425,7 @@ def main(user_config_file: str, copy_only: True):
         # print(f"{widget}: {value}")
         if ctx.player.playing:
             ctx.player.pause()
+        ctx.invalidate()
 
     def ff_button_handler():
         pass
@@ -485,25 +461,13 @@ def main(user_config_file: str, copy_only: True):
         cursor.opacity += int(sin(value))
         print(cursor.opacity)
 
-    def calculate_rect_height(rectangles, current_values, spread):
-        for i, rect in enumerate(rectangles):
-            n_rectangles = len(rectangles)
-            # Determine which sample this specific bar represents
-            # We center the visualization so the middle bar is "now"
-            # sample_offset = (i - n_rectangles // 2) * spread
-            # sample_index = center_index + sample_offset
-
-            amplitude = current_values[i]
+    # Seconds of audio across the oscilloscope; the mouse wheel zooms.
+    scope_seconds = ctx.user.config.get("scope_seconds", 1.0)
 
-            scaled_height = abs(amplitude) * 300
-
-            rect.height = max(scaled_height, 2)  # Ensure at least 2px tall
-            # Apply to rectangle
-            rect.y = 720 - (scaled_height / 2)  # Center vertically
-
-            # Dithering effect: Map volume to opacity
-            # Louder = more solid
-            rect.opacity = int(100 + (abs(amplitude) * 155))
+    @ctx.main_window.event
+    def on_mouse_scroll(x, y, scroll_x, scroll_y):
+        nonlocal scope_seconds
+        scope_seconds = min(max(scope_seconds * 2.0**-scroll_y, 0.01), 60.0)
 
     def update(dt):
         if ctx.audio_samples is None:
@@ -513,19 +477,24 @@ def main(user_config_file: str, copy_only: True):
         # convert seconds to samples
         center_index = int(current_time * ctx.sample_rate)
 
-        spread = 20
-        offsets = (np.arange(oscope.n_rectangles) - oscope.n_rectangles // 2) * spread
-        indices = center_index + offsets
-
-        # Stay within bounds
-        indices = np.clip(indices, 0, len(ctx.audio_samples) - 1)
+        if gpu_scope:
+            # Every sample around "now"; the shader decimates them.
+            start = center_index - oscope.n_samples // 2
+            start = max(0, min(start, len(ctx.audio_samples) - oscope.n_samples))
+            oscope.set_samples(ctx.audio_samples[start : start + oscope.n_samples])
+            return
 
-        current_values = ctx.audio_samples[indices]
-        #
-        #
-        # if center_index >= len(audio_samples):
-        #     return
-        calculate_rect_height(oscope.rectangles, current_values, spread)
+        # Min/max over every sample behind each bar, from the peak pyramid
+        # when zoomed out, so wide windows don't alias.
+        frames_per_bar = max(
+            1, round(scope_seconds * ctx.sample_rate / oscope.n_rectangles)
+        )
+        half_window = oscope.n_rectangles * frames_per_bar // 2
+        lows, highs, rms = ctx.decimator.bars(
+            center_index - half_window, center_index + half_window, oscope.n_rectangles
+        )
+        current_values = np.maximum(highs, -lows)
+        oscope.set_amplitudes(current_values)
 
     # TODO: flesh out this section
 
@@ -535,16 +504,19 @@ def main(user_config_file: str, copy_only: True):
 
     @ctx.main_window.event
     def on_draw():
-        ctx.fbo.bind()
-        glClearColor(196.0 / 255, 201.0 / 255, 193.0 / 255, 1.0)
-        ctx.main_window.clear()
-        ctx.batch.draw()
-        ctx.fbo.unbind()
-        ctx.main_window.clear()
-        ctx.screen_sprite.draw()
-
-    pyglet.clock.schedule_interval(update, 1 / 60)
-    pyglet.app.run()
+        with ctx.frame_stats.time("batch"):
+            ctx.begin_scene()
+            glClearColor(196.0 / 255, 201.0 / 255, 193.0 / 255, 1.0)
+            ctx.main_window.clear()
+            ctx.batch.draw()
+            ctx.end_scene()
+        with ctx.frame_stats.time("dither"):
+            ctx.present()
+
+    # Frames are drawn only while playing or after input; none when idle.
+    ctx.init_frame_scheduler(update)
+    pyglet.app.run(None)
+    print(ctx.frame_stats.report())
 
     # SPLICE_ROOT = os.path.expanduser(Path(splice_root))
     # DEST_DIR = os.path.expanduser(Path(dest_dir))
@@ -579,21 +551,105 @@ def main(user_config_file: str, copy_only: True):
         "Vox",
     ]
     SAMPLE_HIERARCHY = user.config["sample_hierarchy"]
+    CATALOG = os.path.expanduser(
+        user.config.get("catalog", "~/.splice_cooker/catalog.sqlite")
+    )
 
-    sample_list = find_samples(SPLICE_ROOT, IGNORE)
-    breakpoint()
-    # get_sample_meta(SPLICE_ROOT, DEST_DIR, sample_list)
-    create_dirs(
-        SPLICE_ROOT,
-        DEST_DIR,
-        SAMPLE_TYPES_DEFAULT,
-        DRUM_TYPES_DEFAULT,
-        INST_TYPES_DEFAULT,
-        SAMPLE_HIERARCHY,
+    SNAPSHOT = os.path.splitext(CATALOG)[0] + ".merkle"
+    PLAN = os.path.expanduser(
+        user.config.get("plan", os.path.splitext(CATALOG)[0] + ".plan.jsonl")
     )
-    # print(sample_list)
-    for sample in tqdm(sample_list):
-        hash_sample_info(sample)
+    PEAKS = os.path.expanduser(
+        user.config.get("peaks", os.path.splitext(CATALOG)[0] + ".peaks")
+    )
+
+    if stream:
+        # Cold library: scan, classify, hash and copy concurrently, without a
+        # plan. Every chunk goes into the catalog and hash cache once copied.
+        algorithm = user.config.get("hash_algorithm", "blake2b")
+        with SampleCatalog(CATALOG) as catalog:
+            pipeline = Pipeline(
+                SPLICE_ROOT,
+                DEST_DIR,
+                IGNORE,
+                algorithm=algorithm,
+                on_batch=catalog_batches(catalog, HashCache(catalog.db), algorithm),
+            )
+            print(f"Pipeline: {pipeline.run()}")
+    else:
+        sample_list = update_catalog(SPLICE_ROOT, DEST_DIR, IGNORE, CATALOG)
+        with SampleCatalog(CATALOG) as catalog:
+            stats = catalog.known_stats()
+            hasher = ContentHasher(
+                user.config.get("hash_algorithm", "blake2b"),
+                cache=HashCache(catalog.db),
+            )
+            digests = hasher.hash_samples(sample_list, progress=tqdm)
+            print(hasher.report())
+            if user.config.get("analyze_audio", False):
+                # Only for files whose names have no tempo or key.
+                analyzer = TempoKeyAnalyzer(cache=TempoKeyCache(catalog.db))
+                analyzer.analyze_samples(sample_list, digests, progress=tqdm)
+                print(analyzer.report())
+
+        if user.config.get("build_peaks", False):
+            # Waveform thumbnails for the browser, once per distinct file.
+            with PeakCache(PEAKS) as peak_cache:
+                builder = PeakBuilder(peak_cache)
+                builder.build_samples(sample_list, digests, progress=tqdm)
+            print(builder.report())
+
+        tree = MerkleTree.build(sample_list, SPLICE_ROOT, stats)
+        if os.path.exists(SNAPSHOT):
+            try:
+                print(f"Since last run: {MerkleTree.load(SNAPSHOT).diff(tree)}")
+            except ValueError as error:
+                print(f"Ignoring the previous snapshot: {error}")
+        tree.save(SNAPSHOT)
+
+        # Planning only reads the catalog; nothing in DEST_DIR is touched until
+        # the plan is executed.
+        link_mode = None
+        if user.config.get("dedupe", False):
+            link_mode = user.config.get("link_mode", "hardlink")
+        n_operations = write_plan(
+            PLAN, make_plan(sample_list, stats, digests, link_mode)
+        )
+        print(f"Planned {n_operations} operations in {PLAN}.")
+        breakpoint()
+
+        create_dirs(
+            SPLICE_ROOT,
+            DEST_DIR,
+            SAMPLE_TYPES_DEFAULT,
+            DRUM_TYPES_DEFAULT,
+            INST_TYPES_DEFAULT,
+            SAMPLE_HIERARCHY,
+            sample_list,
+        )
+        if copy_only:
+            # Operations journaled by an interrupted run of the same plan are
+            # skipped; a journal of any other plan is discarded.
+            with Journal(PLAN + ".journal", plan_digest(PLAN)) as journal:
+                executor = PlanExecutor(CopyExecutor(), journal=journal)
+                executor.execute(read_plan(PLAN))
+            print(f"Copy: {executor.report()}")
+
+    if watch:
+        print(f"Watching {SPLICE_ROOT} for changes...")
+        # Deleted samples are dropped from the catalog; their copies only go
+        # too with watch_delete_copies set.
+        with SampleCatalog(CATALOG) as catalog, LibraryWatcher(
+            SPLICE_ROOT,
+            sync_changes(
+                str(SPLICE_ROOT),
+                str(DEST_DIR),
+                catalog=catalog,
+                delete_copies=user.config.get("watch_delete_copies", False),
+            ),
+            IGNORE,
+        ) as watcher:
+            watcher.run()
 
     breakpoint()
 
@@ -8,11 +8,24 @@ and providing a container for them.
 
 import pyglet
 from pyglet import shapes
+from pyglet.gl import (
+    GL_COLOR_BUFFER_BIT,
+    GL_DRAW_FRAMEBUFFER,
+    GL_FRAMEBUFFER,
+    GL_NEAREST,
+    GL_READ_FRAMEBUFFER,
+    glBindFramebuffer,
+    glBlitFramebuffer,
+    glViewport,
+)
+import math
 import numpy as np
-import librosa
 import os
 import yaml
 
+from splice_cooker.audio_source import open_audio
+from splice_cooker.decimate import Decimator
+from splice_cooker.frames import FrameScheduler, FrameStats
 from splice_cooker.icons import create_icons, load_icons
 from splice_cooker.theme import theme, theme_green
 from splice_cooker.user import User
@@ -47,47 +60,67 @@ class AppContext:
 
     def _load_audio_data(self, filename):
         """
-        Load audio data using librosa.
+        Open audio data without decoding it.
 
         Returns
         -------
-        samples (np.array) : audio data, float32, between -1.0 and 1.0
+        samples (AudioSource) : indexable like a mono float32 array between
+            -1.0 and 1.0; frames are only read when indexed
         sr (int) : sample rate
         """
 
-        # sr=None preserves the file's original sample rate.
-        # mono=True mixes stereo down to one channel (easier for oscilloscopes).
-        samples, sr = librosa.load(filename, sr=None, mono=True)
+        # The file's original sample rate is kept, and stereo is mixed down to
+        # one channel per request (easier for oscilloscopes).
+        samples = open_audio(filename)
 
-        return samples, sr
+        return samples, samples.samplerate
 
     def load_audio(self):
-        print("Loading audio data...")
+        print("Opening audio data...")
         # AUDIO_FILE = pyglet.resource.media(AUDIO_FILENAME)
+        if getattr(self, "audio_samples", None) is not None:
+            self.audio_samples.close()
         self.audio_samples, self.sample_rate = self._load_audio_data(
             os.path.join(self.audio_dir, self.audio_filename)
         )
-        print(f"Loaded {len(self.audio_samples)} samples.")
+        self.decimator = Decimator(self.audio_samples, on_ready=self._on_waveform_ready)
+        self.decimator.start()
+        print(
+            f"Opened {len(self.audio_samples)} samples "
+            f"({self.audio_samples.duration:.1f} s)."
+        )
+
+    def _on_waveform_ready(self):
+        # Runs on the Decimator's thread; post_event is safe to call there,
+        # and the expose event makes the FrameScheduler redraw.
+        pyglet.app.platform_event_loop.post_event(self.main_window, "on_expose")
 
     def init_audio_player(self):
         self.player = pyglet.media.Player()
         if self.audio_samples is not None:
+            # Streaming keeps the player's memory independent of file length.
             source = pyglet.media.load(
-                "/Users/teen/Projects/SpliceCooker/resources/audio/"
-                + self.audio_filename,
-                streaming=False,
+                os.path.join(self.audio_dir, self.audio_filename),
+                streaming=True,
             )
             self.player.queue(source)
             self.player.play()
             self.player.loop = True
 
-    def init_framebuffer(self):
-        # Set up framebuffer
-        self.fbo_texture = pyglet.image.Texture.create(
-            self.main_window.width, self.main_window.height
-        )
-        self.fbo = pyglet.image.Framebuffer()
-        self.fbo.attach_texture(self.fbo_texture)
+    def init_framebuffer(self, render_scale: float = None):
+        """
+        Set up offscreen rendering and the dither pass.
+
+        The UI is drawn into an FBO at RENDER_SCALE times the window's
+        resolution (the "render_scale" user setting, 1.0 by default; 0.5 or
+        0.25 suit the dithered look). Below 1.0 the dither pass also runs at
+        that resolution, and the result is upscaled with nearest-neighbour
+        filtering, cutting fill-rate by 1 / RENDER_SCALE**2. Framebuffers are
+        reallocated on the first frame after a resize.
+        """
+        if render_scale is None:
+            render_scale = self.user.config.get("render_scale", 1.0)
+        self.render_scale = render_scale
         # Set up shader ===
         self.vert_shader = pyglet.graphics.shader.Shader(vertex_source, "vertex")
         self.frag_shader = pyglet.graphics.shader.Shader(fragment_source, "fragment")
@@ -101,14 +134,95 @@ class AppContext:
         self.dither_group = pyglet.graphics.ShaderGroup(
             self.dither_program, parent=self.background_group
         )
+        self.fbo_size = None
+        self._allocate_framebuffer()
+        self.main_window.push_handlers(on_resize=self._on_resize)
+
+    def _on_resize(self, width, height):
+        self.fbo_size = None  # reallocated by the next begin_scene
+
+    def _allocate_framebuffer(self):
+        """(Re)create the FBOs at render scale for the current window size."""
+        width, height = self.main_window.get_framebuffer_size()
+        self.fbo_size = (
+            max(1, math.ceil(width * self.render_scale)),
+            max(1, math.ceil(height * self.render_scale)),
+        )
+        if getattr(self, "fbo", None) is not None:
+            self.fbo.delete()
+            self.fbo_texture.delete()
+            if self.dither_fbo is not None:
+                self.dither_fbo.delete()
+                self.dither_texture.delete()
+
+        # Set up framebuffer
+        self.fbo_texture = pyglet.image.Texture.create(
+            *self.fbo_size, min_filter=GL_NEAREST, mag_filter=GL_NEAREST
+        )
+        self.fbo = pyglet.image.Framebuffer()
+        self.fbo.attach_texture(self.fbo_texture)
+        self.dither_fbo = self.dither_texture = None
+        if self.render_scale != 1.0:
+            # The dither pass is drawn at render scale too, then blitted.
+            self.dither_texture = pyglet.image.Texture.create(*self.fbo_size)
+            self.dither_fbo = pyglet.image.Framebuffer()
+            self.dither_fbo.attach_texture(self.dither_texture)
+
         # Create a Sprite that uses the FBO texture and the Dither Shader
-        self.screen_sprite = pyglet.sprite.Sprite(
-            img=self.fbo_texture,
-            x=0,
-            y=0,
-            batch=pyglet.graphics.Batch(),
-            group=self.dither_group,
+        if getattr(self, "screen_sprite", None) is None:
+            self.screen_sprite = pyglet.sprite.Sprite(
+                img=self.fbo_texture,
+                x=0,
+                y=0,
+                batch=pyglet.graphics.Batch(),
+                group=self.dither_group,
+            )
+        else:
+            self.screen_sprite.image = self.fbo_texture
+        # Window coordinates, whatever the texture's resolution.
+        self.screen_sprite.update(
+            scale_x=self.main_window.width / self.fbo_size[0],
+            scale_y=self.main_window.height / self.fbo_size[1],
+        )
+
+    def begin_scene(self):
+        """Bind the offscreen framebuffer for drawing the UI."""
+        if self.fbo_size is None:
+            self._allocate_framebuffer()
+        self.fbo.bind()
+        glViewport(0, 0, *self.fbo_size)
+
+    def end_scene(self):
+        self.fbo.unbind()
+        glViewport(0, 0, *self.main_window.get_framebuffer_size())
+
+    def present(self):
+        """Draw the offscreen framebuffer to the window through the dither pass."""
+        if self.dither_fbo is None:
+            self.main_window.clear()
+            self.screen_sprite.draw()
+            return
+        self.dither_fbo.bind()
+        glViewport(0, 0, *self.fbo_size)
+        self.screen_sprite.draw()
+        self.dither_fbo.unbind()
+
+        width, height = self.main_window.get_framebuffer_size()
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.dither_fbo.id)
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+        glBlitFramebuffer(
+            0,
+            0,
+            *self.fbo_size,
+            0,
+            0,
+            width,
+            height,
+            GL_COLOR_BUFFER_BIT,
+            GL_NEAREST,
         )
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glViewport(0, 0, width, height)
 
     def load_ui(self):
         self.batch = pyglet.graphics.Batch()
@@ -136,3 +250,18 @@ class AppContext:
             color=self.user_theme["fg"],
             batch=self.batch,
         )
+
+    def init_frame_scheduler(self, update, interval: float = 1 / 60):
+        """Call UPDATE and redraw only when something changed.
+
+        Run the app with pyglet.app.run(None) so pyglet does not also redraw
+        at a fixed rate; per-phase timings are kept in frame_stats.
+        """
+        self.frame_stats = FrameStats()
+        self.scheduler = FrameScheduler(
+            self.main_window, self.player, update, interval, self.frame_stats
+        )
+
+    def invalidate(self):
+        """Redraw the main window on the next tick."""
+        self.scheduler.invalidate()
@@ -0,0 +1,257 @@
+"""
+This file contains the header-only WAV/AIFF metadata reader.
+
+read_audio_info walks the RIFF (WAV) or IFF (AIFF/AIFC) chunk list of a file
+through mmap and unpacks only the chunks it needs: the format chunk (sample
+rate, channels, bit depth), the size of the audio data (frame count), the
+ACID chunk (tempo, beats, root note), the smpl chunk (root note and first
+loop) and, for AIFF, the INST/MARK loop points and Apple Loops basc beats.
+The audio itself is never read or decoded, so only the few pages that hold
+chunk headers are touched, wherever they are in the file. The offset, size
+and encoding of the sample data are recorded too, for readers that do want
+the raw samples (see splice_cooker.peaks).
+
+fill_audio_info stores the result in a SampleTable's audio columns (see
+splice_cooker.samples).
+
+"""
+
+import mmap
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+from splice_cooker.samples import SampleTable
+
+_RIFF_CHUNK = struct.Struct("<4sI")
+_IFF_CHUNK = struct.Struct(">4sI")
+_FMT = struct.Struct("<HHIIHH")  # format, channels, rate, byte rate, align, bits
+_ACID = struct.Struct("<IHHfIHHf")  # flags, root, -, -, beats, meter, tempo
+_SMPL = struct.Struct("<9I")  # ..., MIDI unity note, ..., loop count, -
+_SMPL_LOOP = struct.Struct("<6I")  # cue id, type, start, end, fraction, count
+_COMM = struct.Struct(">hIh10s")  # channels, frames, bits, 80-bit sample rate
+_INST = struct.Struct(">bbbbbbhhhh")  # base note, ..., sustain loop markers
+_MARK = struct.Struct(">hI")  # marker id, position
+_BASC = struct.Struct(">II")  # version, beats
+
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+_WAVE_ENCODINGS = {1: "pcm", 3: "float"}
+_AIFC_ENCODINGS = {
+    b"NONE": ("pcm", True),
+    b"twos": ("pcm", True),
+    b"sowt": ("pcm", False),
+    b"fl32": ("float", True),
+    b"FL32": ("float", True),
+    b"fl64": ("float", True),
+    b"FL64": ("float", True),
+}
+_ACID_ROOT_NOTE_SET = 0x02
+
+
+@dataclass
+class AudioInfo:
+    """Stream parameters and loop metadata found in a file's headers.
+
+    Fields are None when the file does not carry them. LOOP_START and
+    LOOP_END are frame offsets of the first loop; TEMPO comes from an ACID
+    chunk and ROOT_NOTE is a MIDI note number.
+
+    DATA_OFFSET and DATA_SIZE locate the sample data, stored as ENCODING
+    ("pcm" or "float", None if compressed) in SAMPLE_WIDTH bytes per sample.
+    """
+
+    format: str
+    samplerate: int = None
+    channels: int = None
+    bitdepth: int = None
+    frames: int = None
+    loop_start: int = None
+    loop_end: int = None
+    root_note: int = None
+    beats: int = None
+    tempo: float = None
+    data_offset: int = None
+    data_size: int = None
+    encoding: str = None
+    sample_width: int = None
+    big_endian: bool = False
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.frames is None or not self.samplerate:
+            return None
+        return self.frames / self.samplerate
+
+
+def _extended(data: bytes) -> Optional[float]:
+    """Decode an 80-bit IEEE 754 extended float (the AIFF sample rate).
+
+    Returns None for infinities, NaNs and values out of a float's range.
+    """
+    exponent, mantissa = struct.unpack(">HQ", data)
+    sign = -1 if exponent & 0x8000 else 1
+    exponent &= 0x7FFF
+    if exponent == 0x7FFF:
+        return None
+    if exponent == 0 and mantissa == 0:
+        return 0.0
+    try:
+        return sign * mantissa * 2.0 ** (exponent - 16383 - 63)
+    except OverflowError:
+        return None
+
+
+def _valid(info: AudioInfo) -> bool:
+    """Whether INFO's stream parameters are usable and fit the audio columns."""
+    return (
+        info.samplerate is not None
+        and 0 < info.samplerate < 1 << 32
+        and info.channels is not None
+        and 0 < info.channels < 1 << 16
+        and info.bitdepth is not None
+        and 0 < info.bitdepth < 1 << 16
+        and (info.encoding is None or (info.sample_width or 0) > 0)
+    )
+
+
+def _chunks(view, start: int, chunk: struct.Struct):
+    """Yield (id, body offset, body size) for the chunks from START."""
+    end = len(view)
+    while start + 8 <= end:
+        chunk_id, size = chunk.unpack_from(view, start)
+        body = start + 8
+        yield chunk_id, body, min(size, end - body)
+        start = body + size + (size & 1)
+
+
+def _parse_wav(view) -> Optional[AudioInfo]:
+    info = AudioInfo("wav")
+    block_align = 0
+    for chunk_id, body, size in _chunks(view, 12, _RIFF_CHUNK):
+        if chunk_id == b"fmt " and size >= _FMT.size:
+            fmt, channels, rate, _, block_align, bits = _FMT.unpack_from(view, body)
+            if fmt == _WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                # The container bit depth above may be padded; use valid bits.
+                bits = struct.unpack_from("<H", view, body + 18)[0] or bits
+                # The sub-format GUID starts with the plain format code.
+                fmt = struct.unpack_from("<H", view, body + 24)[0]
+            info.samplerate, info.channels, info.bitdepth = rate, channels, bits
+            info.encoding = _WAVE_ENCODINGS.get(fmt)
+            if channels:
+                info.sample_width = block_align // channels
+        elif chunk_id == b"data":
+            info.data_offset, info.data_size = body, size
+        elif chunk_id == b"acid" and size >= _ACID.size:
+            flags, root, _, _, beats, _, _, tempo = _ACID.unpack_from(view, body)
+            info.beats = beats or None
+            info.tempo = tempo if tempo > 0 else None
+            if flags & _ACID_ROOT_NOTE_SET and root < 128:
+                info.root_note = root
+        elif chunk_id == b"smpl" and size >= _SMPL.size:
+            fields = _SMPL.unpack_from(view, body)
+            if info.root_note is None and fields[3] < 128:
+                info.root_note = fields[3]
+            if fields[7] and size >= _SMPL.size + _SMPL_LOOP.size:
+                loop = _SMPL_LOOP.unpack_from(view, body + _SMPL.size)
+                info.loop_start, info.loop_end = loop[2], loop[3]
+    if not _valid(info):
+        return None
+    if info.data_size is not None and block_align:
+        info.frames = info.data_size // block_align
+    return info
+
+
+def _parse_aiff(view) -> Optional[AudioInfo]:
+    info = AudioInfo("aiff")
+    markers = {}
+    sustain_loop = None
+    for chunk_id, body, size in _chunks(view, 12, _IFF_CHUNK):
+        if chunk_id == b"COMM" and size >= _COMM.size:
+            channels, frames, bits, rate = _COMM.unpack_from(view, body)
+            info.channels, info.frames, info.bitdepth = channels, frames, bits
+            rate = _extended(rate)
+            info.samplerate = round(rate) if rate is not None else None
+            info.sample_width = (bits + 7) // 8
+            info.encoding, info.big_endian = "pcm", True
+            if size >= _COMM.size + 4:
+                compression = bytes(view[body + _COMM.size : body + _COMM.size + 4])
+                info.encoding, info.big_endian = _AIFC_ENCODINGS.get(
+                    compression, (None, True)
+                )
+                if info.encoding == "float":
+                    info.sample_width = 8 if compression in (b"fl64", b"FL64") else 4
+        elif chunk_id == b"SSND" and size >= 8:
+            (offset,) = struct.unpack_from(">I", view, body)
+            info.data_offset = body + 8 + offset
+            info.data_size = max(size - 8 - offset, 0)
+        elif chunk_id == b"INST" and size >= _INST.size:
+            fields = _INST.unpack_from(view, body)
+            if fields[0] >= 0:
+                info.root_note = fields[0]
+            if fields[7]:  # sustain loop play mode, 0 is no loop
+                sustain_loop = fields[8], fields[9]
+        elif chunk_id == b"MARK" and size >= 2:
+            (count,) = struct.unpack_from(">H", view, body)
+            offset, end = body + 2, body + size
+            for _ in range(count):
+                if offset + _MARK.size + 1 > end:
+                    break
+                marker_id, position = _MARK.unpack_from(view, offset)
+                markers[marker_id] = position
+                name_length = view[offset + _MARK.size]
+                # The name is a Pascal string padded to an even total length.
+                offset += _MARK.size + 1 + name_length + (~name_length & 1)
+        elif chunk_id == b"basc" and size >= _BASC.size:
+            info.beats = _BASC.unpack_from(view, body)[1] or None
+    if not _valid(info):
+        return None
+    if sustain_loop is not None:
+        info.loop_start = markers.get(sustain_loop[0])
+        info.loop_end = markers.get(sustain_loop[1])
+    return info
+
+
+def parse_audio_info(view) -> Optional[AudioInfo]:
+    """Parse the headers in VIEW (bytes, mmap or memoryview of a whole file)."""
+    magic, form = bytes(view[:4]), bytes(view[8:12])
+    if magic == b"RIFF" and form == b"WAVE":
+        return _parse_wav(view)
+    if magic == b"FORM" and form in (b"AIFF", b"AIFC"):
+        return _parse_aiff(view)
+    return None
+
+
+def read_audio_info(path) -> Optional[AudioInfo]:
+    """Return PATH's AudioInfo, or None if it is not a readable WAV/AIFF."""
+    try:
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                return parse_audio_info(view)
+    except (OSError, ValueError, struct.error):
+        # ValueError: mmap of an empty file.
+        return None
+
+
+def fill_audio_info(sample_list: SampleTable) -> int:
+    """Read the headers of every sample and fill its audio fields.
+
+    An ACID tempo is used as the sample's bpm unless one is already set.
+    Returns the number of samples whose headers could be read.
+    """
+    read = 0
+    for sample in sample_list:
+        info = read_audio_info(sample.path)
+        if info is None:
+            continue
+        read += 1
+        sample.samplerate = info.samplerate
+        sample.channels = info.channels
+        sample.bitdepth = info.bitdepth
+        sample.frames = info.frames
+        sample.loop_start = info.loop_start
+        sample.loop_end = info.loop_end
+        sample.root_note = info.root_note
+        sample.beats = info.beats
+        if info.tempo and not sample.bpm:
+            sample.bpm = info.tempo
+    return read
@@ -0,0 +1,199 @@
+"""
+This file defines the AudioSource classes.
+
+An AudioSource looks like the mono float32 array librosa.load used to
+return: len() is the number of frames, and indexing it with an int, a slice
+or an array of frame indices returns mono samples between -1.0 and 1.0. The
+difference is that nothing is decoded up front. MappedPCMSource maps
+uncompressed WAV/AIFF data and converts only the frames asked for, so only
+the pages the oscilloscope or player touch are ever read. DecodedSource
+decodes other formats block by block through soundfile, keeping a few
+recent blocks. Either way opening a file costs the same however long it is.
+
+"""
+
+import mmap
+from collections import OrderedDict
+
+import numpy as np
+
+from splice_cooker.audio_info import parse_audio_info
+
+BLOCK_FRAMES = 1 << 16
+CACHED_BLOCKS = 8
+
+
+class AudioSource:
+    """Mono, float32, random-access view of an audio file."""
+
+    path: str
+    samplerate: int
+    channels: int
+    frames: int
+
+    def __len__(self):
+        return self.frames
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.samplerate if self.samplerate else 0.0
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.frames)
+            if step < 0 or stop <= start:
+                return self[np.arange(start, stop, step)]
+            return self._read(start, stop)[::step]
+        indices = np.asarray(key)
+        if indices.ndim == 0:
+            return self[indices.reshape(1)][0]
+        indices = np.where(indices < 0, indices + self.frames, indices)
+        if indices.size and (indices.min() < 0 or indices.max() >= self.frames):
+            raise IndexError("frame index out of range")
+        return self._take(indices)
+
+    def _read(self, start: int, stop: int) -> np.ndarray:
+        """Return frames START:STOP as mono float32."""
+        raise NotImplementedError
+
+    def _take(self, indices: np.ndarray) -> np.ndarray:
+        """Return the frames at INDICES as mono float32."""
+        raise NotImplementedError
+
+    def reopen(self) -> "AudioSource":
+        """Open the same file again, e.g. to read it from another thread."""
+        return open_audio(self.path)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MappedPCMSource(AudioSource):
+    """Uncompressed WAV/AIFF data read in place through mmap."""
+
+    def __init__(self, path, info=None):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        info = info or parse_audio_info(self._map)
+        if info is None or info.encoding is None or info.data_offset is None:
+            self._map.close()
+            raise ValueError(f"{path} has no uncompressed PCM data.")
+        self.samplerate = info.samplerate
+        self.channels = info.channels
+        width = info.sample_width
+        size = min(info.data_size, len(self._map) - info.data_offset)
+        self.frames = size // (width * self.channels)
+
+        order = ">" if info.big_endian else "<"
+        self._scale = 1.0
+        self._offset = 0.0
+        if width == 3:
+            dtype = np.dtype((np.uint8, 3))
+        elif info.encoding == "float":
+            dtype = np.dtype(f"{order}f{width}")
+        elif width == 1 and info.format == "wav":
+            dtype, self._offset = np.dtype(np.uint8), 128.0  # unsigned
+        else:
+            dtype = np.dtype(f"{order}i{width}")
+        if info.encoding == "pcm":
+            self._scale = 1.0 / (1 << (8 * width - 1))
+        self._big_endian = info.big_endian
+        # A view onto the mapping: no sample is read until it is indexed.
+        self._data = np.frombuffer(
+            self._map,
+            dtype=dtype,
+            count=self.frames * self.channels,
+            offset=info.data_offset,
+        ).reshape((self.frames, self.channels) + dtype.shape)
+
+    def _mono(self, rows: np.ndarray) -> np.ndarray:
+        if rows.dtype == np.uint8 and rows.ndim == 3:  # 24-bit
+            b = rows.astype(np.int32)
+            if self._big_endian:
+                b = b[..., ::-1]
+            rows = b[..., 0] | (b[..., 1] << 8) | (b[..., 2] << 16)
+            rows = np.where(rows & 0x800000, rows - 0x1000000, rows)
+        mono = rows.astype(np.float32).mean(axis=1)
+        if self._offset:
+            mono -= self._offset
+        if self._scale != 1.0:
+            mono *= self._scale
+        return mono
+
+    def _read(self, start, stop):
+        return self._mono(self._data[start:stop])
+
+    def _take(self, indices):
+        return self._mono(self._data[indices])
+
+    def close(self):
+        self._data = None
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # arrays handed out still reference it; freed with them
+
+
+class DecodedSource(AudioSource):
+    """Any format soundfile reads, decoded in BLOCK_FRAMES blocks on demand."""
+
+    def __init__(self, path, block_frames=BLOCK_FRAMES, cached_blocks=CACHED_BLOCKS):
+        import soundfile
+
+        self.path = path
+        self._file = soundfile.SoundFile(str(path))
+        self.samplerate = self._file.samplerate
+        self.channels = self._file.channels
+        self.frames = self._file.frames
+        self.block_frames = block_frames
+        self.cached_blocks = cached_blocks
+        self._blocks = OrderedDict()
+        self.decoded = 0
+
+    def _block(self, index: int) -> np.ndarray:
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+        self._file.seek(index * self.block_frames)
+        data = self._file.read(self.block_frames, dtype="float32", always_2d=True)
+        block = data.mean(axis=1, dtype=np.float32)
+        self.decoded += 1
+        self._blocks[index] = block
+        if len(self._blocks) > self.cached_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def _read(self, start, stop):
+        first, last = start // self.block_frames, (stop - 1) // self.block_frames
+        blocks = [self._block(index) for index in range(first, last + 1)]
+        joined = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+        offset = first * self.block_frames
+        return joined[start - offset : stop - offset]
+
+    def _take(self, indices):
+        out = np.empty(indices.shape, dtype=np.float32)
+        blocks = indices // self.block_frames
+        for index in np.unique(blocks):
+            mask = blocks == index
+            out[mask] = self._block(int(index))[indices[mask] % self.block_frames]
+        return out
+
+    def close(self):
+        self._blocks.clear()
+        self._file.close()
+
+
+def open_audio(path) -> AudioSource:
+    """Open PATH as a MappedPCMSource if it holds PCM, else a DecodedSource."""
+    try:
+        return MappedPCMSource(path)
+    except ValueError:
+        return DecodedSource(path)
@@ -0,0 +1,227 @@
+"""
+This file defines the SampleCatalog class.
+
+SampleCatalog is a small SQLite database that remembers every sample record
+from previous runs together with the file's size, mtime and inode. A rescan
+only stats the library and hands back the files that are new or changed, so
+unchanged samples are never classified twice.
+
+"""
+
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+from splice_cooker.crawler import LibraryCrawler
+from splice_cooker.samples import AUDIO_COLUMNS, RECORD_FIELDS, SampleTable
+
+_SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    origdir TEXT NOT NULL,
+    newdir TEXT,
+    sampletype TEXT,
+    isdrum INTEGER,
+    drumtype TEXT,
+    isinst INTEGER,
+    insttype TEXT,
+    key TEXT,
+    bpm REAL,
+    status TEXT,
+    sample_match_failed INTEGER,
+    samplerate INTEGER,
+    channels INTEGER,
+    bitdepth INTEGER,
+    frames INTEGER,
+    loop_start INTEGER,
+    loop_end INTEGER,
+    root_note INTEGER,
+    beats INTEGER
+)
+"""
+
+FileStat = Tuple[int, int, int]  # (size, mtime_ns, inode)
+
+
+def file_stat(st: os.stat_result) -> FileStat:
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+@dataclass
+class Rescan:
+    """Result of SampleCatalog.rescan.
+
+    SAMPLES holds fresh records for new and changed files only; classify them
+    and pass the Rescan back to SampleCatalog.store.
+    """
+
+    samples: SampleTable = field(default_factory=SampleTable)
+    stats: Dict[str, FileStat] = field(default_factory=dict)
+    removed: List[str] = field(default_factory=list)
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+
+class SampleCatalog:
+    """On-disk catalog of sample records keyed by path."""
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        (version,) = self.db.execute("PRAGMA user_version").fetchone()
+        if version not in (0, 1, _SCHEMA_VERSION):
+            raise RuntimeError(
+                f"Catalog {self.path} has schema version {version}, "
+                f"expected {_SCHEMA_VERSION}."
+            )
+        with self.db:
+            self.db.execute(_SCHEMA)
+            if version == 1:
+                for column, _, _ in AUDIO_COLUMNS:
+                    self.db.execute(f"ALTER TABLE samples ADD COLUMN {column} INTEGER")
+                # Version 1 rows have no header metadata: make the next rescan
+                # see every file as changed so it is read again.
+                self.db.execute("UPDATE samples SET mtime_ns = -1")
+            self.db.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        (count,) = self.db.execute("SELECT COUNT(*) FROM samples").fetchone()
+        return count
+
+    def known_stats(self) -> Dict[str, FileStat]:
+        """Return {path: (size, mtime_ns, inode)} for every cataloged file."""
+        rows = self.db.execute("SELECT path, size, mtime_ns, inode FROM samples")
+        return {path: (size, mtime_ns, inode) for path, size, mtime_ns, inode in rows}
+
+    def rescan(self, crawler: LibraryCrawler) -> Rescan:
+        """Walk the library with CRAWLER and diff it against the catalog.
+
+        Only stat() calls are made; nothing is read or classified. Files that
+        have disappeared are dropped from the catalog straight away, unless
+        the walk found no files at all: an empty or unmounted library leaves
+        the catalog alone. Raises FileNotFoundError if the library's root is
+        not a directory.
+        """
+        if not os.path.isdir(crawler.splice_root):
+            raise FileNotFoundError(
+                f"Sample library {crawler.splice_root} is not a directory."
+            )
+        if not crawler.stat:
+            crawler = LibraryCrawler(
+                crawler.splice_root, crawler.ignore, crawler.max_workers, stat=True
+            )
+        known = self.known_stats()
+        rescan = Rescan()
+
+        for dirname, entry in crawler.walk():
+            path = entry.path
+            stat = file_stat(entry.stat())
+            previous = known.pop(path, None)
+            if previous == stat:
+                rescan.unchanged += 1
+                continue
+
+            if previous is None:
+                rescan.new += 1
+            else:
+                rescan.changed += 1
+            rescan.samples.append(dirname, entry.name)
+            rescan.stats[path] = stat
+
+        if not (rescan.samples or rescan.unchanged):
+            return rescan
+        rescan.removed = list(known)
+        with self.db:
+            self.db.executemany(
+                "DELETE FROM samples WHERE path = ?",
+                ((path,) for path in rescan.removed),
+            )
+
+        return rescan
+
+    def store(self, rescan: Rescan):
+        """Write the (now classified) records of RESCAN to the catalog.
+
+        Records without an entry in RESCAN.stats are skipped.
+        """
+        columns = ("path", "size", "mtime_ns", "inode") + RECORD_FIELDS
+        placeholders = ", ".join("?" * len(columns))
+        rows = []
+        for sample in rescan.samples:
+            path = sample.path
+            stat = rescan.stats.get(path)
+            if stat is None:
+                continue
+            rows.append(
+                (path,) + stat + tuple(getattr(sample, name) for name in RECORD_FIELDS)
+            )
+
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO samples ({', '.join(columns)}) "
+                f"VALUES ({placeholders})",
+                rows,
+            )
+
+    def remove(self, paths: Iterable[str]) -> Tuple[SampleTable, Dict[str, FileStat]]:
+        """Drop the records of PATHS, and of every file under those that are
+        directories.
+
+        Returns the dropped records and their {path: (size, mtime_ns, inode)}.
+        """
+        removed = SampleTable()
+        stats = {}
+        where = "FROM samples WHERE path = ? OR (path > ? AND path < ?)"
+        with self.db:
+            for path in paths:
+                bounds = (path, path + os.sep, path + chr(ord(os.sep) + 1))
+                rows = self.db.execute(
+                    f"SELECT size, mtime_ns, inode, {', '.join(RECORD_FIELDS)} "
+                    + where,
+                    bounds,
+                )
+                for row in rows.fetchall():
+                    sample = _append_row(removed, row[3:])
+                    stats[sample.path] = row[:3]
+                self.db.execute("DELETE " + where, bounds)
+        return removed, stats
+
+    def load(self) -> SampleTable:
+        """Return every cataloged sample as a SampleTable."""
+        samples = SampleTable()
+        cursor = self.db.execute(f"SELECT {', '.join(RECORD_FIELDS)} FROM samples")
+        for row in cursor:
+            _append_row(samples, row)
+        return samples
+
+
+def _append_row(samples: SampleTable, row: tuple):
+    """Append a row of RECORD_FIELDS values to SAMPLES and return its view."""
+    sample = samples.append(row[1], row[0])
+    for name, value in zip(RECORD_FIELDS[2:], row[2:]):
+        setattr(sample, name, value)
+    return sample
@@ -0,0 +1,376 @@
+"""
+This file contains the sample classification rules.
+
+ClassificationEngine compiles every keyword rule into a single regular
+expression. Each token is lowercased once and matched once, and that one
+match yields its sample type, drum type and instrument type codes (see
+splice_cooker.samples). Token results are memoized, since the same tokens
+("kick", "01", "loop", pack names, ...) appear across thousands of files.
+
+SampleTypeMatcher is the original chained re.search implementation. It is
+kept as the reference for the engine's precedence rules and for
+benchmarks/bench_classify.py.
+
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Tuple
+
+from splice_cooker.samples import (
+    DRUM_TYPES,
+    INST_TYPES,
+    SAMPLE_TYPES,
+    Sample,
+    SampleTable,
+)
+from splice_cooker.tempo_key import parse_tempo_key
+
+UNKNOWN = "Unknown"
+
+# Rules are (label, pattern), highest priority first, matched against
+# lowercased tokens. The patterns are kept verbatim from SampleTypeMatcher.
+DIR_SAMPLE_RULES = (
+    (
+        "One Shot",
+        "one|shot|one_shot|one_shots|one-shot|one-shots|808|percussion|fx|samples"
+        "|synth_sounds|drum_hits}",
+    ),
+    ("Melodic Loop", "melodic_Loops|loops"),
+    ("Perc Loop", "percussion_loops|cymbals_loops"),
+    ("Spoken Loop", "spoken"),
+    ("Break", "drum_loops|breaks|break_loops"),
+)
+FILENAME_SAMPLE_RULES = (
+    (
+        "One Shot",
+        "one_shot|one_shots|one-shot|one-shots|808|percussion|fx|samples"
+        "|synth_sounds}",
+    ),
+    ("Melodic Loop", "melodic_Loops|loops"),
+    ("Percussion Loop", "percussion_loops|cymbals_loops"),
+    ("Spoken Loop", "spoken"),
+    ("Break", "drum_loops|breaks|break_loops"),
+)
+DRUM_RULES = (
+    ("Kick", "kick"),
+    ("Snare", "snare"),
+    ("Cymbal", "cymbal"),
+    ("Hat", "hat"),
+    ("Ride", "ride"),
+    ("Crash", "crash"),
+    ("Perc", "perc"),
+)
+# SampleTypeMatcher checks these with independent ifs, so the *last* match
+# wins: "vocal" beats "fx" beats ... beats "bass".
+INST_RULES = (
+    ("Vox", "vocal"),
+    ("FX", "fx"),
+    ("Strings", "strings"),
+    ("Woodwind", "woodwind"),
+    ("Brass", "brass"),
+    ("Synth", "synth"),
+    ("Keys", "keys|piano"),
+    ("Bass", "bass|subbass"),
+)
+
+TokenCodes = Tuple[int, int, int, int]  # (dir sample, file sample, drum, inst)
+
+
+def _category(rules, codes) -> Tuple[str, list]:
+    """Return the regex fragment for one rule category and its group codes.
+
+    Each rule becomes a lookahead followed by an empty group, so the first
+    rule that occurs anywhere in the token is the branch that matches.
+    """
+    branches = [f"(?=.*?(?:{pattern}))()" for _, pattern in rules]
+    return f"(?:{'|'.join(branches)}|)", [codes[label] for label, _ in rules]
+
+
+class ClassificationEngine:
+    """Single-pass sample/drum/instrument classifier."""
+
+    def __init__(self, token_cache_size: int = 1 << 16):
+        sample_codes = {label: code for code, label in enumerate(SAMPLE_TYPES)}
+        categories = [
+            _category(DIR_SAMPLE_RULES, sample_codes),
+            _category(FILENAME_SAMPLE_RULES, sample_codes),
+            _category(DRUM_RULES, {v: c for c, v in enumerate(DRUM_TYPES)}),
+            _category(INST_RULES, {v: c for c, v in enumerate(INST_TYPES)}),
+        ]
+        self.pattern = re.compile(
+            "".join(fragment for fragment, _ in categories), re.DOTALL
+        )
+
+        # Map each capture group to (category, code).
+        self._group_codes = []
+        for category, (_, codes) in enumerate(categories):
+            self._group_codes.extend((category, code) for code in codes)
+
+        self.token_codes = lru_cache(maxsize=token_cache_size)(self._match_token)
+
+    def _match_token(self, token: str) -> TokenCodes:
+        codes = [0, 0, 0, 0]
+        groups = self.pattern.match(token.lower()).groups()
+        for group, (category, code) in zip(groups, self._group_codes):
+            if group is not None and not codes[category]:
+                codes[category] = code
+        return tuple(codes)
+
+    def dir_sample_code(self, dir_strings: List[str]) -> int:
+        """Sample type code from directory tokens: the last matching token wins."""
+        sample = 0
+        for string in dir_strings:
+            sample = self.token_codes(string)[0] or sample
+        return sample
+
+    def classify_codes(
+        self, dir_strings: List[str], filename_strings: List[str], dir_sample=None
+    ) -> Tuple[int, int, int]:
+        """Return (sample, drum, inst) codes; 0 means unknown.
+
+        DIR_SAMPLE may be passed in when the directory has already been
+        classified with dir_sample_code.
+        """
+        sample = self.dir_sample_code(dir_strings) if dir_sample is None else dir_sample
+        drum = 0
+        inst = 0
+        for string in filename_strings:
+            _, file_sample, file_drum, file_inst = self.token_codes(string)
+            if not sample:
+                sample = file_sample  # the first matching filename token wins
+            drum = file_drum or drum
+            inst = file_inst or inst
+        return sample, drum, inst
+
+    def classify(
+        self, dir_strings: List[str], filename_strings: List[str], dir_sample=None
+    ) -> Tuple[str, str, str]:
+        """Return (sample_type, drum_type, inst_type), "Unknown" if unmatched."""
+        sample, drum, inst = self.classify_codes(
+            dir_strings, filename_strings, dir_sample
+        )
+        return (
+            SAMPLE_TYPES[sample] or UNKNOWN,
+            DRUM_TYPES[drum] or UNKNOWN,
+            INST_TYPES[inst] or UNKNOWN,
+        )
+
+
+classifier = ClassificationEngine()
+
+
+class DirectoryCache:
+    """Bounded LRU of per-directory classification results.
+
+    Every file in a directory shares its directory tokens, so they are split
+    and matched once per directory instead of once per file.
+    """
+
+    def __init__(
+        self, splice_root: str, engine: ClassificationEngine = None, maxsize=4096
+    ):
+        self.splice_root = splice_root
+        self.engine = engine or classifier
+        self.lookup = lru_cache(maxsize=maxsize)(self._classify_dir)
+
+    def _classify_dir(self, origdir: str) -> Tuple[Tuple[str, ...], int]:
+        """Return (origdir_strings, dir sample code) for ORIGDIR."""
+        dir_strings = tuple(origdir.partition(self.splice_root)[2].split("/")[3:])
+        return dir_strings, self.engine.dir_sample_code(dir_strings)
+
+    @property
+    def hit_rate(self) -> float:
+        info = self.lookup.cache_info()
+        lookups = info.hits + info.misses
+        return info.hits / lookups if lookups else 0.0
+
+    def report(self) -> str:
+        info = self.lookup.cache_info()
+        return (
+            f"Directory cache: {info.hits} hits, {info.misses} misses "
+            f"({self.hit_rate:.1%} hit rate, {info.currsize}/{info.maxsize} dirs)"
+        )
+
+
+def apply_sample_meta(
+    sample: Sample, dest_dir: str, sample_type: str, drum_type: str, inst_type: str
+):
+    """Fill in SAMPLE's destination and type fields from its classification."""
+    if sample_type == UNKNOWN:
+        sample.sample_match_failed = True
+
+    elif sample_type == "Break" or sample_type == "Melodic Loop":
+        sample.newdir = os.path.join(dest_dir, f"{sample_type}/")
+        sample.sampletype = sample_type
+
+    elif sample_type == "One Shot":
+        if drum_type != UNKNOWN:
+            sample.newdir = os.path.join(dest_dir, f"{sample_type}/{drum_type}s/")
+            sample.sampletype = sample_type
+            sample.isdrum = True
+            sample.drumtype = drum_type
+
+        if inst_type != UNKNOWN:
+            sample.newdir = os.path.join(dest_dir, f"{sample_type}/{inst_type}/")
+            sample.isinst = True
+            sample.insttype = inst_type
+
+        elif drum_type == UNKNOWN:
+            sample.sample_match_failed = True
+
+    elif sample_type == "Spoken Loop" or sample_type == "Percussion Loop":
+        sample.newdir = os.path.join(dest_dir, f"{sample_type}/")
+
+
+def apply_tempo_key(sample: Sample, filename: str, sample_type: str, drum_type: str):
+    """Fill in SAMPLE's bpm and key from its FILENAME.
+
+    Only loops take a bare number as their tempo, and drums never take a bare
+    note as their key (see parse_tempo_key).
+    """
+    sample.bpm, sample.key = parse_tempo_key(
+        filename, loop=sample_type != "One Shot", pitched=drum_type == UNKNOWN
+    )
+
+
+def classify_table(
+    sample_list: SampleTable, splice_root: str, dest_dir: str, dir_cache=None
+) -> DirectoryCache:
+    """Classify every sample in SAMPLE_LIST in place, quietly.
+
+    Unlike get_sample_meta this never prints or raises; unmatched samples are
+    flagged with sample_match_failed. Tempo and key are read from filenames.
+    Returns the DirectoryCache used.
+    """
+    dir_cache = dir_cache or DirectoryCache(splice_root)
+    for sample in sample_list:
+        dir_strings, dir_sample = dir_cache.lookup(sample.origdir)
+        filename = sample.filename
+        filename_strings = filename.partition(".")[0].split("_")
+        sample_type, drum_type, inst_type = dir_cache.engine.classify(
+            dir_strings, filename_strings, dir_sample
+        )
+        apply_sample_meta(sample, dest_dir, sample_type, drum_type, inst_type)
+        apply_tempo_key(sample, filename, sample_type, drum_type)
+    return dir_cache
+
+
+def _classify_chunk(args) -> tuple:
+    """Process pool worker: classify one SampleTable chunk."""
+    chunk, splice_root, dest_dir = args
+    classify_table(chunk, splice_root, dest_dir)
+    return chunk.export_meta()
+
+
+def classify_batch(
+    sample_list: SampleTable,
+    splice_root: str,
+    dest_dir: str,
+    workers: int = None,
+    chunk_size: int = 50_000,
+):
+    """Classify SAMPLE_LIST in place on a pool of WORKERS processes.
+
+    The table is cut into CHUNK_SIZE-row chunks. Each worker gets a compact
+    chunk (a filename buffer plus the directories it uses) and sends back
+    only the classification columns as bytes, which are merged in order.
+    Results are identical to classify_table.
+    """
+    starts = range(0, len(sample_list), chunk_size)
+    chunks = (
+        (sample_list.take(start, start + chunk_size), splice_root, dest_dir)
+        for start in starts
+    )
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start, exported in zip(starts, pool.map(_classify_chunk, chunks)):
+            sample_list.import_meta(start, exported)
+
+
+class SampleTypeMatcher:
+    """Class to handle learning sample types from file paths and names."""
+
+    def __init__(self):
+        self.sample_type = None
+        self.drum_type = None
+        self.inst_type = None
+
+    def get_sample_type(self, dir_strings: list, filename_strings: list):
+        default = "Unknown"
+        self.sample_type = default
+        for string in dir_strings:
+            if re.search(
+                "one|shot|one_shot|one_shots|one-shot|one-shots|808|percussion|fx|samples|synth_sounds|drum_hits}",
+                string.lower(),
+            ):
+                self.sample_type = "One Shot"
+            elif re.search("melodic_Loops|loops", string.lower()):
+                self.sample_type = "Melodic Loop"
+            elif re.search("percussion_loops|cymbals_loops", string.lower()):
+                self.sample_type = "Perc Loop"
+            elif re.search("spoken", string.lower()):
+                self.sample_type = "Spoken Loop"
+            elif re.search("drum_loops|breaks|break_loops", string.lower()):
+                self.sample_type = "Break"
+
+        for string in filename_strings:
+            if self.sample_type == default:
+                if re.search(
+                    "one_shot|one_shots|one-shot|one-shots|808|percussion|fx|samples|synth_sounds}",
+                    string.lower(),
+                ):
+                    self.sample_type = "One Shot"
+                elif re.search("melodic_Loops|loops", string.lower()):
+                    self.sample_type = "Melodic Loop"
+                elif re.search("percussion_loops|cymbals_loops", string.lower()):
+                    self.sample_type = "Percussion Loop"
+                elif re.search("spoken", string.lower()):
+                    self.sample_type = "Spoken Loop"
+                elif re.search("drum_loops|breaks|break_loops", string.lower()):
+                    self.sample_type = "Break"
+
+        return self.sample_type
+
+    def get_drum_type(self, dir_strings: list, filename_strings: list):
+        default = "Unknown"
+        self.drum_type = default
+        for string in filename_strings:
+            if re.search("kick", string):
+                self.drum_type = "Kick"
+            elif re.search("snare", string.lower()):
+                self.drum_type = "Snare"
+            elif re.search("cymbal", string.lower()):
+                self.drum_type = "Cymbal"
+            elif re.search("hat", string.lower()):
+                self.drum_type = "Hat"
+            elif re.search("ride", string.lower()):
+                self.drum_type = "Ride"
+            elif re.search("crash", string.lower()):
+                self.drum_type = "Crash"
+            elif re.search("perc", string.lower()):
+                self.drum_type = "Perc"
+        return self.drum_type
+
+    def get_inst_type(self, dir_strings: list, filename_strings: list):
+        default = "Unknown"
+        self.inst_type = default
+        for string in filename_strings:
+            if re.search("bass|subbass", string.lower()):
+                self.inst_type = "Bass"
+            if re.search("keys|piano", string.lower()):
+                self.inst_type = "Keys"
+            if re.search("synth", string.lower()):
+                self.inst_type = "Synth"
+            if re.search("brass", string.lower()):
+                self.inst_type = "Brass"
+            if re.search("woodwind", string.lower()):
+                self.inst_type = "Woodwind"
+            if re.search("strings", string.lower()):
+                self.inst_type = "Strings"
+            if re.search("fx", string.lower()):
+                self.inst_type = "FX"
+            if re.search("vocal", string.lower()):
+                self.inst_type = "Vox"
+        return self.inst_type
@@ -4,6 +4,7 @@ This file contains component base class and component classes.
 Current list of components
 ==========================
 OScope : Oscilloscope
+ShaderScope : Oscilloscope drawn by a shader from a texture of samples
 ControlStrip : Control strip for audio transport
   - Play/Pause
   - Stop
@@ -13,8 +14,38 @@ ControlStrip : Control strip for audio transport
 
 """
 
+import numpy as np
 from pyglet import shapes
-from pyglet.graphics import Batch
+from pyglet.gl import (
+    GL_BLEND,
+    GL_FLOAT,
+    GL_MAX_TEXTURE_SIZE,
+    GL_NEAREST,
+    GL_ONE_MINUS_SRC_ALPHA,
+    GL_R32F,
+    GL_RED,
+    GL_SRC_ALPHA,
+    GL_TEXTURE0,
+    GL_TEXTURE_1D,
+    GL_TEXTURE_MAG_FILTER,
+    GL_TEXTURE_MIN_FILTER,
+    GL_TRIANGLES,
+    GLint,
+    GLuint,
+    glActiveTexture,
+    glBindTexture,
+    glBlendFunc,
+    glDeleteTextures,
+    glDisable,
+    glEnable,
+    glGenTextures,
+    glGetIntegerv,
+    glTexImage1D,
+    glTexParameteri,
+    glTexSubImage1D,
+)
+from pyglet.graphics import Batch, ShaderGroup
+from pyglet.graphics.shader import Shader, ShaderProgram
 from pyglet.gui import WidgetBase, PushButton, ToggleButton
 from pyglet.media import Player
 from pyglet.resource import image
@@ -25,6 +56,12 @@ from abc import ABC, abstractmethod
 from typing import Protocol, Tuple, Dict
 from math import sin, cos
 
+from splice_cooker.shader import (
+    oscope_fragment_source,
+    oscope_vertex_source,
+    scope_fragment_source,
+    vertex_source,
+)
 
 # def push_button_handler(widget):
 #     push_label.text = "Push Button: True"
@@ -114,28 +151,48 @@ class ControlStrip(WidgetBase):
             self.buttons.append(pb)
 
 
+class _BarGroup(ShaderGroup):
+    """Shader group for the oscilloscope bars, with alpha blending."""
+
+    def set_state(self):
+        super().set_state()
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+    def unset_state(self):
+        glDisable(GL_BLEND)
+        super().unset_state()
+
+
 class OScope(WidgetBase):
     """Oscilloscope class that inherits from WidgetBase."""
 
-    def __init__(self, window: Window, batch: Batch, user_theme: Tuple):
+    def __init__(
+        self, window: Window, batch: Batch, user_theme: Tuple, n_rectangles: int = None
+    ):
         """
         Initialize OScope widget.
 
         We want to inherit the final init procedure from WidgetBase that
         assigns x, y, width, and height, but calculate them according to
         our params beforehand.
+
+        N_RECTANGLES bars, if given, are fitted into the default screen size.
         """
         self.aspect_x = 4
         self.aspect_y = 3
         # self.rectangles = []
         self.rectangle_width = 8
-        self.n_rectangles = int(
+        default_n_rectangles = int(
             (2 * 100) / self.rectangle_width
         )  # this determines x pixel count and screen size
         self.gap = self.rectangle_width
-        width = (self.n_rectangles * self.rectangle_width) + (
-            (self.n_rectangles - 1) * self.gap
+        width = (default_n_rectangles * self.rectangle_width) + (
+            (default_n_rectangles - 1) * self.gap
         )
+        self.n_rectangles = n_rectangles or default_n_rectangles
+        if self.n_rectangles != default_n_rectangles:
+            self.rectangle_width = self.gap = width / (2 * self.n_rectangles - 1)
         height = width / (self.aspect_x / self.aspect_y)
         x = (window.width - width) / 2  # left edge of screen
         y = (window.height / 2) - (height / 2)
@@ -145,7 +202,7 @@ class OScope(WidgetBase):
 
         super().__init__(x, y, width, height)
         self.create_border()
-        self.create_rectangles()
+        self.create_bars()
 
     def create_border(self):
         """Create border around oscilloscope."""
@@ -159,20 +216,157 @@ class OScope(WidgetBase):
         )
         self.border = oscope_border
 
-    def create_rectangles(self):
-        """Create initial row of rectangles."""
-        self.rectangles = []
-        for i in range(self.n_rectangles):
-            x = self._x + i * (self.rectangle_width + self.gap)
-            y = self._height / 2
-            rect = shapes.Rectangle(
-                x=x,
-                y=y,
-                width=self.rectangle_width,
-                height=self.rectangle_width,
-                color=self.user_theme["fg"],
-                batch=self.batch,
+    def create_bars(self):
+        """Create every bar as one quad of a single indexed vertex list.
+
+        Only the per-vertex amplitudes change from frame to frame, so
+        set_amplitudes is a single buffer write however many bars there are;
+        the vertex shader turns amplitudes into heights and opacities.
+        """
+        self.program = ShaderProgram(
+            Shader(oscope_vertex_source, "vertex"),
+            Shader(oscope_fragment_source, "fragment"),
+        )
+        self.program["center_y"] = self._y + self._height / 2
+        self.program["scale"] = 300.0
+        self.program["min_height"] = 2.0  # Ensure at least 2px tall
+        self.program["color"] = tuple(c / 255 for c in self.user_theme["fg"]) + (1.0,)
+
+        n = self.n_rectangles
+        left = self._x + np.arange(n) * (self.rectangle_width + self.gap)
+        right = left + self.rectangle_width
+        positions = np.empty((n, 4, 2), dtype=np.float32)
+        positions[:, :, 0] = np.stack([left, right, right, left], axis=1)
+        positions[:, :, 1] = (-0.5, -0.5, 0.5, 0.5)
+        indices = (np.arange(n)[:, None] * 4 + (0, 1, 2, 0, 2, 3)).ravel()
+
+        self.bars = self.program.vertex_list_indexed(
+            4 * n,
+            GL_TRIANGLES,
+            indices.tolist(),
+            batch=self.batch,
+            group=_BarGroup(self.program),
+            position=("f", positions.ravel().tolist()),
+            amplitude=("f", [0.0] * (4 * n)),
+        )
+
+    def set_amplitudes(self, values):
+        """Show VALUES, one amplitude between -1.0 and 1.0 per bar."""
+        amplitudes = np.ctypeslib.as_array(self.bars.amplitude)
+        amplitudes.reshape(self.n_rectangles, 4)[:] = np.asarray(
+            values, dtype=np.float32
+        )[:, None]
+
+    def delete(self):
+        self.bars.delete()
+        self.border.delete()
+
+
+class _SampleGroup(_BarGroup):
+    """Shader group that also binds the ShaderScope sample texture."""
+
+    def __init__(self, program, texture_id):
+        super().__init__(program)
+        self.texture_id = texture_id
+
+    def set_state(self):
+        super().set_state()
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_1D, self.texture_id)
+
+    def unset_state(self):
+        glBindTexture(GL_TEXTURE_1D, 0)
+        super().unset_state()
+
+
+class ShaderScope(OScope):
+    """Oscilloscope drawn entirely in a fragment shader.
+
+    Each frame's samples are uploaded as a 1D float texture, and the shader
+    draws the trace, or N_RECTANGLES bars if given, from it.
+    """
+
+    def __init__(
+        self,
+        window: Window,
+        batch: Batch,
+        user_theme: Tuple,
+        n_rectangles: int = None,
+        n_samples: int = 2048,
+    ):
+        self.n_samples = n_samples
+        self.draw_bars = n_rectangles is not None
+        super().__init__(window, batch, user_theme, n_rectangles)
+
+    def create_bars(self):
+        """Create the sample texture and the quad the shader draws on."""
+        self.program = ShaderProgram(
+            Shader(vertex_source, "vertex"),
+            Shader(scope_fragment_source, "fragment"),
+        )
+        self.program["samples"] = 0
+        self.program["n_samples"] = self.n_samples
+        self.program["size"] = (self._width, self._height)
+        self.program["scale"] = 300.0
+        self.program["thickness"] = 1.0
+        self.program["min_height"] = 2.0  # Ensure at least 2px tall
+        self.program["n_bars"] = self.n_rectangles if self.draw_bars else 0
+        self.program["color"] = tuple(c / 255 for c in self.user_theme["fg"]) + (1.0,)
+
+        max_size = GLint()
+        glGetIntegerv(GL_MAX_TEXTURE_SIZE, max_size)
+        if not 0 < self.n_samples <= max_size.value:
+            raise ValueError(
+                f"n_samples must be between 1 and {max_size.value}, "
+                f"got {self.n_samples}."
             )
-            rect.opacity = 200
-            rect.original_x = x
-            self.rectangles.append(rect)
+
+        texture_id = GLuint()
+        glGenTextures(1, texture_id)
+        self.texture_id = texture_id.value
+        glBindTexture(GL_TEXTURE_1D, self.texture_id)
+        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexImage1D(
+            GL_TEXTURE_1D, 0, GL_R32F, self.n_samples, 0, GL_RED, GL_FLOAT, None
+        )
+        glBindTexture(GL_TEXTURE_1D, 0)
+        self._upload = np.zeros(self.n_samples, dtype=np.float32)
+        self.set_samples(self._upload)
+
+        x0, y0 = self._x, self._y
+        x1, y1 = x0 + self._width, y0 + self._height
+        self.bars = self.program.vertex_list_indexed(
+            4,
+            GL_TRIANGLES,
+            [0, 1, 2, 0, 2, 3],
+            batch=self.batch,
+            group=_SampleGroup(self.program, self.texture_id),
+            position=("f", (x0, y0, 0, x1, y0, 0, x1, y1, 0, x0, y1, 0)),
+            tex_coords=("f", (0, 0, 1, 0, 1, 1, 0, 1)),
+        )
+
+    def set_samples(self, values):
+        """Upload VALUES, up to N_SAMPLES samples between -1.0 and 1.0.
+
+        Missing samples at the end are drawn as silence.
+        """
+        values = np.asarray(values, dtype=np.float32)[: self.n_samples]
+        if len(values) < self.n_samples:
+            self._upload[len(values) :] = 0.0
+            self._upload[: len(values)] = values
+            values = self._upload
+        values = np.ascontiguousarray(values)
+        glBindTexture(GL_TEXTURE_1D, self.texture_id)
+        glTexSubImage1D(
+            GL_TEXTURE_1D, 0, 0, self.n_samples, GL_RED, GL_FLOAT, values.ctypes.data
+        )
+        glBindTexture(GL_TEXTURE_1D, 0)
+
+    def set_amplitudes(self, values):
+        """Show VALUES, as OScope does; they are uploaded as the samples."""
+        self.set_samples(values)
+
+    def delete(self):
+        super().delete()
+        glDeleteTextures(1, GLuint(self.texture_id))
@@ -0,0 +1,174 @@
+"""
+This file contains the content hashing stage.
+
+ContentHasher hashes sample files on a process pool, reading them in large
+chunks (or through mmap for big loops). Digests are remembered in a
+HashCache keyed by (device, inode, size, mtime), usually stored alongside the
+SampleCatalog, so rehashing an unchanged library costs one stat() per file
+and never reads file contents again.
+
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from splice_cooker.samples import SampleTable
+
+DEFAULT_ALGORITHM = "blake2b"
+ALGORITHMS = ("blake2b", "md5", "sha1", "sha256")
+CHUNK_SIZE = 1 << 20
+MMAP_THRESHOLD = 8 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    algorithm TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest BLOB NOT NULL,
+    PRIMARY KEY (device, inode, algorithm)
+)
+"""
+
+StatKey = Tuple[int, int, int, int]  # (device, inode, size, mtime_ns)
+
+
+def stat_key(st: os.stat_result) -> StatKey:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def hash_file(path: str, algorithm: str = DEFAULT_ALGORITHM) -> bytes:
+    """Return the digest of PATH's contents."""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                digest.update(view)
+        else:
+            buffer = bytearray(CHUNK_SIZE)
+            chunk = memoryview(buffer)
+            while n := f.readinto(buffer):
+                digest.update(chunk[:n])
+    return digest.digest()
+
+
+def _hash_worker(args) -> Optional[bytes]:
+    path, algorithm = args
+    try:
+        return hash_file(path, algorithm)
+    except (OSError, ValueError):  # ValueError: mmap of a file emptied under us
+        return None
+
+
+class HashCache:
+    """Persistent digest cache in a SQLite database (e.g. SampleCatalog.db)."""
+
+    def __init__(self, db):
+        self.db = db if isinstance(db, sqlite3.Connection) else sqlite3.connect(db)
+        with self.db:
+            self.db.execute(_SCHEMA)
+
+    def load(self, algorithm: str) -> Dict[Tuple[int, int], Tuple[int, int, bytes]]:
+        """Return {(device, inode): (size, mtime_ns, digest)} for ALGORITHM."""
+        rows = self.db.execute(
+            "SELECT device, inode, size, mtime_ns, digest FROM hashes "
+            "WHERE algorithm = ?",
+            (algorithm,),
+        )
+        return {
+            (dev, ino): (size, mtime, digest) for dev, ino, size, mtime, digest in rows
+        }
+
+    def store(self, algorithm: str, entries: Iterable[Tuple[StatKey, bytes]]):
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO hashes "
+                "(device, inode, algorithm, size, mtime_ns, digest) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (dev, ino, algorithm, size, mtime, digest)
+                    for (dev, ino, size, mtime), digest in entries
+                ),
+            )
+
+
+class ContentHasher:
+    """Hashes files on a process pool, skipping files the cache already knows."""
+
+    def __init__(
+        self,
+        algorithm: str = DEFAULT_ALGORITHM,
+        workers: int = None,
+        cache: HashCache = None,
+    ):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(
+                f"Unsupported hash algorithm {algorithm!r}, "
+                f"expected one of {ALGORITHMS}."
+            )
+        self.algorithm = algorithm
+        self.workers = workers
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self.bytes_hashed = 0
+
+    def hash_paths(self, paths: List[str], progress=None) -> List[Optional[bytes]]:
+        """Return the digest of every path in PATHS (None if unreadable).
+
+        PROGRESS, e.g. tqdm, wraps the iterator over freshly hashed files.
+        """
+        known = self.cache.load(self.algorithm) if self.cache else {}
+        digests = [None] * len(paths)
+        todo = []
+        for index, path in enumerate(paths):
+            try:
+                key = stat_key(os.stat(path))
+            except OSError:
+                continue
+            cached = known.get(key[:2])
+            if cached is not None and cached[:2] == key[2:]:
+                digests[index] = cached[2]
+                self.hits += 1
+            else:
+                todo.append((index, key))
+
+        self.misses += len(todo)
+        if not todo:
+            return digests
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            results = pool.map(
+                _hash_worker,
+                ((paths[index], self.algorithm) for index, _ in todo),
+                chunksize=16,
+            )
+            if progress is not None:
+                results = progress(results, total=len(todo))
+            fresh = []
+            for (index, key), digest in zip(todo, results):
+                if digest is None:
+                    continue
+                digests[index] = digest
+                self.bytes_hashed += key[2]
+                fresh.append((key, digest))
+
+        if self.cache:
+            self.cache.store(self.algorithm, fresh)
+        return digests
+
+    def hash_samples(self, sample_list: SampleTable, progress=None):
+        """Return the digest of every sample, in table order."""
+        return self.hash_paths([sample.path for sample in sample_list], progress)
+
+    def report(self) -> str:
+        return (
+            f"Hashing ({self.algorithm}): {self.hits} cached, {self.misses} hashed, "
+            f"{self.bytes_hashed / 1e6:.1f} MB read"
+        )
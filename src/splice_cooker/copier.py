@@ -0,0 +1,301 @@
+"""
+This file defines the CopyExecutor class.
+
+CopyExecutor copies samples into their planned newdir on a bounded thread
+pool. Each copy tries, in order: a reflink (FICLONE, instant on btrfs/XFS),
+os.copy_file_range, os.sendfile, and finally a plain read/write loop, so the
+data never passes through Python when the kernel can move it. Copies are
+written to a temporary name and renamed into place, and carry the source
+mtime, so a destination with the same size and mtime is skipped as
+identical on the next run.
+
+"""
+
+import errno
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from splice_cooker.samples import SampleTable
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
+CHUNK_SIZE = 1 << 30
+
+# Errors meaning "this copy mechanism is not available here", as opposed to
+# a real I/O failure.
+_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EBADF,
+    errno.ETXTBSY,
+}
+
+
+@dataclass
+class CopyStats:
+    copied: int = 0
+    skipped: int = 0
+    failed: int = 0
+    reflinked: int = 0
+    bytes_copied: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.bytes_copied / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.copied} copied ({self.reflinked} reflinked), "
+            f"{self.skipped} skipped, {self.failed} failed, "
+            f"{self.bytes_copied / 1e6:.1f} MB at {self.bytes_per_sec / 1e6:.1f} MB/s"
+        )
+
+
+def is_identical(src_stat: os.stat_result, dst: str) -> bool:
+    """True if DST already looks like a finished copy of the source."""
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    return (
+        dst_stat.st_size == src_stat.st_size
+        and dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+    )
+
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED or e.errno == errno.ENOTTY:
+            return False
+        raise
+    return True
+
+
+def _kernel_copy(src_fd: int, dst_fd: int, size: int):
+    """Copy SIZE bytes from SRC_FD to DST_FD, preferring in-kernel copies."""
+    copied = 0
+    for method in ("copy_file_range", "sendfile"):
+        if not hasattr(os, method):
+            continue
+        try:
+            while copied < size:
+                count = min(size - copied, CHUNK_SIZE)
+                if method == "copy_file_range":
+                    sent = os.copy_file_range(src_fd, dst_fd, count)
+                else:
+                    sent = os.sendfile(dst_fd, src_fd, copied, count)
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED or copied:
+                raise
+            continue
+        if not copied and size:
+            # Some filesystems (procfs-like files, some FUSE and network
+            # mounts) return 0 straight away instead of failing with ENOSYS
+            # or EXDEV: treat that as unsupported, too.
+            continue
+        _check_complete(copied, size)
+        return
+
+    with open(src_fd, "rb", closefd=False) as src, open(
+        dst_fd, "wb", closefd=False
+    ) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+        _check_complete(dst.tell(), size)
+
+
+def _check_complete(copied: int, size: int):
+    # The source was truncated while copying (e.g. still being downloaded).
+    if copied < size:
+        raise OSError(errno.EIO, f"source ended after {copied} of {size} bytes")
+
+
+def clone_file(src: str, dst: str) -> bool:
+    """Reflink SRC to DST. Returns False if the filesystem can't share extents."""
+    tmp = f"{dst}.{threading.get_ident()}.part"
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            cloned = _reflink(src_fd, dst_fd)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+    if not cloned:
+        os.remove(tmp)
+        return False
+    shutil.copystat(src, tmp)
+    os.replace(tmp, dst)
+    return True
+
+
+class CopyExecutor:
+    """Copies files on a thread pool with a per-device concurrency limit."""
+
+    def __init__(self, max_workers: int = 8, per_device: int = 4, reflink: bool = True):
+        self.max_workers = max_workers
+        self.per_device = per_device
+        self.reflink = reflink
+        self.stats = CopyStats()
+        self._lock = threading.Lock()
+        self._device_slots = {}
+        self._dir_devices = {}
+
+    def _device_of(self, dirname: str) -> int:
+        device = self._dir_devices.get(dirname)
+        if device is None:
+            device = self._dir_devices[dirname] = os.stat(dirname).st_dev
+        return device
+
+    def _slots(self, device: int) -> threading.Semaphore:
+        with self._lock:
+            slots = self._device_slots.get(device)
+            if slots is None:
+                slots = self._device_slots[device] = threading.Semaphore(
+                    self.per_device
+                )
+            return slots
+
+    def copy(self, src: str, dst: str) -> str:
+        """Copy SRC to DST. Returns "copied" or "skipped"."""
+        src_stat = os.stat(src)
+        if is_identical(src_stat, dst):
+            with self._lock:
+                self.stats.skipped += 1
+            return "skipped"
+
+        # Hold a slot on both devices, always in the same order.
+        devices = sorted({src_stat.st_dev, self._device_of(os.path.dirname(dst))})
+        slots = [self._slots(device) for device in devices]
+        for slot in slots:
+            slot.acquire()
+        try:
+            reflinked = self._copy_data(src, dst, src_stat)
+        finally:
+            for slot in reversed(slots):
+                slot.release()
+
+        with self._lock:
+            self.stats.copied += 1
+            self.stats.reflinked += reflinked
+            self.stats.bytes_copied += src_stat.st_size
+        return "copied"
+
+    def _copy_data(self, src: str, dst: str, src_stat: os.stat_result) -> bool:
+        tmp = f"{dst}.{threading.get_ident()}.part"
+        reflinked = False
+        try:
+            src_fd = os.open(src, os.O_RDONLY)
+            try:
+                dst_fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    reflinked = self.reflink and _reflink(src_fd, dst_fd)
+                    if not reflinked:
+                        _kernel_copy(src_fd, dst_fd, src_stat.st_size)
+                finally:
+                    os.close(dst_fd)
+            finally:
+                os.close(src_fd)
+            shutil.copymode(src, tmp)
+            os.utime(tmp, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+            os.replace(tmp, dst)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        return reflinked
+
+    def run(self, jobs, on_done=None) -> CopyStats:
+        """Copy every (src, dst, ...) tuple in JOBS.
+
+        Extra tuple items are passed through untouched. ON_DONE(job, status)
+        is called from the calling thread for every job, with status "copied",
+        "skipped" or "failed". If a copy raises anything but OSError, no new
+        copies start, ON_DONE still sees every copy that finished, and the
+        exception is re-raised.
+        """
+        window = self.max_workers * 4
+        started = time.perf_counter()
+
+        def finish(done):
+            error = None
+            for future in done:
+                job = pending.pop(future)
+                if future.cancelled():
+                    continue
+                try:
+                    status = future.result()
+                except OSError as e:
+                    print(f"Copy failed: {job[0]} -> {job[1]}: {e}")
+                    with self._lock:
+                        self.stats.failed += 1
+                    status = "failed"
+                except BaseException as e:
+                    error = error or e
+                    continue
+                if on_done is not None:
+                    on_done(job, status)
+            if error is not None:
+                raise error
+
+        with ThreadPoolExecutor(self.max_workers, "copier") as pool:
+            pending = {}
+            try:
+                for job in jobs:
+                    if len(pending) >= window:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        finish(done)
+                    pending[pool.submit(self.copy, job[0], job[1])] = job
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    finish(done)
+            except BaseException:
+                # Start nothing new, but report every copy that did finish so
+                # callers (e.g. a journal) don't lose track of it.
+                for future in pending:
+                    future.cancel()
+                done, _ = wait(pending)
+                try:
+                    finish(done)
+                except BaseException:
+                    pass
+                raise
+
+        self.stats.elapsed += time.perf_counter() - started
+        return self.stats
+
+    def copy_samples(self, sample_list: SampleTable) -> CopyStats:
+        """Copy every classified sample into its newdir and update its status."""
+
+        def jobs():
+            for sample in sample_list:
+                if sample.newdir is not None:
+                    dst = os.path.join(sample.newdir, sample.filename)
+                    yield sample.path, dst, sample.index
+
+        def on_done(job, status):
+            sample_list[job[2]].status = status
+
+        return self.run(jobs(), on_done)
@@ -0,0 +1,130 @@
+"""
+This file defines the LibraryCrawler class.
+
+LibraryCrawler walks a Splice library with os.scandir. Each directory listing
+runs on a bounded thread pool, so slow (e.g. network mounted) libraries are
+listed many directories at a time, and samples are yielded as soon as their
+directory has been listed instead of after the whole walk.
+
+"""
+
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def is_sample_file(filename: str, ignore) -> bool:
+    """Return True unless FILENAME is ignored or is an Ableton analysis file."""
+    return filename not in ignore and not filename.endswith(".asd")
+
+
+class LibraryCrawler:
+    """Parallel os.scandir walker for a sample library.
+
+    Yields the same files as walking SPLICE_ROOT with os.walk (symlinked
+    directories are not followed, unreadable directories are skipped), but
+    not in the same order. With STAT set, every yielded entry has already
+    been stat()ed on the worker thread that listed it.
+    """
+
+    def __init__(
+        self,
+        splice_root,
+        ignore=(".DS_Store",),
+        max_workers: int = 8,
+        stat: bool = False,
+    ):
+        self.splice_root = os.fspath(splice_root)
+        self.ignore = frozenset(ignore)
+        self.max_workers = max_workers
+        self.stat = stat
+        self.files_found = 0
+        self.dirs_scanned = 0
+        self._pending = 0
+        self._started = None
+        self._finished = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of directories submitted but not yet consumed."""
+        return self._pending
+
+    @property
+    def elapsed(self) -> float:
+        if self._started is None:
+            return 0.0
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return end - self._started
+
+    @property
+    def files_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.files_found / elapsed if elapsed > 0 else 0.0
+
+    def _scan_dir(self, dirname: str):
+        """List DIRNAME, splitting entries into subdirectories and sample files."""
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(dirname) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+
+                    if is_dir:
+                        # Like os.walk(followlinks=False): list it, don't enter it.
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    elif is_sample_file(entry.name, self.ignore):
+                        if self.stat:
+                            try:
+                                entry.stat()  # DirEntry caches the result
+                            except OSError:
+                                continue
+                        files.append(entry)
+        except OSError:
+            pass
+
+        return dirname, subdirs, files
+
+    def walk(self):
+        """Yield (dirname, os.DirEntry) for every sample file under the root."""
+        results = queue.Queue()
+        pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="crawler"
+        )
+
+        def submit(dirname):
+            self._pending += 1
+            pool.submit(self._scan_dir, dirname).add_done_callback(results.put)
+
+        self.files_found = 0
+        self.dirs_scanned = 0
+        self._started = time.perf_counter()
+        self._finished = None
+        try:
+            submit(self.splice_root)
+            while self._pending:
+                dirname, subdirs, files = results.get().result()
+                self._pending -= 1
+                self.dirs_scanned += 1
+                for subdir in subdirs:
+                    submit(subdir)
+                for entry in files:
+                    self.files_found += 1
+                    yield dirname, entry
+        finally:
+            self._finished = time.perf_counter()
+            self._pending = 0
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def crawl(self):
+        """Yield (dirname, filename) for every sample file under the root.
+
+        Feed the result to SampleTable.extend.
+        """
+        for dirname, entry in self.walk():
+            yield dirname, entry.name
@@ -0,0 +1,166 @@
+"""
+This file defines the Decimator class.
+
+A Decimator summarizes any window of an AudioSource as a number of bars,
+each with the min, max and RMS of every sample it covers, instead of the
+one sample per bar the oscilloscope used to pick. Narrow windows are
+reduced straight from the samples. Wider ones are reduced from a pyramid
+of per-block min, max and mean square, level 0 having one entry per BLOCK
+frames and every further level merging FACTOR entries of the one below.
+The level used has between one and FACTOR entries per bar, so a frame
+costs O(bars) at any zoom. The pyramid takes about 3 / BLOCK of the float32
+audio. It is built on a background thread, reading the source once in
+chunks through its own handle, so a long or compressed file never stalls a
+frame; until it is ready, wide windows are drawn as silence.
+
+The peak records of peaks.py are not used here: they are keyed by content
+digest, which would mean hashing the file first, and keep no RMS.
+
+"""
+
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+BLOCK = 64
+FACTOR = 4
+CHUNK_BLOCKS = 4096
+
+Level = Tuple[np.ndarray, np.ndarray, np.ndarray]  # lows, highs, mean squares
+
+
+def _reduce(level: Level, offsets: np.ndarray) -> Level:
+    """Merge the entries of LEVEL starting at each of OFFSETS."""
+    lows, highs, squares = level
+    counts = np.diff(np.append(offsets, len(lows)))
+    return (
+        np.minimum.reduceat(lows, offsets),
+        np.maximum.reduceat(highs, offsets),
+        (np.add.reduceat(squares, offsets, dtype=np.float64) / counts).astype(
+            np.float32
+        ),
+    )
+
+
+class Decimator:
+    """Per-bar min/max/RMS of windows of SOURCE.
+
+    ON_READY is called from the building thread once the pyramid is built.
+    """
+
+    def __init__(
+        self,
+        source,
+        block: int = BLOCK,
+        factor: int = FACTOR,
+        on_ready: Optional[Callable[[], None]] = None,
+    ):
+        self.source = source
+        self.block = block
+        self.factor = factor
+        self.on_ready = on_ready
+        self._levels = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._levels is not None
+
+    def start(self):
+        """Start building the pyramid in the background, if not started yet."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="Decimator", daemon=True
+                )
+                self._thread.start()
+
+    def wait(self):
+        """Block until the pyramid is built, starting it if needed."""
+        self.start()
+        self._thread.join()
+
+    @property
+    def levels(self) -> List[Level]:
+        """The pyramid, finest level first; waits for it to be built."""
+        self.wait()
+        return self._levels
+
+    def _run(self):
+        # AudioSources seek and cache per handle, so read through a new one.
+        reopen = getattr(self.source, "reopen", None)
+        source = reopen() if reopen is not None else self.source
+        try:
+            levels = self._build(source)
+        finally:
+            if source is not self.source:
+                source.close()
+        self._levels = levels
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def _build(self, source) -> List[Level]:
+        lows, highs, squares = [], [], []
+        step = self.block * CHUNK_BLOCKS
+        for start in range(0, len(source), step):
+            chunk = np.asarray(source[start : start + step], dtype=np.float32)
+            offsets = np.arange(0, len(chunk), self.block)
+            low, high, square = _reduce((chunk, chunk, chunk * chunk), offsets)
+            lows.append(low)
+            highs.append(high)
+            squares.append(square)
+        if not lows:
+            return []
+
+        levels = [
+            (np.concatenate(lows), np.concatenate(highs), np.concatenate(squares))
+        ]
+        while len(levels[-1][0]) > 1:
+            offsets = np.arange(0, len(levels[-1][0]), self.factor)
+            levels.append(_reduce(levels[-1], offsets))
+        return levels
+
+    def bars(
+        self, start: int, stop: int, n_bars: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the (lows, highs, rms) of N_BARS bars over frames START:STOP.
+
+        Bars outside the source are silent, and so are all bars wider than
+        a block while the pyramid is being built.
+        """
+        out = np.zeros((3, max(n_bars, 0)), dtype=np.float32)
+        if n_bars <= 0:
+            return out[0], out[1], out[2]
+        frames = len(self.source)
+        span = max(stop - start, 1) / n_bars
+        edges = np.round(start + np.arange(n_bars + 1) * span).astype(np.int64)
+        edges = np.clip(edges, 0, frames)
+
+        if span < self.block or not frames:
+            first = int(edges[0])
+            chunk = np.asarray(self.source[first : int(edges[-1])], dtype=np.float32)
+            level, offsets = (chunk, chunk, chunk * chunk), edges - first
+        elif not self.ready:
+            self.start()
+            return out[0], out[1], out[2]
+        else:
+            # The coarsest level with at least one entry per bar.
+            index = int(np.log(span / self.block) / np.log(self.factor) + 1e-9)
+            index = min(index, len(self._levels) - 1)
+            size = self.block * self.factor**index
+            level, offsets = self._levels[index], edges // size
+            offsets[edges == frames] = len(level[0])  # past the partial last entry
+
+        present = offsets[1:] > offsets[:-1]
+        if present.any():
+            starts = offsets[:-1][present]
+            # reduceat runs up to the next start, so close the last bar too.
+            bounds = np.append(starts, offsets[1:][present][-1])
+            first, last = int(bounds[0]), int(bounds[-1])
+            window = tuple(values[first:last] for values in level)
+            reduced = _reduce(window, bounds[:-1] - first)
+            out[:, present] = reduced
+            out[2, present] = np.sqrt(reduced[2])
+        return out[0], out[1], out[2]
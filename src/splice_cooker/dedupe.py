@@ -0,0 +1,63 @@
+"""
+This file contains content-addressed deduplication of the copy step.
+
+Splice packs often ship byte-identical one-shots under different names.
+find_duplicates groups the classified samples by content digest (see
+splice_cooker.content_hash). make_plan then plans one physical copy per
+group and every other destination in the group as a hard link or reflink
+to it, which PlanExecutor makes with link_file and counts in DedupeStats.
+
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from splice_cooker.copier import clone_file
+from splice_cooker.samples import SampleTable
+
+LINK_MODES = ("hardlink", "reflink")
+
+
+@dataclass
+class DedupeStats:
+    groups: int = 0
+    duplicates: int = 0
+    linked: int = 0
+    failed: int = 0
+    bytes_saved: int = 0
+
+    def __str__(self):
+        return (
+            f"{self.groups} duplicate groups, {self.duplicates} duplicates "
+            f"({self.linked} linked, {self.failed} failed), "
+            f"{self.bytes_saved / 1e6:.1f} MB saved"
+        )
+
+
+def find_duplicates(
+    sample_list: SampleTable, digests: Sequence[Optional[bytes]]
+) -> Dict[bytes, List[int]]:
+    """Return {digest: sample indices} for every digest shared by 2+ samples.
+
+    Only samples with a planned newdir take part, since only those are copied.
+    """
+    groups = {}
+    for sample in sample_list:
+        digest = digests[sample.index]
+        if digest is not None and sample.newdir is not None:
+            groups.setdefault(digest, []).append(sample.index)
+    return {digest: indices for digest, indices in groups.items() if len(indices) > 1}
+
+
+def link_file(src: str, dst: str, mode: str):
+    """Make DST share SRC's data, replacing whatever DST was."""
+    if mode == "reflink" and clone_file(src, dst):
+        return
+    tmp = f"{dst}.link.part"
+    try:
+        os.remove(tmp)  # left behind by an interrupted run
+    except FileNotFoundError:
+        pass
+    os.link(src, tmp)
+    os.replace(tmp, dst)
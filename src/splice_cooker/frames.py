@@ -0,0 +1,132 @@
+"""
+This file defines the FrameScheduler and FrameStats classes.
+
+FrameScheduler replaces redrawing at a fixed rate: frames are only drawn
+while the window is invalid. Input, window events and anything calling
+invalidate() make it invalid; so does every tick while the player is
+playing, since the audio position moved. Once a frame leaves nothing to
+redraw the tick is unscheduled, so an idle window draws no frames and
+wakes no timers until the next event. Run the app with
+pyglet.app.run(None) so pyglet does not redraw on its own schedule.
+
+FrameStats keeps the time spent per phase of the drawn frames (update,
+batch draw, dither pass...). These are CPU times: GL calls return once
+queued, so GPU time shows up in whichever phase next waits for it.
+
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable
+
+import pyglet
+
+# Window events that can change what is on screen.
+INVALIDATING_EVENTS = (
+    "on_expose",
+    "on_resize",
+    "on_show",
+    "on_key_press",
+    "on_key_release",
+    "on_mouse_motion",
+    "on_mouse_press",
+    "on_mouse_release",
+    "on_mouse_drag",
+    "on_mouse_scroll",
+    "on_mouse_leave",
+)
+
+
+class FrameStats:
+    """Per-phase timings of the frames drawn so far."""
+
+    def __init__(self):
+        self.frames = 0
+        self.totals = defaultdict(float)
+        self.worst = defaultdict(float)
+        self.started = perf_counter()
+
+    @contextmanager
+    def time(self, phase: str):
+        """Add the time spent in the with block to PHASE."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            self.totals[phase] += elapsed
+            self.worst[phase] = max(self.worst[phase], elapsed)
+
+    def mean(self, phase: str) -> float:
+        """Return the mean seconds per drawn frame spent in PHASE."""
+        return self.totals[phase] / self.frames if self.frames else 0.0
+
+    def report(self) -> str:
+        elapsed = perf_counter() - self.started
+        phases = ", ".join(
+            f"{phase} {self.mean(phase) * 1e3:.2f} ms "
+            f"(worst {self.worst[phase] * 1e3:.2f})"
+            for phase in self.totals
+        )
+        return (
+            f"Frames: {self.frames} in {elapsed:.1f} s "
+            f"({self.frames / elapsed if elapsed else 0:.1f} fps); {phases}"
+        )
+
+
+class FrameScheduler:
+    """Calls UPDATE and redraws WINDOW only while something changed.
+
+    PLAYER is polled each tick for whether audio is playing.
+    """
+
+    def __init__(
+        self,
+        window,
+        player,
+        update: Callable[[float], None],
+        interval: float = 1 / 60,
+        stats: FrameStats = None,
+    ):
+        self.window = window
+        self.player = player
+        self.update = update
+        self.interval = interval
+        self.stats = stats or FrameStats()
+        self.dirty = False
+        self.ticking = False
+        self.window.push_handlers(
+            **{event: self._on_event for event in INVALIDATING_EVENTS}
+        )
+        self.invalidate()
+
+    def _on_event(self, *args):
+        self.invalidate()  # returns None, so other handlers still run
+
+    def invalidate(self):
+        """Redraw on the next tick, resuming ticks if they were stopped."""
+        self.dirty = True
+        if not self.ticking:
+            self.ticking = True
+            pyglet.clock.schedule_interval(self.tick, self.interval)
+
+    def tick(self, dt: float):
+        if self.player is not None and self.player.playing:
+            self.dirty = True  # the audio position moved
+        if not self.dirty:
+            pyglet.clock.unschedule(self.tick)
+            self.ticking = False
+            return
+        self.dirty = False
+        with self.stats.time("update"):
+            self.update(dt)
+        self.window.draw(dt)
+        self.stats.frames += 1
+
+    def stop(self):
+        pyglet.clock.unschedule(self.tick)
+        self.ticking = False
+        self.window.remove_handlers(
+            **{event: self._on_event for event in INVALIDATING_EVENTS}
+        )
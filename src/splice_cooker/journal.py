@@ -0,0 +1,143 @@
+"""
+This file defines the Journal class.
+
+Journal is a write-ahead log of finished plan operations. PlanExecutor
+appends every operation as soon as it completes, and the log is fsynced in
+batches (every SYNC_EVERY entries or SYNC_INTERVAL seconds, whichever comes
+first) rather than once per file. Reopening a journal after a crash reads it
+once, so a restarted run skips the work already done in time proportional
+to the journal and never copies a finished file again. Copies are renamed
+into place only when complete, so a journaled destination is never a
+partial file; at most the last unsynced batch is redone.
+
+The first line of a journal names the plan it belongs to (a digest of the
+plan file), and a journal left by any other plan is discarded on open. Once
+a plan has run to the end its journal is deleted, so only an interrupted
+run is ever resumed.
+
+"""
+
+import json
+import os
+import time
+from typing import Optional, Set
+
+from splice_cooker.content_hash import hash_file
+from splice_cooker.plan import Operation
+
+DONE_STATUSES = ("copied", "skipped", "linked")
+
+_encode_line = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def plan_digest(path) -> str:
+    """Return the digest identifying the plan file at PATH."""
+    return hash_file(path).hex()
+
+
+class Journal:
+    """Append-only record of completed Operations of PLAN at PATH."""
+
+    def __init__(
+        self,
+        path,
+        plan: Optional[str] = None,
+        sync_every: int = 1000,
+        sync_interval: float = 1.0,
+    ):
+        self.path = os.fspath(path)
+        self.plan = plan
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.done: Set[Operation] = set()
+        self.syncs = 0
+        self.discarded = False
+        self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+        if not self._file.tell():
+            self._file.write(_encode_line({"plan": self.plan}))
+            self._file.write("\n")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _load(self):
+        try:
+            f = open(self.path, "r+", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            header = f.readline()
+            try:
+                matches = header.endswith("\n") and (
+                    json.loads(header)["plan"] == self.plan
+                )
+            except (ValueError, KeyError, TypeError):
+                matches = False
+            if not matches:
+                # Another plan's (or an unreadable) journal: start afresh.
+                self.discarded = bool(header)
+                f.truncate(0)
+                return
+            valid = len(header.encode("utf-8"))
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # a torn write from a crash: only ever the last line
+                try:
+                    entry = json.loads(line)
+                    entry.pop("status")
+                    self.done.add(Operation(**entry))
+                except (ValueError, KeyError, TypeError):
+                    break
+                valid += len(line.encode("utf-8"))
+            f.truncate(valid)
+
+    def __contains__(self, operation: Operation) -> bool:
+        return operation in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def record(self, operation: Operation, status: str):
+        """Log OPERATION if STATUS means it is finished."""
+        if status not in DONE_STATUSES:
+            return
+        entry = {**operation.to_dict(), "status": status}
+        self._file.write(_encode_line(entry))
+        self._file.write("\n")
+        self.done.add(operation)
+        self._pending += 1
+        if (
+            self._pending >= self.sync_every
+            or time.monotonic() - self._last_sync >= self.sync_interval
+        ):
+            self.sync()
+
+    def sync(self):
+        """Make every recorded operation durable."""
+        if self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.syncs += 1
+            self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+
+    def remove(self):
+        """Close and delete the journal, once its plan has been fully run."""
+        self._file.close()
+        self._pending = 0
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
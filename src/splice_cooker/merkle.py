@@ -0,0 +1,204 @@
+"""
+This file defines the MerkleTree class.
+
+MerkleTree fingerprints a sample catalog one directory at a time. Every
+sample record is hashed with hash_utils.get_hash, and every directory's hash
+covers the hashes of its records and of its subdirectories. Two snapshots of
+a library are compared from the root down, descending only into subtrees
+whose hash changed, so diffing a library where one pack changed touches
+that pack and its ancestors and nothing else.
+
+Snapshots are saved as JSON with a format version, so one written by any
+Python version loads (or is rejected with ValueError) the same way.
+
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from splice_cooker.catalog import FileStat
+from splice_cooker.hash_utils import get_hash, get_hashes
+from splice_cooker.samples import RECORD_FIELDS, SampleTable
+
+_SNAPSHOT_VERSION = 1
+
+# Status only tracks copy progress, it doesn't describe the sample.
+LEAF_FIELDS = tuple(name for name in RECORD_FIELDS if name != "status")
+
+
+class MerkleNode:
+    """One directory: its own records' hashes and its subdirectories."""
+
+    __slots__ = ("hash", "files", "children")
+
+    def __init__(self):
+        self.hash = b""
+        self.files: Dict[str, bytes] = {}
+        self.children: Dict[str, MerkleNode] = {}
+
+    def seal(self) -> bytes:
+        """Compute the hashes of this subtree bottom-up and return the root's."""
+        children = {name: child.seal().hex() for name, child in self.children.items()}
+        files = {name: digest.hex() for name, digest in self.files.items()}
+        self.hash = get_hash({"dirs": children, "files": files})
+        return self.hash
+
+    def walk(self, path: str):
+        """Yield (dirpath, filename) for every file in this subtree."""
+        for filename in self.files:
+            yield path, filename
+        for name, child in self.children.items():
+            yield from child.walk(os.path.join(path, name))
+
+    def _dump(self):
+        return [
+            self.hash.hex(),
+            {name: digest.hex() for name, digest in self.files.items()},
+            {name: child._dump() for name, child in self.children.items()},
+        ]
+
+    @classmethod
+    def _load(cls, dumped) -> "MerkleNode":
+        node = cls()
+        node_hash, files, children = dumped
+        node.hash = bytes.fromhex(node_hash)
+        node.files = {name: bytes.fromhex(digest) for name, digest in files.items()}
+        node.children = {name: cls._load(child) for name, child in children.items()}
+        return node
+
+
+@dataclass
+class MerkleDiff:
+    """Result of MerkleTree.diff, as absolute file paths."""
+
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    nodes_visited: int = 0
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __str__(self):
+        return (
+            f"{len(self.added)} added, {len(self.removed)} removed, "
+            f"{len(self.changed)} changed ({self.nodes_visited} directories compared)"
+        )
+
+
+def record_hashes(
+    sample_list: SampleTable, stats: Optional[Dict[str, FileStat]] = None
+) -> List[bytes]:
+    """Return get_hash of every sample record, in table order.
+
+    With STATS, as returned by SampleCatalog.known_stats, each record also
+    covers its file's size, mtime and inode, so edited files show up as
+    changed even if their classification didn't change.
+    """
+    rows = []
+    for sample in sample_list:
+        row = tuple(getattr(sample, name) for name in LEAF_FIELDS)
+        if stats is not None:
+            row += tuple(stats.get(sample.path, ()))
+        rows.append(row)
+    return get_hashes(rows)
+
+
+class MerkleTree:
+    """Per-directory fingerprints of the samples under SPLICE_ROOT."""
+
+    def __init__(self, splice_root, root: MerkleNode = None):
+        self.splice_root = os.fspath(splice_root)
+        self.root = root or MerkleNode()
+
+    @property
+    def hash(self) -> bytes:
+        return self.root.hash
+
+    @classmethod
+    def build(
+        cls,
+        sample_list: SampleTable,
+        splice_root,
+        stats: Optional[Dict[str, FileStat]] = None,
+    ) -> "MerkleTree":
+        tree = cls(splice_root)
+        nodes = {}
+        for sample, digest in zip(sample_list, record_hashes(sample_list, stats)):
+            origdir = sample.origdir
+            node = nodes.get(origdir)
+            if node is None:
+                node = nodes[origdir] = tree._node(origdir)
+            node.files[sample.filename] = digest
+        tree.root.seal()
+        return tree
+
+    def _node(self, dirname: str) -> MerkleNode:
+        node = self.root
+        relpath = os.path.relpath(dirname, self.splice_root)
+        if relpath != os.curdir:
+            for name in relpath.split(os.sep):
+                child = node.children.get(name)
+                if child is None:
+                    child = node.children[name] = MerkleNode()
+                node = child
+        return node
+
+    def diff(self, new: "MerkleTree") -> MerkleDiff:
+        """Return what changed going from this snapshot to NEW."""
+        result = MerkleDiff()
+        self._diff(self.root, new.root, new.splice_root, result)
+        return result
+
+    def _diff(self, old: MerkleNode, new: MerkleNode, path: str, result: MerkleDiff):
+        result.nodes_visited += 1
+        if old.hash == new.hash:
+            return
+
+        for filename, digest in new.files.items():
+            old_digest = old.files.get(filename)
+            if old_digest is None:
+                result.added.append(os.path.join(path, filename))
+            elif old_digest != digest:
+                result.changed.append(os.path.join(path, filename))
+        result.removed.extend(
+            os.path.join(path, filename)
+            for filename in old.files
+            if filename not in new.files
+        )
+
+        for name, child in new.children.items():
+            subpath = os.path.join(path, name)
+            old_child = old.children.get(name)
+            if old_child is None:
+                result.added.extend(os.path.join(*f) for f in child.walk(subpath))
+            else:
+                self._diff(old_child, child, subpath, result)
+        for name, old_child in old.children.items():
+            if name not in new.children:
+                subpath = os.path.join(path, name)
+                result.removed.extend(os.path.join(*f) for f in old_child.walk(subpath))
+
+    def save(self, path):
+        snapshot = {
+            "version": _SNAPSHOT_VERSION,
+            "splice_root": self.splice_root,
+            "root": self.root._dump(),
+        }
+        with open(path, "w", encoding="utf-8", errors="surrogateescape") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path) -> "MerkleTree":
+        """Load a snapshot written by save; raise ValueError if it isn't one."""
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            snapshot = json.load(f)
+        version = snapshot.get("version") if isinstance(snapshot, dict) else None
+        if version != _SNAPSHOT_VERSION:
+            raise ValueError(
+                f"Snapshot {os.fspath(path)} has version {version}, "
+                f"expected {_SNAPSHOT_VERSION}."
+            )
+        return cls(snapshot["splice_root"], MerkleNode._load(snapshot["root"]))
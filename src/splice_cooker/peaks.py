@@ -0,0 +1,354 @@
+"""
+This file defines the PeakCache and PeakBuilder classes.
+
+A peak record is a multi-resolution min/max summary of one sample's
+waveform, all channels combined: level 0 has one (min, max) pair of signed
+bytes per BLOCK frames, and every further level merges FACTOR pairs of the
+one below, down to a single pair. A ten second loop takes a few kilobytes,
+and a thumbnail of any width is drawn from the level closest to it without
+touching the audio.
+
+PeakBuilder computes records on a process pool. Uncompressed WAV/AIFF data
+is read straight from the file with the offsets found by audio_info, keeping
+only the most significant byte of each sample, so no decoder is involved;
+other formats fall back to librosa. PeakCache stores the records in one
+append-only pack file keyed by content digest and serves them as
+memoryviews into an mmap of it, so a browser can show thousands of
+thumbnails from a single mapping.
+
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from splice_cooker.audio_info import parse_audio_info
+from splice_cooker.samples import SampleTable
+
+BLOCK = 256
+FACTOR = 4
+
+# magic, record length, key, frames, sample rate, channels, block, factor,
+# number of levels; followed by one uint32 count per level, then the levels.
+_HEADER = struct.Struct("<4sI16sQIHHBB2x")
+_MAGIC = b"PEAK"
+_KEY_SIZE = 16
+
+# Offset binary <-> two's complement for single bytes.
+_FLIP = bytes(i ^ 0x80 for i in range(256))
+
+PeakData = Tuple[int, int, int, List[bytes]]  # frames, rate, channels, levels
+
+
+def _key(digest: bytes) -> bytes:
+    return digest[:_KEY_SIZE].ljust(_KEY_SIZE, b"\0")
+
+
+class Peaks:
+    """Peak levels of one sample.
+
+    LEVELS are signed byte memoryviews of interleaved (min, max) pairs,
+    finest first.
+    """
+
+    __slots__ = ("frames", "samplerate", "channels", "block", "factor", "levels")
+
+    def __init__(self, frames, samplerate, channels, block, factor, levels):
+        self.frames = frames
+        self.samplerate = samplerate
+        self.channels = channels
+        self.block = block
+        self.factor = factor
+        self.levels = levels
+
+    def frames_per_peak(self, level: int) -> int:
+        return self.block * self.factor**level
+
+    def level_for(self, width: int) -> int:
+        """Return the coarsest level with at least WIDTH peaks."""
+        for level in range(len(self.levels) - 1, -1, -1):
+            if len(self.levels[level]) // 2 >= width:
+                return level
+        return 0
+
+    def thumbnail(self, width: int) -> List[Tuple[int, int]]:
+        """Return WIDTH (min, max) pairs spanning the whole sample."""
+        data = self.levels[self.level_for(width)]
+        count = len(data) // 2
+        if not count:
+            return [(0, 0)] * width
+        lows, highs = data[0::2], data[1::2]
+        columns = []
+        for column in range(width):
+            start = column * count // width
+            stop = max((column + 1) * count // width, start + 1)
+            columns.append((min(lows[start:stop]), max(highs[start:stop])))
+        return columns
+
+
+def _merge(lows: list, highs: list, factor: int) -> Tuple[list, list]:
+    return (
+        [min(lows[i : i + factor]) for i in range(0, len(lows), factor)],
+        [max(highs[i : i + factor]) for i in range(0, len(highs), factor)],
+    )
+
+
+def _levels(lows: list, highs: list, factor: int) -> List[bytes]:
+    """Build every level from level 0 given as offset-binary LOWS and HIGHS."""
+    levels = []
+    while True:
+        pairs = bytearray(2 * len(lows))
+        pairs[0::2] = bytes(lows)
+        pairs[1::2] = bytes(highs)
+        levels.append(bytes(pairs.translate(_FLIP)))
+        if len(lows) <= 1:
+            return levels
+        lows, highs = _merge(lows, highs, factor)
+
+
+def _block_peaks(values, step: int) -> Tuple[list, list]:
+    lows, highs = [], []
+    for start in range(0, len(values), step):
+        chunk = values[start : start + step]
+        lows.append(min(chunk))
+        highs.append(max(chunk))
+    return lows, highs
+
+
+def _to_offset(value: float) -> int:
+    return min(255, max(0, round(value * 127) + 128))
+
+
+def _pcm_peaks(view, info, block: int, factor: int) -> List[bytes]:
+    width, channels = info.sample_width, info.channels
+    size = min(info.data_size, len(view) - info.data_offset)
+    data = view[info.data_offset : info.data_offset + size - size % width]
+    step = block * channels
+
+    if info.encoding == "float":
+        samples = array("f" if width == 4 else "d", data)
+        if info.big_endian != (sys.byteorder == "big"):
+            samples.byteswap()
+        lows, highs = _block_peaks(samples, step)
+        return _levels(
+            [_to_offset(v) for v in lows], [_to_offset(v) for v in highs], factor
+        )
+
+    # The most significant byte of each sample, as offset binary: min and
+    # max of those are exactly the top bytes of the real min and max.
+    top = data[0::width] if info.big_endian else data[width - 1 :: width]
+    if not (width == 1 and info.format == "wav"):  # 8-bit WAV is unsigned
+        top = top.translate(_FLIP)
+    return _levels(*_block_peaks(top, step), factor)
+
+
+def _decoded_peaks(path: str, block: int, factor: int) -> Optional[PeakData]:
+    """Fallback for compressed formats: decode with librosa."""
+    try:
+        import librosa
+    except ImportError:
+        return None
+    try:
+        samples, sr = librosa.load(path, sr=None, mono=False)
+    except Exception:
+        return None
+    channels = 1 if samples.ndim == 1 else samples.shape[0]
+    interleaved = samples.T.reshape(-1).tolist()
+    lows, highs = _block_peaks(interleaved, block * channels)
+    levels = _levels(
+        [_to_offset(v) for v in lows], [_to_offset(v) for v in highs], factor
+    )
+    return len(interleaved) // channels, sr, channels, levels
+
+
+def compute_peaks(
+    path: str, block: int = BLOCK, factor: int = FACTOR
+) -> Optional[PeakData]:
+    """Return (frames, samplerate, channels, levels) for PATH.
+
+    Returns None if PATH is not audio that can be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                info = parse_audio_info(view)
+                if info is None or info.encoding is None:
+                    return _decoded_peaks(path, block, factor)
+                if (
+                    not info.channels
+                    or not info.sample_width
+                    or info.data_offset is None
+                ):
+                    return None
+                levels = _pcm_peaks(view, info, block, factor)
+    except (OSError, ValueError, ArithmeticError, struct.error):
+        # A bad header must not take down the pool running the builder.
+        return None
+    frames = info.data_size // (info.sample_width * info.channels)
+    return frames, info.samplerate, info.channels, levels
+
+
+def _peak_worker(args) -> Optional[PeakData]:
+    path, block, factor = args
+    return compute_peaks(path, block, factor)
+
+
+class PeakCache:
+    """Append-only pack of peak records at PATH, keyed by content digest."""
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.index: Dict[bytes, int] = {}
+        self._file = open(self.path, "a+b")
+        self._map = None
+        self._load()
+
+    def _remap(self):
+        size = os.fstat(self._file.fileno()).st_size
+        # Peaks handed out earlier keep the old mapping alive until dropped.
+        self._map = (
+            mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+            if size
+            else b""
+        )
+
+    def _load(self):
+        self._remap()
+        view = self._map
+        offset = 0
+        while offset + _HEADER.size <= len(view):
+            magic, length, key, *_ = _HEADER.unpack_from(view, offset)
+            if magic != _MAGIC or offset + length > len(view):
+                break  # a torn append from a crash: only ever the last record
+            self.index[key] = offset
+            offset += length
+        if offset < len(view):
+            del view
+            self._map = b""
+            self._file.truncate(offset)
+            self._remap()
+
+    def __contains__(self, digest: bytes) -> bool:
+        return _key(digest) in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, digest: bytes, data: PeakData, block=BLOCK, factor=FACTOR):
+        """Append the peaks DATA of the file with content DIGEST."""
+        frames, samplerate, channels, levels = data
+        counts = struct.pack(f"<{len(levels)}I", *(len(lv) // 2 for lv in levels))
+        length = _HEADER.size + len(counts) + sum(map(len, levels))
+        header = _HEADER.pack(
+            _MAGIC,
+            length,
+            _key(digest),
+            frames,
+            samplerate,
+            channels,
+            block,
+            factor,
+            len(levels),
+        )
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(b"".join([header, counts, *levels]))
+        self.index[_key(digest)] = offset
+
+    def flush(self):
+        self._file.flush()
+
+    def get(self, digest: bytes) -> Optional[Peaks]:
+        """Return the Peaks of the file with content DIGEST, if cached."""
+        offset = self.index.get(_key(digest))
+        if offset is None:
+            return None
+        if offset + _HEADER.size > len(self._map):
+            self.flush()
+            self._remap()
+        view = memoryview(self._map)
+        _, _, _, frames, rate, channels, block, factor, n_levels = _HEADER.unpack_from(
+            view, offset
+        )
+        counts = struct.unpack_from(f"<{n_levels}I", view, offset + _HEADER.size)
+        start = offset + _HEADER.size + 4 * n_levels
+        levels = []
+        for count in counts:
+            levels.append(view[start : start + 2 * count].cast("b"))
+            start += 2 * count
+        return Peaks(frames, rate, channels, block, factor, levels)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PeakBuilder:
+    """Computes peak records on a process pool for files not yet in CACHE."""
+
+    def __init__(
+        self,
+        cache: PeakCache,
+        workers: int = None,
+        block: int = BLOCK,
+        factor: int = FACTOR,
+    ):
+        self.cache = cache
+        self.workers = workers
+        self.block = block
+        self.factor = factor
+        self.hits = 0
+        self.built = 0
+        self.failed = 0
+
+    def build_samples(
+        self, sample_list: SampleTable, digests: List[Optional[bytes]], progress=None
+    ) -> int:
+        """Build peaks for every sample whose content DIGEST is not cached.
+
+        DIGESTS are in table order (see ContentHasher.hash_samples); files
+        with the same content are read once. Returns the number built.
+        """
+        todo = {}
+        for sample, digest in zip(sample_list, digests):
+            if digest is None:
+                continue
+            if digest in self.cache:
+                self.hits += 1
+            else:
+                todo.setdefault(digest, sample.path)
+        if not todo:
+            return 0
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            results = pool.map(
+                _peak_worker,
+                ((path, self.block, self.factor) for path in todo.values()),
+                chunksize=8,
+            )
+            if progress is not None:
+                results = progress(results, total=len(todo))
+            for digest, data in zip(todo, results):
+                if data is None:
+                    self.failed += 1
+                    continue
+                self.cache.add(digest, data, self.block, self.factor)
+                self.built += 1
+        self.cache.flush()
+        return self.built
+
+    def report(self) -> str:
+        return (
+            f"Peaks: {self.hits} cached, {self.built} built, "
+            f"{self.failed} unreadable ({len(self.cache)} in cache)"
+        )
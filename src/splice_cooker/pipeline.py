@@ -0,0 +1,219 @@
+"""
+This file defines the Pipeline class.
+
+Pipeline runs scan, classify, hash and copy as concurrent stages connected
+by bounded asyncio queues, instead of finishing each stage over the whole
+library before starting the next. Samples flow through in SampleTable
+chunks of BATCH_SIZE rows: the crawler runs on a thread, classification
+and hashing on a process pool, and copies on CopyExecutor's threads, so
+the disks stay busy while the CPUs work and the other way round. A full
+queue blocks the stage feeding it, which keeps memory bounded by
+QUEUE_SIZE chunks per stage however large the library is.
+
+"""
+
+import asyncio
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from splice_cooker.classify import _classify_chunk
+from splice_cooker.content_hash import (
+    DEFAULT_ALGORITHM,
+    StatKey,
+    _hash_worker,
+    stat_key,
+)
+from splice_cooker.copier import CopyExecutor, CopyStats
+from splice_cooker.crawler import LibraryCrawler
+from splice_cooker.samples import SampleTable
+
+_DONE = None
+
+
+@dataclass
+class PipelineStats:
+    scanned: int = 0
+    classified: int = 0
+    hashed: int = 0
+    batches: int = 0
+    busy: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    elapsed: float = 0.0
+    copy: CopyStats = None
+
+    def __str__(self):
+        stages = ", ".join(f"{name} {busy:.1f} s" for name, busy in self.busy.items())
+        return (
+            f"{self.scanned} scanned, {self.hashed} hashed in {self.batches} "
+            f"batches; copy: {self.copy}; {self.elapsed:.1f} s wall ({stages} busy)"
+        )
+
+
+def _hash_chunk(args) -> List[Tuple[Optional[StatKey], Optional[bytes]]]:
+    """Process pool worker: stat, then hash, every path of one chunk."""
+    paths, algorithm = args
+    results = []
+    for path in paths:
+        try:
+            key = stat_key(os.stat(path))
+        except OSError:
+            results.append((None, None))
+            continue
+        results.append((key, _hash_worker((path, algorithm))))
+    return results
+
+
+class Pipeline:
+    """Streams the samples under SPLICE_ROOT into DEST_DIR.
+
+    ON_BATCH(chunk, digests, keys), if given, is called from the event loop's
+    thread for every chunk once it has been copied, e.g. to store the records
+    in a SampleCatalog and the digests in a HashCache. KEYS holds every file's
+    stat_key, taken before it was hashed (None if it could not be read).
+    """
+
+    def __init__(
+        self,
+        splice_root,
+        dest_dir,
+        ignore=(".DS_Store",),
+        copier: CopyExecutor = None,
+        algorithm: str = DEFAULT_ALGORITHM,
+        workers: int = None,
+        batch_size: int = 1000,
+        queue_size: int = 4,
+        on_batch: Callable[
+            [SampleTable, List[Optional[bytes]], List[Optional[StatKey]]], None
+        ] = None,
+    ):
+        self.splice_root = os.fspath(splice_root)
+        self.dest_dir = os.fspath(dest_dir)
+        self.ignore = ignore
+        self.copier = copier or CopyExecutor()
+        self.algorithm = algorithm
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.on_batch = on_batch
+        self.stats = PipelineStats(copy=self.copier.stats)
+        self._made_dirs = set()
+        self._stopping = False
+
+    def run(self) -> PipelineStats:
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> PipelineStats:
+        loop = asyncio.get_running_loop()
+        scanned = asyncio.Queue(self.queue_size)
+        classified = asyncio.Queue(self.queue_size)
+        hashed = asyncio.Queue(self.queue_size)
+        started = time.perf_counter()
+
+        with ProcessPoolExecutor(self.workers) as processes, ThreadPoolExecutor(
+            2, "pipeline"
+        ) as threads:
+
+            async def classify(chunk):
+                args = (chunk, self.splice_root, self.dest_dir)
+                chunk.import_meta(
+                    0, await loop.run_in_executor(processes, _classify_chunk, args)
+                )
+                self.stats.classified += len(chunk)
+                return chunk
+
+            async def hash_chunk(chunk):
+                args = ([sample.path for sample in chunk], self.algorithm)
+                results = await loop.run_in_executor(processes, _hash_chunk, args)
+                self.stats.hashed += len(chunk)
+                return chunk, results
+
+            async def copy(item):
+                chunk, results = item
+                await loop.run_in_executor(threads, self._copy, chunk)
+                if self.on_batch is not None:
+                    keys, digests = zip(*results) if results else ((), ())
+                    self.on_batch(chunk, list(digests), list(keys))
+
+            stages = [
+                self._scan(loop, threads, scanned),
+                self._stage("classify", scanned, classified, classify, 1),
+                self._stage("hash", classified, hashed, hash_chunk, self.workers),
+                self._stage("copy", hashed, None, copy, 1),
+            ]
+            tasks = [asyncio.ensure_future(stage) for stage in stages]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                self._stopping = True
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+        self.stats.elapsed = time.perf_counter() - started
+        return self.stats
+
+    async def _scan(self, loop, threads, outbox: asyncio.Queue):
+        def put(chunk):
+            # Blocks the crawler thread while the queue is full.
+            future = asyncio.run_coroutine_threadsafe(outbox.put(chunk), loop)
+            waited = time.perf_counter()
+            while True:
+                try:
+                    future.result(0.1)
+                    break
+                except FutureTimeoutError:
+                    if self._stopping:
+                        future.cancel()
+                        raise asyncio.CancelledError
+            return time.perf_counter() - waited
+
+        def scan():
+            started = time.perf_counter()
+            blocked = 0.0
+            chunk = SampleTable()
+            for dirname, filename in LibraryCrawler(
+                self.splice_root, self.ignore
+            ).crawl():
+                chunk.append(dirname, filename)
+                if len(chunk) >= self.batch_size:
+                    self.stats.scanned += len(chunk)
+                    blocked += put(chunk)
+                    chunk = SampleTable()
+            if len(chunk):
+                self.stats.scanned += len(chunk)
+                blocked += put(chunk)
+            self.stats.busy["scan"] += time.perf_counter() - started - blocked
+
+        await loop.run_in_executor(threads, scan)
+        await outbox.put(_DONE)
+
+    async def _stage(self, name, inbox, outbox, work, consumers: int):
+        async def consume():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    # Let the other consumers of this stage see it too.
+                    await inbox.put(_DONE)
+                    return
+                started = time.perf_counter()
+                result = await work(item)
+                self.stats.busy[name] += time.perf_counter() - started
+                if outbox is not None:
+                    await outbox.put(result)
+
+        await asyncio.gather(*(consume() for _ in range(consumers)))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    def _copy(self, chunk: SampleTable):
+        for newdir in chunk.newdirs.strings[1:]:
+            if newdir not in self._made_dirs:
+                os.makedirs(newdir, exist_ok=True)
+                self._made_dirs.add(newdir)
+        self.copier.copy_samples(chunk)
+        self.stats.batches += 1
@@ -0,0 +1,262 @@
+"""
+This file defines the move plan and the PlanExecutor class.
+
+Reorganizing a library happens in two stages. Planning turns classified
+samples into a list of Operations (copy SRC to DST, or link DST to an
+already planned copy) without touching the disk, using the sizes the
+SampleCatalog already knows and the digests from ContentHasher. The plan is
+written as JSON lines, one operation per line, so it can be streamed,
+reviewed and diffed. PlanExecutor then applies a plan: it reads it in
+batches, reorders each batch by source device and directory, creates the
+destination directories once, and hands the copies to a CopyExecutor.
+A link also names its own source, so if the copy it links to failed, the
+first such link is copied instead and the rest of its group link to that.
+
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+from splice_cooker.catalog import FileStat
+from splice_cooker.copier import CopyExecutor, CopyStats
+from splice_cooker.dedupe import LINK_MODES, DedupeStats, find_duplicates, link_file
+from splice_cooker.samples import SampleTable
+
+COPY = "copy"
+OPS = (COPY,) + LINK_MODES
+
+_encode_line = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+@dataclass(frozen=True)
+class Operation:
+    """One line of a plan.
+
+    For links, SRC is the destination of a copy and ORIGIN the sample's own
+    source, copied instead if SRC could not be made.
+    """
+
+    op: str
+    src: str
+    dst: str
+    size: Optional[int] = None
+    hash: Optional[str] = None
+    origin: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        rv = {
+            "op": self.op,
+            "src": self.src,
+            "dst": self.dst,
+            "size": self.size,
+            "hash": self.hash,
+        }
+        if self.origin is not None:
+            rv["origin"] = self.origin
+        return rv
+
+    def to_line(self) -> str:
+        return _encode_line(self.to_dict())
+
+    @classmethod
+    def from_line(cls, line: str) -> "Operation":
+        operation = cls(**json.loads(line))
+        if operation.op not in OPS:
+            raise ValueError(f"Unknown plan operation {operation.op!r}.")
+        return operation
+
+
+def make_plan(
+    sample_list: SampleTable,
+    stats: Optional[Dict[str, FileStat]] = None,
+    digests: Optional[Sequence[Optional[bytes]]] = None,
+    link_mode: Optional[str] = None,
+) -> Iterator[Operation]:
+    """Yield the operations that put every classified sample in its newdir.
+
+    STATS ({path: (size, mtime_ns, inode)}, see SampleCatalog.known_stats)
+    and DIGESTS (one per sample) only annotate the plan. With LINK_MODE
+    ("hardlink" or "reflink"), every sample whose digest was already planned
+    becomes a link to that copy; links come after all copies.
+    """
+    stats = stats or {}
+    followers = {}
+    if link_mode is not None and digests is not None:
+        for indices in find_duplicates(sample_list, digests).values():
+            for index in indices[1:]:
+                followers[index] = indices[0]
+
+    # Directories are interned, so join each one with os.sep only once.
+    src_dirs = [os.path.join(d, "") for d in sample_list.dirs.strings[1:]]
+    dst_dirs = [os.path.join(d, "") for d in sample_list.newdirs.strings[1:]]
+    dir_ids = sample_list.dir_id
+
+    def destination(index):
+        newdir_id = sample_list.newdir_id[index]
+        if newdir_id:
+            return dst_dirs[newdir_id - 1] + sample_list.filename(index)
+
+    links = []
+    for index in range(len(sample_list)):
+        dst = destination(index)
+        if dst is None:
+            continue
+        src = src_dirs[dir_ids[index] - 1] + sample_list.filename(index)
+        size = stats.get(src, (None,))[0]
+        digest = digests[index] if digests is not None else None
+        digest = digest.hex() if digest is not None else None
+
+        leader = followers.get(index)
+        if leader is None:
+            yield Operation(COPY, src, dst, size, digest)
+        else:
+            leader_dst = destination(leader)
+            if leader_dst != dst:
+                links.append(Operation(link_mode, leader_dst, dst, size, digest, src))
+    yield from links
+
+
+def write_plan(path, operations: Iterable[Operation]) -> int:
+    """Write OPERATIONS to PATH, one JSON line each. Returns the count."""
+    count = 0
+    tmp = f"{os.fspath(path)}.part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for operation in operations:
+            f.write(operation.to_line())
+            f.write("\n")
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+def read_plan(path) -> Iterator[Operation]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield Operation.from_line(line)
+
+
+class PlanExecutor:
+    """Applies a plan, BATCH_SIZE operations at a time.
+
+    With a JOURNAL (see splice_cooker.journal), operations it already lists
+    are skipped and every finished operation is added to it. The journal is
+    deleted once a plan has run to the end. Links are counted in DEDUPE.
+    """
+
+    def __init__(
+        self, copier: CopyExecutor = None, batch_size: int = 10_000, journal=None
+    ):
+        self.copier = copier or CopyExecutor()
+        self.batch_size = batch_size
+        self.journal = journal
+        self.dedupe = DedupeStats()
+        self.resumed = 0
+        self._groups = set()
+        self._leaders = {}  # link SRC whose copy failed -> member copied instead
+        self._made_dirs = set()
+        self._src_devices = {}
+
+    @property
+    def stats(self) -> CopyStats:
+        return self.copier.stats
+
+    def _locality(self, operation: Operation):
+        srcdir = os.path.dirname(operation.src)
+        device = self._src_devices.get(srcdir)
+        if device is None:
+            try:
+                device = os.stat(srcdir).st_dev
+            except OSError:
+                device = -1
+            self._src_devices[srcdir] = device
+        return (device, srcdir, operation.dst)
+
+    def _make_dirs(self, batch):
+        for operation in batch:
+            dstdir = os.path.dirname(operation.dst)
+            if dstdir not in self._made_dirs:
+                os.makedirs(dstdir, exist_ok=True)
+                self._made_dirs.add(dstdir)
+
+    def execute(self, operations: Iterable[Operation], on_done=None) -> CopyStats:
+        """Apply OPERATIONS. ON_DONE(operation, status) is called for each."""
+        journal = self.journal
+        if journal is not None:
+            user_on_done = on_done
+
+            def on_done(operation, status):
+                journal.record(operation, status)
+                if user_on_done is not None:
+                    user_on_done(operation, status)
+
+        batch = []
+        try:
+            for operation in operations:
+                if journal is not None and operation in journal:
+                    self.resumed += 1
+                    continue
+                batch.append(operation)
+                if len(batch) >= self.batch_size:
+                    self._execute_batch(batch, on_done)
+                    batch = []
+            if batch:
+                self._execute_batch(batch, on_done)
+        finally:
+            if journal is not None:
+                journal.sync()
+        if journal is not None:
+            journal.remove()  # nothing left to resume
+        return self.stats
+
+    def _execute_batch(self, batch, on_done):
+        batch.sort(key=self._locality)
+        self._make_dirs(batch)
+        copies = [op for op in batch if op.op == COPY]
+        self.copier.run(
+            ((op.src, op.dst, op) for op in copies),
+            None if on_done is None else lambda job, status: on_done(job[2], status),
+        )
+        for operation in batch:
+            if operation.op != COPY:
+                status = self._link(operation)
+                if on_done is not None:
+                    on_done(operation, status)
+
+    def _link(self, operation: Operation) -> str:
+        stats = self.dedupe
+        if operation.src not in self._groups:
+            self._groups.add(operation.src)
+            stats.groups += 1
+        target = self._leaders.get(operation.src, operation.src)
+        if not os.path.exists(target) and operation.origin is not None:
+            # The group's copy failed: copy this member, and lead with it.
+            statuses = []
+            self.copier.run(
+                [(operation.origin, operation.dst)],
+                lambda job, status: statuses.append(status),
+            )
+            if statuses and statuses[0] != "failed":
+                self._leaders[operation.src] = operation.dst
+            return statuses[0] if statuses else "failed"
+
+        stats.duplicates += 1
+        try:
+            if not (
+                os.path.exists(operation.dst)
+                and os.path.samefile(target, operation.dst)
+            ):
+                link_file(target, operation.dst, operation.op)
+            size = os.stat(target).st_size
+        except OSError as e:
+            print(f"Link failed: {target} -> {operation.dst}: {e}")
+            stats.failed += 1
+            return "failed"
+        stats.linked += 1
+        stats.bytes_saved += size
+        return "linked"
+
+    def report(self) -> str:
+        return f"{self.stats}; {self.dedupe}; {self.resumed} already done"
@@ -0,0 +1,410 @@
+"""
+This file defines the SampleTable class and its Sample record view.
+
+A Splice library has hundreds of thousands of files but only a handful of
+distinct directories, sample types, drum types and instrument types. Instead
+of a dict per file, SampleTable stores one column per field: filenames are
+packed into a single UTF-8 buffer, directories are interned, and enum-like
+fields are small integer codes. Sample is a lightweight view onto one row
+with the same field names the old sample dicts used.
+
+"""
+
+import os
+from array import array
+
+SAMPLE_TYPES = (
+    None,
+    "One Shot",
+    "Melodic Loop",
+    "Perc Loop",
+    "Percussion Loop",
+    "Spoken Loop",
+    "Break",
+)
+DRUM_TYPES = (None, "Kick", "Snare", "Cymbal", "Hat", "Ride", "Crash", "Perc")
+INST_TYPES = (
+    None,
+    "Bass",
+    "Keys",
+    "Synth",
+    "Brass",
+    "Woodwind",
+    "Strings",
+    "FX",
+    "Vox",
+)
+STATUSES = ("not_moved", "copied", "skipped", "failed", "linked")
+
+RECORD_FIELDS = (
+    "filename",
+    "origdir",
+    "newdir",
+    "sampletype",
+    "isdrum",
+    "drumtype",
+    "isinst",
+    "insttype",
+    "key",
+    "bpm",
+    "status",
+    "sample_match_failed",
+    "samplerate",
+    "channels",
+    "bitdepth",
+    "frames",
+    "loop_start",
+    "loop_end",
+    "root_note",
+    "beats",
+)
+
+# Columns filled in by classification, as opposed to the file's identity
+# (filename and origdir).
+META_COLUMNS = (
+    ("newdir_id", "newdirs"),
+    ("key_id", "keys"),
+    ("bpm_value", None),
+    ("sampletype_code", None),
+    ("drumtype_code", None),
+    ("insttype_code", None),
+    ("status_code", None),
+    ("isdrum_value", None),
+    ("isinst_value", None),
+    ("flags", None),
+)
+
+# Columns read from the file's headers (see splice_cooker.audio_info), with
+# the value that stands for "unknown".
+AUDIO_COLUMNS = (
+    ("samplerate", "I", 0),
+    ("channels", "H", 0),
+    ("bitdepth", "H", 0),
+    ("frames", "Q", 0),
+    ("loop_start", "q", -1),
+    ("loop_end", "q", -1),
+    ("root_note", "b", -1),
+    ("beats", "I", 0),
+)
+
+_MATCH_FAILED = 1
+
+
+class StringPool:
+    """Interns strings as small integer ids. Id 0 is reserved for None."""
+
+    def __init__(self):
+        self.strings = [None]
+        self.ids = {None: 0}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, string_id: int):
+        return self.strings[string_id]
+
+    def intern(self, string) -> int:
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string_id = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+
+def _pool_of(strings) -> StringPool:
+    pool = StringPool()
+    for string in strings[1:]:
+        pool.intern(string)
+    return pool
+
+
+def _remap(ids: array, source: StringPool, target: StringPool) -> array:
+    """Translate string ids from the SOURCE pool into the TARGET pool."""
+    translate = [target.intern(string) for string in source.strings]
+    return array(ids.typecode, map(translate.__getitem__, ids))
+
+
+class _Coded:
+    """Sample field stored as an index into a fixed tuple of VALUES."""
+
+    def __init__(self, column: str, values: tuple):
+        self.column = column
+        self.values = values
+        self.codes = {value: code for code, value in enumerate(values)}
+
+    def __get__(self, sample, owner=None):
+        if sample is None:
+            return self
+        return self.values[getattr(sample.table, self.column)[sample.index]]
+
+    def __set__(self, sample, value):
+        getattr(sample.table, self.column)[sample.index] = self.codes[value]
+
+
+class _Interned:
+    """Sample field stored as an id into one of the table's StringPools."""
+
+    def __init__(self, column: str, pool: str):
+        self.column = column
+        self.pool = pool
+
+    def __get__(self, sample, owner=None):
+        if sample is None:
+            return self
+        table = sample.table
+        return getattr(table, self.pool)[getattr(table, self.column)[sample.index]]
+
+    def __set__(self, sample, value):
+        table = sample.table
+        getattr(table, self.column)[sample.index] = getattr(table, self.pool).intern(
+            value
+        )
+
+
+class _Flag:
+    """Boolean sample field stored as one bit of the flags column."""
+
+    def __init__(self, bit: int):
+        self.bit = bit
+
+    def __get__(self, sample, owner=None):
+        if sample is None:
+            return self
+        return bool(sample.table.flags[sample.index] & self.bit)
+
+    def __set__(self, sample, value):
+        flags = sample.table.flags
+        if value:
+            flags[sample.index] |= self.bit
+        else:
+            flags[sample.index] &= ~self.bit
+
+
+class _TriState:
+    """Sample field that is True, False or None (unknown), stored as 1/0/-1."""
+
+    def __init__(self, column: str):
+        self.column = column
+
+    def __get__(self, sample, owner=None):
+        if sample is None:
+            return self
+        value = getattr(sample.table, self.column)[sample.index]
+        return None if value < 0 else bool(value)
+
+    def __set__(self, sample, value):
+        getattr(sample.table, self.column)[sample.index] = (
+            -1 if value is None else int(bool(value))
+        )
+
+
+class _Number:
+    """Sample field stored in a numeric column, with UNSET meaning None."""
+
+    def __init__(self, column: str, unset):
+        self.column = column
+        self.unset = unset
+
+    def __get__(self, sample, owner=None):
+        if sample is None:
+            return self
+        value = getattr(sample.table, self.column)[sample.index]
+        return None if value == self.unset else value
+
+    def __set__(self, sample, value):
+        getattr(sample.table, self.column)[sample.index] = (
+            self.unset if value is None else value
+        )
+
+
+class Sample:
+    """View onto one row of a SampleTable."""
+
+    __slots__ = ("table", "index")
+
+    origdir = _Interned("dir_id", "dirs")
+    newdir = _Interned("newdir_id", "newdirs")
+    key = _Interned("key_id", "keys")
+    sampletype = _Coded("sampletype_code", SAMPLE_TYPES)
+    drumtype = _Coded("drumtype_code", DRUM_TYPES)
+    insttype = _Coded("insttype_code", INST_TYPES)
+    status = _Coded("status_code", STATUSES)
+    isdrum = _TriState("isdrum_value")
+    isinst = _TriState("isinst_value")
+    sample_match_failed = _Flag(_MATCH_FAILED)
+    samplerate = _Number("samplerate_value", 0)
+    channels = _Number("channels_value", 0)
+    bitdepth = _Number("bitdepth_value", 0)
+    frames = _Number("frames_value", 0)
+    loop_start = _Number("loop_start_value", -1)
+    loop_end = _Number("loop_end_value", -1)
+    root_note = _Number("root_note_value", -1)
+    beats = _Number("beats_value", 0)
+
+    def __init__(self, table, index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def filename(self) -> str:
+        return self.table.filename(self.index)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.origdir, self.filename)
+
+    @property
+    def bpm(self):
+        bpm = self.table.bpm_value[self.index]
+        return bpm if bpm > 0 else None
+
+    @bpm.setter
+    def bpm(self, value):
+        self.table.bpm_value[self.index] = value or 0.0
+
+    @property
+    def duration(self):
+        frames, samplerate = self.frames, self.samplerate
+        if frames is None or samplerate is None:
+            return None
+        return frames / samplerate
+
+    def as_dict(self) -> dict:
+        """Return the row as an old-style sample dict."""
+        return {name: getattr(self, name) for name in RECORD_FIELDS}
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.as_dict())
+
+
+class SampleTable:
+    """Columnar table of sample records."""
+
+    def __init__(self):
+        self.dirs = StringPool()
+        self.newdirs = StringPool()
+        self.keys = StringPool()
+        self.names = bytearray()
+        self.name_end = array("Q")
+        self.dir_id = array("I")
+        self.newdir_id = array("H")
+        self.key_id = array("H")
+        self.bpm_value = array("d")
+        self.sampletype_code = array("B")
+        self.drumtype_code = array("B")
+        self.insttype_code = array("B")
+        self.status_code = array("B")
+        self.isdrum_value = array("b")
+        self.isinst_value = array("b")
+        self.flags = array("B")
+        for name, typecode, _ in AUDIO_COLUMNS:
+            setattr(self, name + "_value", array(typecode))
+
+    def __len__(self):
+        return len(self.name_end)
+
+    def __getitem__(self, index: int) -> Sample:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("sample index out of range")
+        return Sample(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield Sample(self, index)
+
+    def filename(self, index: int) -> str:
+        start = self.name_end[index - 1] if index else 0
+        return self.names[start : self.name_end[index]].decode(
+            "utf-8", "surrogateescape"
+        )
+
+    def append(self, dirname: str, filename: str) -> Sample:
+        """Add an unclassified sample and return its view."""
+        self.names += filename.encode("utf-8", "surrogateescape")
+        self.name_end.append(len(self.names))
+        self.dir_id.append(self.dirs.intern(os.fspath(dirname)))
+        for column in (
+            self.newdir_id,
+            self.key_id,
+            self.sampletype_code,
+            self.drumtype_code,
+            self.insttype_code,
+            self.status_code,
+            self.flags,
+        ):
+            column.append(0)
+        self.isdrum_value.append(-1)
+        self.isinst_value.append(-1)
+        self.bpm_value.append(0.0)
+        for name, _, unset in AUDIO_COLUMNS:
+            getattr(self, name + "_value").append(unset)
+        return Sample(self, len(self) - 1)
+
+    def extend(self, pairs):
+        """Add a sample for every (dirname, filename) in PAIRS."""
+        for dirname, filename in pairs:
+            self.append(dirname, filename)
+
+    def take(self, start: int, stop: int) -> "SampleTable":
+        """Return rows START:STOP as a new, self-contained SampleTable."""
+        stop = min(stop, len(self))
+        chunk = SampleTable()
+        name_start = self.name_end[start - 1] if start else 0
+        name_stop = self.name_end[stop - 1] if stop > start else name_start
+        chunk.names = self.names[name_start:name_stop]
+        chunk.name_end = array(
+            "Q", (end - name_start for end in self.name_end[start:stop])
+        )
+        chunk.dir_id = _remap(self.dir_id[start:stop], self.dirs, chunk.dirs)
+        for column, pool in META_COLUMNS:
+            values = getattr(self, column)[start:stop]
+            if pool is not None:
+                values = _remap(values, getattr(self, pool), getattr(chunk, pool))
+            setattr(chunk, column, values)
+        for name, _, _ in AUDIO_COLUMNS:
+            column = name + "_value"
+            setattr(chunk, column, getattr(self, column)[start:stop])
+        return chunk
+
+    def export_meta(self) -> tuple:
+        """Return the classification columns as (pools, column bytes).
+
+        This is what process pool workers send back: a few strings and one
+        bytes object per column, no per-sample Python objects.
+        """
+        pools = (self.newdirs.strings, self.keys.strings)
+        return pools, tuple(
+            getattr(self, column).tobytes() for column, _ in META_COLUMNS
+        )
+
+    def import_meta(self, start: int, exported: tuple):
+        """Overwrite the classification columns from START with EXPORTED."""
+        (newdirs, keys), columns = exported
+        pools = {"newdirs": _pool_of(newdirs), "keys": _pool_of(keys)}
+        for (column, pool), data in zip(META_COLUMNS, columns):
+            target = getattr(self, column)
+            values = array(target.typecode)
+            values.frombytes(data)
+            if pool is not None:
+                values = _remap(values, pools[pool], getattr(self, pool))
+            target[start : start + len(values)] = values
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (excluding the pools)."""
+        columns = (
+            self.name_end,
+            self.dir_id,
+            self.newdir_id,
+            self.key_id,
+            self.bpm_value,
+            self.sampletype_code,
+            self.drumtype_code,
+            self.insttype_code,
+            self.status_code,
+            self.isdrum_value,
+            self.isinst_value,
+            self.flags,
+        ) + tuple(getattr(self, name + "_value") for name, _, _ in AUDIO_COLUMNS)
+        return len(self.names) + sum(c.itemsize * len(c) for c in columns)
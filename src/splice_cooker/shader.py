@@ -1,6 +1,9 @@
-"""This file is a vertex shader written in GLSL.
+"""This file contains the shaders, written in GLSL.
 
-The vertex shader handles visual effects on the framebuffer.
+The framebuffer shaders handle visual effects on the framebuffer. The
+oscilloscope shaders draw every OScope bar from one vertex list, and the
+scope fragment shader draws a ShaderScope trace or its bars straight from
+a texture of audio samples.
 
 """
 
@@ -63,3 +66,106 @@ void main() {
     }
 }
 """
+
+# Oscilloscope bars
+# Each bar is a quad whose corners only carry their x position and which
+# side (-0.5 or 0.5) of the bar's vertical center they are on. The bar's
+# amplitude is the only per-frame attribute; height and opacity are derived
+# from it here instead of in Python.
+oscope_vertex_source = """#version 330 core
+in vec2 position;
+in float amplitude;
+out vec4 v_color;
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+uniform float center_y;
+uniform float scale;
+uniform float min_height;
+uniform vec4 color;
+
+void main() {
+    float level = abs(amplitude);
+    float height = max(level * scale, min_height);
+    vec2 corner = vec2(position.x, center_y + position.y * height);
+    gl_Position = window.projection * window.view * vec4(corner, 0.0, 1.0);
+    // Louder = more solid
+    v_color = vec4(color.rgb, (100.0 + level * 155.0) / 255.0);
+}
+"""
+
+oscope_fragment_source = """#version 330 core
+in vec4 v_color;
+out vec4 final_color;
+
+void main() {
+    final_color = v_color;
+}
+"""
+
+# Oscilloscope from a texture of samples
+# Drawn on one quad with the pass-through vertex shader. Every pixel column
+# looks up the samples it covers in the 1D texture, so the CPU only uploads
+# the samples and the horizontal resolution is free.
+scope_fragment_source = """#version 330 core
+in vec2 v_tex_coords;
+out vec4 final_color;
+
+uniform sampler1D samples;
+uniform int n_samples;
+uniform vec2 size;
+uniform float scale;
+uniform float thickness;
+uniform float min_height;
+uniform int n_bars;
+uniform vec4 color;
+
+void main() {
+    vec2 pixel = v_tex_coords * size;
+    float y = pixel.y - size.y * 0.5;
+
+    if (n_bars > 0) {
+        // Bars and gaps of equal width, like OScope
+        float bar_width = size.x / (2.0 * float(n_bars) - 1.0);
+        float position = pixel.x / (2.0 * bar_width);
+        int bar = min(int(position), n_bars - 1);
+        if (fract(position) >= 0.5 && bar < n_bars - 1) {
+            discard;
+        }
+        // The loudest of the bar's samples, the way the trace spans a
+        // column, so a transient shows whichever sample it lands on.
+        int first = bar * n_samples / n_bars;
+        int last = max(first, (bar + 1) * n_samples / n_bars - 1);
+        float level = 0.0;
+        for (int i = first; i <= last; i++) {
+            level = max(level, abs(texelFetch(samples, i, 0).r));
+        }
+        if (abs(y) > max(level * scale, min_height) * 0.5) {
+            discard;
+        }
+        // Louder = more solid
+        final_color = vec4(color.rgb, (100.0 + level * 155.0) / 255.0);
+        return;
+    }
+
+    // Trace: the span of every sample in this column and the first of the
+    // next one, so neighbouring columns join up.
+    float column = floor(pixel.x);
+    int first = int(column * float(n_samples) / size.x);
+    int last = min(int((column + 1.0) * float(n_samples) / size.x), n_samples - 1);
+    float low = 1.0;
+    float high = -1.0;
+    for (int i = first; i <= last; i++) {
+        float value = texelFetch(samples, i, 0).r;
+        low = min(low, value);
+        high = max(high, value);
+    }
+    if (y < low * scale * 0.5 - thickness || y > high * scale * 0.5 + thickness) {
+        discard;
+    }
+    final_color = color;
+}
+"""
@@ -0,0 +1,272 @@
+"""
+This file contains the tempo and key extraction.
+
+parse_tempo_key reads a sample's bpm and musical key from its filename, where
+Splice almost always puts them ("..._120_Cmin_...", "..._Ebm_90bpm"). The
+filename is split with one precompiled pattern and every token is classified
+once by a memoized matcher, so this costs about as much as the type
+classification it runs next to. Keys are normalized to a tonic from
+PITCH_NAMES and "maj"/"min", e.g. "F#min" or "Bbmaj".
+
+TempoKeyAnalyzer is the fallback for files whose names carry neither: it
+estimates them from the audio with librosa on a process pool. Results are
+stored in a TempoKeyCache keyed by content digest, so every distinct file is
+analyzed at most once, however often it is renamed, moved or rescanned.
+
+"""
+
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from splice_cooker.samples import SampleTable
+
+PITCH_NAMES = ("C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B")
+
+# A bare number is only taken as a tempo in a loop's filename, and only in
+# this range; "120bpm" is always a tempo.
+BARE_BPM_RANGE = (50, 220)
+
+_TONICS = {"c": 0, "d": 2, "e": 4, "f": 5, "g": 7, "a": 9, "b": 11}
+_ACCIDENTALS = {None: 0, "#": 1, "♯": 1, "sharp": 1, "b": -1, "♭": -1, "flat": -1}
+_MODES = {"maj": "maj", "major": "maj", "min": "min", "minor": "min", "m": "min"}
+
+_SEPARATORS = re.compile(r"[_\-\s]+")
+_BPM = re.compile(r"(?i)(\d{2,3}(?:\.\d+)?)bpm|bpm(\d{2,3}(?:\.\d+)?)")
+_NUMBER = re.compile(r"[1-9]\d{1,2}")
+_KEY = re.compile(
+    r"([A-Ga-g])(#|♯|b|♭|(?i:sharp|flat))?((?i:maj(?:or)?|min(?:or)?)|m)?"
+)
+_MODE = re.compile(r"(?i)maj(?:or)?|min(?:or)?")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tempo_key (
+    digest BLOB PRIMARY KEY,
+    bpm REAL,
+    key TEXT
+)
+"""
+
+# Krumhansl-Kessler key profiles, C major and C minor.
+_MAJOR_PROFILE = (
+    6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88
+)  # fmt: skip
+_MINOR_PROFILE = (
+    6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17
+)  # fmt: skip
+
+
+def key_name(pitch: int, mode: str) -> str:
+    return PITCH_NAMES[pitch % 12] + mode
+
+
+@lru_cache(maxsize=1 << 16)
+def _token(token: str) -> tuple:
+    """Classify one filename token.
+
+    Returns ("bpm", value), ("number", value), ("bpm",) for the word itself,
+    ("key", key), ("tonic", pitch), ("mode", mode) or () for anything else.
+    """
+    if token.lower() == "bpm":
+        return ("bpm",)
+    match = _BPM.fullmatch(token)
+    if match:
+        return ("bpm", float(match.group(1) or match.group(2)))
+    if _NUMBER.fullmatch(token):
+        return ("number", float(token))
+    if _MODE.fullmatch(token):
+        return ("mode", _MODES[token.lower()])
+
+    match = _KEY.fullmatch(token)
+    if match is None:
+        return ()
+    tonic, accidental, mode = match.groups()
+    if tonic.islower() and mode in (None, "m"):
+        return ()  # "a", "b", "fm": words and abbreviations, not keys
+    pitch = _TONICS[tonic.lower()] + _ACCIDENTALS[accidental and accidental.lower()]
+    if mode is None:
+        return ("tonic", pitch % 12)
+    return ("key", key_name(pitch, _MODES[mode.lower()]))
+
+
+def parse_tempo_key(
+    filename: str, loop: bool = True, pitched: bool = True
+) -> Tuple[Optional[float], Optional[str]]:
+    """Return (bpm, key) found in FILENAME, None for what is not there.
+
+    LOOP allows a bare number ("_120_") to be the tempo; PITCHED allows a
+    bare note ("_F#_") to be the key, as a major key. Explicit forms such as
+    "120bpm", "Cmin" or "A_minor" are always used.
+    """
+    tokens = _SEPARATORS.split(os.path.splitext(filename)[0])
+    bpm = bare_bpm = key = bare_key = None
+    low, high = BARE_BPM_RANGE
+    kinds = [_token(token) for token in tokens]
+    for index, kind in enumerate(kinds):
+        if not kind:
+            continue
+        what = kind[0]
+        following = kinds[index + 1] if index + 1 < len(kinds) else ()
+        if what == "bpm":
+            if len(kind) > 1:
+                bpm = bpm or kind[1]
+        elif what == "number":
+            if following == ("bpm",):
+                bpm = bpm or kind[1]
+            elif loop and bare_bpm is None and low <= kind[1] <= high:
+                bare_bpm = kind[1]
+        elif what == "key":
+            key = key or kind[1]
+        elif what == "tonic" and key is None:
+            if following and following[0] == "mode":
+                key = key_name(kind[1], following[1])
+            elif pitched and bare_key is None:
+                bare_key = key_name(kind[1], "maj")
+    return bpm or bare_bpm, key or bare_key
+
+
+def _correlation(xs, ys) -> float:
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    dx = [x - mean_x for x in xs]
+    dy = [y - mean_y for y in ys]
+    norm = (sum(d * d for d in dx) * sum(d * d for d in dy)) ** 0.5
+    return sum(a * b for a, b in zip(dx, dy)) / norm if norm else 0.0
+
+
+def estimate_key(chroma) -> str:
+    """Return the key whose profile best correlates with a 12-bin CHROMA."""
+    chroma = [float(value) for value in chroma]
+    scores = (
+        (_correlation(chroma, profile[-pitch:] + profile[:-pitch]), pitch, mode)
+        for mode, profile in (("maj", _MAJOR_PROFILE), ("min", _MINOR_PROFILE))
+        for pitch in range(12)
+    )
+    _, pitch, mode = max(scores)
+    return key_name(pitch, mode)
+
+
+def analyze_tempo_key(args) -> Tuple[Optional[float], Optional[str]]:
+    """Process pool worker: estimate (bpm, key) of one file from its audio.
+
+    ARGS is (path, loop, pitched); the tempo is only estimated for loops and
+    the key only for pitched samples.
+    """
+    import librosa
+    import numpy as np
+
+    path, loop, pitched = args
+    try:
+        y, sr = librosa.load(path, sr=22050, mono=True, duration=60.0)
+    except Exception:
+        return None, None
+    if not len(y) or not np.any(y):
+        return None, None
+    bpm = key = None
+    if loop:
+        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+        bpm = float(np.atleast_1d(tempo)[0]) or None
+    if pitched:
+        key = estimate_key(librosa.feature.chroma_cqt(y=y, sr=sr).mean(axis=1))
+    return bpm, key
+
+
+class TempoKeyCache:
+    """Persistent (bpm, key) analysis results keyed by content digest."""
+
+    def __init__(self, db):
+        self.db = db if isinstance(db, sqlite3.Connection) else sqlite3.connect(db)
+        with self.db:
+            self.db.execute(_SCHEMA)
+
+    def lookup(self, digests) -> dict:
+        """Return {digest: (bpm, key)} for the DIGESTS already analyzed."""
+        found = {}
+        digests = list(digests)
+        for start in range(0, len(digests), 500):
+            batch = digests[start : start + 500]
+            rows = self.db.execute(
+                "SELECT digest, bpm, key FROM tempo_key WHERE digest IN "
+                f"({', '.join('?' * len(batch))})",
+                batch,
+            )
+            found.update((digest, (bpm, key)) for digest, bpm, key in rows)
+        return found
+
+    def store(self, results):
+        """Remember (digest, bpm, key) RESULTS, including empty ones."""
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO tempo_key (digest, bpm, key) VALUES (?, ?, ?)",
+                results,
+            )
+
+
+class TempoKeyAnalyzer:
+    """Fills in bpm and key from the audio where the filename had neither."""
+
+    def __init__(self, workers: int = None, cache: TempoKeyCache = None, analyze=None):
+        self.workers = workers
+        self.cache = cache
+        self.analyze = analyze or analyze_tempo_key
+        self.hits = 0
+        self.misses = 0
+
+    def analyze_samples(
+        self, sample_list: SampleTable, digests: List[Optional[bytes]], progress=None
+    ) -> int:
+        """Fill in bpm and key for samples that have neither.
+
+        Returns how many samples were filled in. DIGESTS are the samples'
+        content digests in table order (see ContentHasher.hash_samples);
+        samples without one are skipped. Drums get no key and one shots no
+        tempo.
+        """
+        todo = {}
+        for sample, digest in zip(sample_list, digests):
+            if digest is None or sample.bpm is not None or sample.key is not None:
+                continue
+            loop = sample.sampletype not in ("One Shot", None)
+            pitched = not sample.isdrum
+            if loop or pitched:
+                todo.setdefault(digest, (sample.path, loop, pitched, []))[3].append(
+                    sample.index
+                )
+        if not todo:
+            return 0
+
+        results = self.cache.lookup(todo) if self.cache else {}
+        self.hits += len(results)
+        missing = [digest for digest in todo if digest not in results]
+        self.misses += len(missing)
+        if missing:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                fresh = pool.map(
+                    self.analyze,
+                    (todo[digest][:3] for digest in missing),
+                    chunksize=4,
+                )
+                if progress is not None:
+                    fresh = progress(fresh, total=len(missing))
+                for digest, result in zip(missing, fresh):
+                    results[digest] = result
+            if self.cache:
+                self.cache.store((digest, *results[digest]) for digest in missing)
+
+        filled = 0
+        for digest, (_, loop, pitched, indices) in todo.items():
+            bpm, key = results[digest]
+            if bpm is None and key is None:
+                continue
+            for index in indices:
+                sample = sample_list[index]
+                sample.bpm = bpm if loop else None
+                sample.key = key if pitched else None
+                filled += 1
+        return filled
+
+    def report(self) -> str:
+        return f"Tempo/key analysis: {self.hits} cached, {self.misses} analyzed"
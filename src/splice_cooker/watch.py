@@ -0,0 +1,317 @@
+"""
+This file defines the LibraryWatcher class.
+
+LibraryWatcher keeps a destination tree in sync with a live Splice library.
+On Linux it subscribes to inotify events for every directory under the
+Splice root (through ctypes, no extra dependency); elsewhere it falls back
+to polling the library with LibraryCrawler. Bursts of events, such as a pack
+being unzipped, are debounced and then handed to a callback as one batch of
+changed and removed paths. sync_changes builds the callback that classifies
+and copies just those files, and keeps the catalog in step: removed files
+are dropped from it and, only if asked to, so are the copies made of them.
+
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from splice_cooker.audio_info import fill_audio_info
+from splice_cooker.catalog import Rescan, SampleCatalog, file_stat
+from splice_cooker.classify import classify_table
+from splice_cooker.copier import CopyExecutor
+from splice_cooker.crawler import LibraryCrawler, is_sample_file
+from splice_cooker.samples import SampleTable
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_ONLYDIR
+)
+
+_EVENT = struct.Struct("iIII")
+
+CHANGED = "changed"
+REMOVED = "removed"
+
+Event = Tuple[str, str]  # (path, CHANGED or REMOVED)
+
+
+class InotifyBackend:
+    """Recursive inotify watch on a directory tree (Linux only)."""
+
+    def __init__(self, root: str, ignore=(".DS_Store",)):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        self.root = root
+        self.ignore = frozenset(ignore)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}
+        self._watch_tree(root)
+
+    def close(self):
+        os.close(self.fd)
+
+    def _watch_tree(self, top: str) -> List[str]:
+        """Watch TOP and its subdirectories; return the sample files found."""
+        files = []
+        for dirname, _, filenames in os.walk(top):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirname), WATCH_MASK)
+            if wd >= 0:
+                self._dirs[wd] = dirname
+            files.extend(
+                os.path.join(dirname, filename)
+                for filename in filenames
+                if is_sample_file(filename, self.ignore)
+            )
+        return files
+
+    def read_events(self, timeout: float) -> List[Event]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: report everything so nothing is missed.
+                events.extend((path, CHANGED) for path in self._watch_tree(self.root))
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            dirname = self._dirs.get(wd)
+            if dirname is None or not name:
+                continue
+
+            path = os.path.join(dirname, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # A new pack folder: its files may already be in place.
+                    events.extend((p, CHANGED) for p in self._watch_tree(path))
+                elif mask & IN_MOVED_FROM:
+                    events.append((path, REMOVED))
+            elif is_sample_file(name, self.ignore):
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    events.append((path, CHANGED))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    events.append((path, REMOVED))
+        return events
+
+
+class PollingBackend:
+    """Portable fallback: rescan the library every INTERVAL seconds."""
+
+    def __init__(self, root: str, ignore=(".DS_Store",), interval: float = 1.0):
+        self.root = root
+        self.ignore = ignore
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def close(self):
+        pass
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        crawler = LibraryCrawler(self.root, self.ignore, stat=True)
+        return {
+            entry.path: (entry.stat().st_size, entry.stat().st_mtime_ns)
+            for _, entry in crawler.walk()
+        }
+
+    def read_events(self, timeout: float) -> List[Event]:
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(delay, 0))
+        self._next_scan = time.monotonic() + self.interval
+
+        previous, self._snapshot = self._snapshot, self._scan()
+        events = [
+            (path, CHANGED)
+            for path, stat in self._snapshot.items()
+            if previous.get(path) != stat
+        ]
+        events.extend((path, REMOVED) for path in previous.keys() - self._snapshot)
+        return events
+
+
+class LibraryWatcher:
+    """Debounces library events and hands them to ON_CHANGE in batches.
+
+    ON_CHANGE(changed, removed) is called with lists of paths once no new
+    event has arrived for DEBOUNCE seconds, or at the latest MAX_DELAY
+    seconds after the first event of a burst.
+    """
+
+    def __init__(
+        self,
+        splice_root,
+        on_change: Callable[[List[str], List[str]], None],
+        ignore=(".DS_Store",),
+        debounce: float = 0.25,
+        max_delay: float = 1.0,
+        backend=None,
+    ):
+        self.splice_root = os.fspath(splice_root)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.max_delay = max_delay
+        if backend is None:
+            try:
+                backend = InotifyBackend(self.splice_root, ignore)
+            except OSError:
+                backend = PollingBackend(self.splice_root, ignore)
+        self.backend = backend
+        self.batches = 0
+
+    def close(self):
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def poll(self, timeout: float) -> bool:
+        """Collect events for up to TIMEOUT seconds, flushing one batch at most.
+
+        Returns True if a batch was handed to ON_CHANGE.
+        """
+        pending = {}
+        deadline = time.monotonic() + timeout
+        first = last = None
+        while True:
+            now = time.monotonic()
+            if pending and (
+                now - last >= self.debounce or now - first >= self.max_delay
+            ):
+                self._flush(pending)
+                return True
+            if not pending and now >= deadline:
+                return False
+
+            wait = self.debounce if pending else deadline - now
+            events = self.backend.read_events(max(min(wait, self.debounce), 0))
+            if events:
+                last = time.monotonic()
+                first = first or last
+                pending.update(events)
+
+    def run(self, should_stop: Callable[[], bool] = lambda: False):
+        """Watch until SHOULD_STOP() returns True (or forever)."""
+        while not should_stop():
+            self.poll(1.0)
+
+    def _flush(self, pending: Dict[str, str]):
+        changed = [path for path, kind in pending.items() if kind == CHANGED]
+        removed = [path for path, kind in pending.items() if kind == REMOVED]
+        self.batches += 1
+        self.on_change(changed, removed)
+
+
+def _remove_copies(samples: SampleTable, stats: Dict[str, Tuple]) -> int:
+    """Delete the copies in their newdir of removed SAMPLES.
+
+    STATS maps each sample's path to the (size, mtime_ns, ...) its source
+    had. Copies keep the source's mtime, so a destination file that no
+    longer matches is not ours (or was edited) and is left alone. Returns
+    the number of files deleted.
+    """
+    deleted = 0
+    for sample in samples:
+        if sample.newdir is None:
+            continue
+        copy = os.path.join(sample.newdir, sample.filename)
+        size, mtime_ns = stats[sample.path][:2]
+        try:
+            st = os.stat(copy)
+            if (st.st_size, st.st_mtime_ns) == (size, mtime_ns):
+                os.remove(copy)
+                deleted += 1
+        except FileNotFoundError:
+            pass
+    return deleted
+
+
+def sync_changes(
+    splice_root: str,
+    dest_dir: str,
+    copier: CopyExecutor = None,
+    catalog: SampleCatalog = None,
+    delete_copies: bool = False,
+) -> Callable[[Iterable[str], Iterable[str]], SampleTable]:
+    """Return an ON_CHANGE callback that classifies and copies changed files.
+
+    With a CATALOG, changed files are stored in it, and removed files (or
+    directories) are dropped from it. With DELETE_COPIES too, their copies in
+    DEST_DIR are deleted as well; a pack that is moved or renamed in Splice
+    shows up as removed, so this is off by default.
+    """
+
+    def on_change(changed, removed):
+        rescan = Rescan()
+        sample_list = rescan.samples
+        for path in changed:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                sample = sample_list.append(*os.path.split(path))
+                rescan.stats[sample.path] = file_stat(st)
+        classify_table(sample_list, splice_root, dest_dir)
+        for newdir in sample_list.newdirs.strings[1:]:
+            os.makedirs(newdir, exist_ok=True)
+        stats = (copier or CopyExecutor()).copy_samples(sample_list)
+
+        deleted = 0
+        if catalog is not None:
+            fill_audio_info(sample_list)
+            catalog.store(rescan)
+            dropped = catalog.remove(removed)
+            if delete_copies:
+                deleted = _remove_copies(*dropped)
+        print(
+            f"Synced {len(sample_list)} changed, {len(removed)} removed "
+            f"({deleted} copies deleted): {stats}"
+        )
+        return sample_list
+
+    return on_change
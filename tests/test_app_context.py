@@ -0,0 +1,61 @@
+import pytest
+import pyglet
+from pyglet import shapes
+
+np = pytest.importorskip("numpy")
+
+from splice_cooker.app_context import AppContext  # noqa: E402
+from splice_cooker.user import User  # noqa: E402
+
+
+@pytest.fixture
+def ctx():
+    # Only the framebuffer is under test: skip loading resources and audio.
+    ctx = AppContext.__new__(AppContext)
+    ctx.main_window = pyglet.window.Window(960, 540, caption="test_window")
+    ctx.user = User("test", {"render_scale": 0.25})
+    yield ctx
+    ctx.main_window.close()
+
+
+def render(ctx, batch):
+    ctx.main_window.switch_to()
+    ctx.begin_scene()
+    ctx.main_window.clear()
+    batch.draw()
+    ctx.end_scene()
+    ctx.present()
+    buffer = pyglet.image.get_buffer_manager().get_color_buffer()
+    data = buffer.get_image_data().get_data("RGBA", 960 * 4)
+    return np.frombuffer(data, np.uint8).reshape(540, 960, 4)
+
+
+def test_render_scale_upscales_dither_with_nearest(ctx):
+    ctx.init_framebuffer()
+    assert ctx.fbo_size == (240, 135)
+    batch = pyglet.graphics.Batch()
+    gray = shapes.Rectangle(0, 0, 480, 540, color=(128, 128, 128), batch=batch)
+    pixels = render(ctx, batch)[:, :, 1]
+
+    left = pixels[:536, :480].reshape(134, 4, 120, 4)
+    assert (left == left[:, :1, :, :1]).all()  # every 4x4 block is one pixel
+    assert 0 < left.mean() < 255  # dithered, half on
+    assert not pixels[:, 484:].any()
+    gray.delete()
+
+
+def test_framebuffer_is_reallocated_after_resize(ctx):
+    ctx.init_framebuffer(1.0)
+    assert ctx.fbo_size == (960, 540) and ctx.dither_fbo is None
+    texture = ctx.fbo_texture
+    ctx.begin_scene()
+    ctx.end_scene()
+    assert ctx.fbo_texture is texture
+
+    ctx.main_window.dispatch_event("on_resize", 960, 540)
+    ctx.main_window.dispatch_events()
+    assert ctx.fbo_size is None
+    ctx.begin_scene()
+    ctx.end_scene()
+    assert ctx.fbo_texture is not texture
+    assert ctx.screen_sprite.image is ctx.fbo_texture
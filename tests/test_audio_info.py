@@ -0,0 +1,169 @@
+import pytest
+
+import struct
+import wave
+
+from splice_cooker.audio_info import fill_audio_info, read_audio_info
+from splice_cooker.catalog import SampleCatalog
+from splice_cooker.crawler import LibraryCrawler
+from splice_cooker.samples import SampleTable
+
+
+def riff_chunk(chunk_id: bytes, body: bytes) -> bytes:
+    return struct.pack("<4sI", chunk_id, len(body)) + body + b"\0" * (len(body) & 1)
+
+
+def write_loop_wav(path, frames=44100, tempo=128.0):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(3)
+        w.setframerate(44100)
+        w.writeframes(b"\0" * 6 * frames)
+    acid = struct.pack("<IHHfIHHf", 0x02, 57, 0x8000, 0.0, 4, 4, 4, tempo)
+    smpl = struct.pack("<9I", 0, 0, 22675, 60, 0, 0, 0, 1, 0)
+    smpl += struct.pack("<6I", 0, 0, 100, frames - 1, 0, 0)
+    with open(path, "r+b") as f:
+        f.seek(0, 2)
+        f.write(riff_chunk(b"acid", acid) + riff_chunk(b"smpl", smpl))
+        riff_size = f.tell() - 8
+        f.seek(4)
+        f.write(struct.pack("<I", riff_size))
+
+
+def write_aiff(path, frames=1000):
+    # 48000.0 as an 80-bit extended float.
+    rate = struct.pack(">HQ", 16383 + 15, 48000 << 48)
+    comm = struct.pack(">hIh", 1, frames, 16) + rate
+    mark = struct.pack(">H", 2)
+    mark += struct.pack(">hI", 1, 10) + b"\x05start"
+    mark += struct.pack(">hI", 2, 900) + b"\x03end"
+    inst = struct.pack(">bbbbbbhhhhhhh", 48, 0, 0, 127, 1, 127, 0, 1, 1, 2, 0, 0, 0)
+    ssnd = struct.pack(">II", 0, 0) + b"\0" * 2 * frames
+    chunks = b"".join(
+        struct.pack(">4sI", chunk_id, len(body)) + body
+        for chunk_id, body in [
+            (b"COMM", comm),
+            (b"MARK", mark),
+            (b"INST", inst),
+            (b"SSND", ssnd),
+        ]
+    )
+    path.write_bytes(b"FORM" + struct.pack(">I", 4 + len(chunks)) + b"AIFF" + chunks)
+
+
+def test_wav_with_acid_and_smpl(tmp_path):
+    path = tmp_path / "loop.wav"
+    write_loop_wav(path)
+    info = read_audio_info(path)
+
+    assert (info.format, info.samplerate, info.channels, info.bitdepth) == (
+        "wav",
+        44100,
+        2,
+        24,
+    )
+    assert info.frames == 44100 and info.duration == 1.0
+    assert (info.tempo, info.beats, info.root_note) == (128.0, 4, 57)
+    assert (info.loop_start, info.loop_end) == (100, 44099)
+
+
+def test_plain_wav(tmp_path):
+    path = tmp_path / "kick.wav"
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(22050)
+        w.writeframes(b"\0" * 2 * 441)
+    info = read_audio_info(path)
+
+    assert (info.samplerate, info.channels, info.bitdepth, info.frames) == (
+        22050,
+        1,
+        16,
+        441,
+    )
+    assert info.tempo is info.loop_start is info.root_note is None
+
+
+def test_aiff_with_loop_markers(tmp_path):
+    path = tmp_path / "pad.aif"
+    write_aiff(path)
+    info = read_audio_info(path)
+
+    assert (info.format, info.samplerate, info.channels, info.bitdepth) == (
+        "aiff",
+        48000,
+        1,
+        16,
+    )
+    assert info.frames == 1000
+    assert (info.root_note, info.loop_start, info.loop_end) == (48, 10, 900)
+
+
+@pytest.mark.parametrize(
+    "data", [b"", b"RIFF", b"RIFF\xff\xff\xff\xffWAVEfmt ", b"ID3"]
+)
+def test_unreadable_files(tmp_path, data):
+    path = tmp_path / "broken.wav"
+    path.write_bytes(data)
+    assert read_audio_info(path) is None
+
+
+def test_fill_audio_info_round_trips_through_the_catalog(tmp_path):
+    root = tmp_path / "splice"
+    root.mkdir()
+    write_loop_wav(root / "loop.wav", frames=100)
+    (root / "readme.txt").write_text("not audio")
+
+    with SampleCatalog(tmp_path / "catalog.sqlite") as catalog:
+        rescan = catalog.rescan(LibraryCrawler(root, []))
+        assert fill_audio_info(rescan.samples) == 1
+        catalog.store(rescan)
+        samples = {sample.filename: sample for sample in catalog.load()}
+
+    loop = samples["loop.wav"]
+    assert (loop.samplerate, loop.frames, loop.bpm, loop.beats) == (44100, 100, 128, 4)
+    assert (loop.loop_start, loop.loop_end, loop.root_note) == (100, 99, 57)
+    assert samples["readme.txt"].samplerate is None
+
+
+def test_fill_keeps_an_existing_bpm(tmp_path):
+    write_loop_wav(tmp_path / "loop.wav", frames=10)
+    samples = SampleTable()
+    samples.append(str(tmp_path), "loop.wav").bpm = 90
+    fill_audio_info(samples)
+    assert samples[0].bpm == 90
+
+
+@pytest.mark.parametrize(
+    "channels, bits, rate",
+    [
+        (-1, 16, struct.pack(">HQ", 16383 + 15, 48000 << 48)),  # negative channels
+        (1, 0, struct.pack(">HQ", 16383 + 15, 48000 << 48)),  # no bit depth
+        (1, 16, struct.pack(">HQ", 0x7FFF, 1 << 63)),  # infinite rate
+        (1, 16, struct.pack(">HQ", 0x7FFE, 1 << 63)),  # out of float range
+        (1, 16, struct.pack(">HQ", 0x8000 | (16383 + 15), 48000 << 48)),  # negative
+    ],
+)
+def test_malformed_aiff_comm_is_rejected(tmp_path, channels, bits, rate):
+    comm = struct.pack(">hIh", channels, 10, bits) + rate
+    chunks = struct.pack(">4sI", b"COMM", len(comm)) + comm
+    path = tmp_path / "bad.aif"
+    path.write_bytes(b"FORM" + struct.pack(">I", 4 + len(chunks)) + b"AIFF" + chunks)
+    assert read_audio_info(path) is None
+
+    samples = SampleTable()
+    samples.append(str(tmp_path), "bad.aif")
+    assert fill_audio_info(samples) == 0
+
+
+@pytest.mark.parametrize(
+    "channels, block_align",
+    [(0, 4), (2, 0), (2, 1)],
+)
+def test_malformed_wav_fmt_is_rejected(tmp_path, channels, block_align):
+    fmt = struct.pack("<HHIIHH", 1, channels, 44100, 0, block_align, 16)
+    body = b"WAVE" + riff_chunk(b"fmt ", fmt) + riff_chunk(b"data", b"\0" * 16)
+    path = tmp_path / "bad.wav"
+    path.write_bytes(b"RIFF" + struct.pack("<I", len(body)) + body)
+    assert read_audio_info(path) is None
@@ -0,0 +1,86 @@
+import pytest
+
+import struct
+import wave
+
+np = pytest.importorskip("numpy")
+
+from splice_cooker.audio_source import (  # noqa: E402
+    DecodedSource,
+    MappedPCMSource,
+    open_audio,
+)
+
+
+def write_wav(path, frames, width=2):
+    """Write FRAMES, a (n, channels) float array, as integer PCM."""
+    full_scale = 1 << (8 * width - 1)
+    ints = np.round(frames * (full_scale - 1)).astype(np.int64)
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(frames.shape[1])
+        w.setsampwidth(width)
+        w.setframerate(8000)
+        if width == 3:
+            data = b"".join(
+                int(v).to_bytes(3, "little", signed=True) for v in ints.ravel()
+            )
+        else:
+            data = ints.astype(f"<i{width}").tobytes()
+        w.writeframes(data)
+
+
+@pytest.fixture
+def stereo():
+    t = np.arange(20000) / 8000
+    left = 0.5 * np.sin(2 * np.pi * 440 * t)
+    right = 0.25 * np.ones_like(t)
+    return np.stack([left, right], axis=1)
+
+
+@pytest.mark.parametrize("width", [2, 3, 4])
+def test_mapped_pcm_is_mono_on_demand(tmp_path, stereo, width):
+    path = tmp_path / "loop.wav"
+    write_wav(path, stereo, width)
+    expected = stereo.mean(axis=1)
+
+    with open_audio(path) as source:
+        assert isinstance(source, MappedPCMSource)
+        assert (len(source), source.samplerate, source.channels) == (20000, 8000, 2)
+        assert source.duration == 2.5
+        np.testing.assert_allclose(source[100:200], expected[100:200], atol=1e-4)
+        indices = np.clip(np.arange(-10, 20010, 1000), 0, len(source) - 1)
+        np.testing.assert_allclose(source[indices], expected[indices], atol=1e-4)
+        assert source[-1] == pytest.approx(expected[-1], abs=1e-4)
+        assert source[5:1].size == 0
+        with pytest.raises(IndexError):
+            source[np.array([20000])]
+
+
+def test_aiff_big_endian(tmp_path):
+    samples = [0, 16384, -16384, 32767]
+    rate = struct.pack(">HQ", 16383 + 12, 8000 << 51)
+    comm = struct.pack(">hIh", 1, len(samples), 16) + rate
+    ssnd = struct.pack(">II", 0, 0) + struct.pack(f">{len(samples)}h", *samples)
+    chunks = b"COMM" + struct.pack(">I", len(comm)) + comm
+    chunks += b"SSND" + struct.pack(">I", len(ssnd)) + ssnd
+    path = tmp_path / "pad.aif"
+    path.write_bytes(b"FORM" + struct.pack(">I", 4 + len(chunks)) + b"AIFF" + chunks)
+
+    with MappedPCMSource(path) as source:
+        np.testing.assert_allclose(source[:], [0, 0.5, -0.5, 32767 / 32768])
+
+
+def test_decoded_source_reads_blocks_lazily(tmp_path, stereo):
+    soundfile = pytest.importorskip("soundfile")
+    path = tmp_path / "loop.flac"
+    soundfile.write(str(path), stereo, 8000, subtype="PCM_16")
+
+    with open_audio(path) as source:
+        assert isinstance(source, DecodedSource)
+        assert len(source) == 20000 and source.decoded == 0
+        source.block_frames = 4096
+        window = source[8000:8100]
+        assert source.decoded == 1
+        np.testing.assert_allclose(window, stereo.mean(axis=1)[8000:8100], atol=1e-4)
+        source[np.array([0, 19999])]
+        assert source.decoded == 3
@@ -0,0 +1,105 @@
+import pytest
+
+import os
+
+from splice_cooker.catalog import SampleCatalog
+from splice_cooker.crawler import LibraryCrawler
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "splice"
+    (root / "pack_a" / "one_shots").mkdir(parents=True)
+    (root / "pack_b").mkdir()
+    for path in ["pack_a/one_shots/kick_01.wav", "pack_a/snare.wav", "pack_b/fx.wav"]:
+        (root / path).write_bytes(b"RIFF")
+    return root
+
+
+def rescan(catalog, root):
+    result = catalog.rescan(LibraryCrawler(root, [".DS_Store"]))
+    for sample in result.samples:
+        sample.sampletype = "One Shot"
+    catalog.store(result)
+    return result
+
+
+def test_rescan_only_returns_new_and_changed(library, tmp_path):
+    with SampleCatalog(tmp_path / "catalog" / "catalog.sqlite") as catalog:
+        first = rescan(catalog, library)
+        assert (first.new, first.changed, first.unchanged) == (3, 0, 0)
+        assert len(catalog) == 3
+
+        noop = rescan(catalog, library)
+        assert len(noop.samples) == 0
+        assert (noop.new, noop.changed, noop.unchanged) == (0, 0, 3)
+
+        (library / "pack_b" / "fx.wav").write_bytes(b"RIFF....")
+        (library / "pack_b" / "riser.wav").write_bytes(b"RIFF")
+        os.remove(library / "pack_a" / "snare.wav")
+        update = rescan(catalog, library)
+        assert sorted(s.filename for s in update.samples) == ["fx.wav", "riser.wav"]
+        assert (update.new, update.changed, update.unchanged) == (1, 1, 1)
+        assert update.removed == [str(library / "pack_a" / "snare.wav")]
+
+        records = sorted(catalog.load(), key=lambda s: s.filename)
+        assert [s.filename for s in records] == [
+            "fx.wav",
+            "kick_01.wav",
+            "riser.wav",
+        ]
+        assert all(s.sampletype == "One Shot" for s in records)
+        assert records[0].sample_match_failed is False
+        assert records[0].status == "not_moved"
+
+
+def test_catalog_persists_between_runs(library, tmp_path):
+    path = tmp_path / "catalog.sqlite"
+    with SampleCatalog(path) as catalog:
+        rescan(catalog, library)
+
+    with SampleCatalog(path) as catalog:
+        assert rescan(catalog, library).unchanged == 3
+
+
+def test_remove_files_and_directories(library, tmp_path):
+    with SampleCatalog(tmp_path / "catalog.sqlite") as catalog:
+        rescan(catalog, library)
+        removed, stats = catalog.remove(
+            [str(library / "pack_a"), str(library / "pack_b" / "gone.wav")]
+        )
+        assert sorted(sample.filename for sample in removed) == [
+            "kick_01.wav",
+            "snare.wav",
+        ]
+        assert removed[0].sampletype == "One Shot"
+        assert stats[removed[0].path][0] == 4  # size
+        assert [sample.filename for sample in catalog.load()] == ["fx.wav"]
+
+
+def test_store_skips_records_without_stats(library, tmp_path):
+    with SampleCatalog(tmp_path / "catalog.sqlite") as catalog:
+        result = catalog.rescan(LibraryCrawler(library, [".DS_Store"]))
+        del result.stats[result.samples[0].path]
+        catalog.store(result)
+        assert len(catalog) == 2
+
+
+def test_rescan_keeps_the_catalog_of_a_missing_library(library, tmp_path):
+    with SampleCatalog(tmp_path / "catalog.sqlite") as catalog:
+        rescan(catalog, library)
+        for path in library.rglob("*.wav"):
+            path.unlink()
+        assert rescan(catalog, library).removed == []
+        assert len(catalog) == 3
+
+        with pytest.raises(FileNotFoundError):
+            rescan(catalog, tmp_path / "unmounted")
+        assert len(catalog) == 3
+
+
+def test_rescan_leaves_the_crawler_alone(library, tmp_path):
+    crawler = LibraryCrawler(library, [".DS_Store"])
+    with SampleCatalog(tmp_path / "catalog.sqlite") as catalog:
+        assert catalog.rescan(crawler).new == 3
+    assert crawler.stat is False
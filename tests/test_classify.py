@@ -0,0 +1,94 @@
+import pytest
+
+import random
+
+from splice_cooker.classify import (
+    ClassificationEngine,
+    DirectoryCache,
+    SampleTypeMatcher,
+    classify_batch,
+    classify_table,
+)
+from splice_cooker.samples import SampleTable
+
+VOCAB = [
+    "one", "shots", "one_shots", "808", "percussion", "fx", "samples", "loops",
+    "melodic_loops", "percussion_loops", "spoken", "drum_loops", "breaks",
+    "kick", "snare", "cymbal", "hats", "ride", "crash", "perc", "bass", "subbass",
+    "keys", "piano", "synth", "brass", "woodwind", "strings", "vocal", "Vocals",
+    "FX", "Snare", "120", "Cmin", "01", "pack", "phone", "Perc", "drum_hits}",
+]  # fmt: skip
+
+
+def legacy_classify(dir_strings, filename_strings):
+    stm = SampleTypeMatcher()
+    return (
+        stm.get_sample_type(dir_strings, filename_strings),
+        stm.get_drum_type(dir_strings, filename_strings),
+        stm.get_inst_type(dir_strings, filename_strings),
+    )
+
+
+def test_engine_matches_sample_type_matcher():
+    engine = ClassificationEngine()
+    rng = random.Random(0)
+    for _ in range(5000):
+        dir_strings = rng.sample(VOCAB, rng.randint(0, 3))
+        filename_strings = [
+            "".join(rng.sample(VOCAB, rng.randint(1, 2)))
+            for _ in range(rng.randint(1, 4))
+        ]
+        assert engine.classify(dir_strings, filename_strings) == legacy_classify(
+            dir_strings, filename_strings
+        )
+
+
+@pytest.mark.parametrize(
+    "dir_strings, filename_strings, expected",
+    [
+        (["one_shots"], ["ks", "snare", "hat"], ("One Shot", "Hat", "Unknown")),
+        (["loops", "fx"], ["synth", "vocal"], ("One Shot", "Unknown", "Vox")),
+        ([], ["pack", "loops", "808"], ("Melodic Loop", "Unknown", "Unknown")),
+        (["pack"], ["subbass", "01"], ("Unknown", "Unknown", "Bass")),
+        # Unlike SampleTypeMatcher, "kick" is matched case-insensitively.
+        (["one_shots"], ["Kick", "01"], ("One Shot", "Kick", "Unknown")),
+    ],
+)
+def test_engine_precedence(dir_strings, filename_strings, expected):
+    assert ClassificationEngine().classify(dir_strings, filename_strings) == expected
+
+
+def test_directory_cache_classifies_each_directory_once():
+    dir_cache = DirectoryCache("/splice")
+    origdir = "/splice/packs/vendor/pack_a/one_shots"
+    for filename in ["kick_01", "snare_01", "hat_01"]:
+        dir_strings, dir_sample = dir_cache.lookup(origdir)
+        assert ClassificationEngine().classify(
+            dir_strings, filename.split("_"), dir_sample
+        ) == legacy_classify(list(dir_strings), filename.split("_"))
+
+    assert dir_strings == ("pack_a", "one_shots")
+    info = dir_cache.lookup.cache_info()
+    assert (info.hits, info.misses) == (2, 1)
+    assert dir_cache.hit_rate == pytest.approx(2 / 3)
+    assert "2 hits, 1 misses" in dir_cache.report()
+
+
+def synthetic_table(n_files, seed=0):
+    rng = random.Random(seed)
+    samples = SampleTable()
+    for i in range(n_files):
+        origdir = "/splice/packs/vendor/" + "/".join(rng.sample(VOCAB, 2))
+        filename = "_".join(rng.sample(VOCAB, rng.randint(1, 4))) + ".wav"
+        samples.append(origdir, filename)
+    return samples
+
+
+def test_classify_batch_matches_serial():
+    serial = synthetic_table(2000)
+    classify_table(serial, "/splice", "/dest")
+    batch = synthetic_table(2000)
+    classify_batch(batch, "/splice", "/dest", workers=2, chunk_size=300)
+
+    assert [s.as_dict() for s in batch] == [s.as_dict() for s in serial]
+    assert any(s.newdir for s in batch) and any(s.sample_match_failed for s in batch)
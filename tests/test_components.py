@@ -1,9 +1,123 @@
 import pytest
 import pyglet
 
-from splice_cooker.components import OScope
+np = pytest.importorskip("numpy")
+
+from splice_cooker.components import OScope, ShaderScope  # noqa: E402
+
+theme = {"fg": (0, 255, 0)}
 
 
 def test_oscope():
     window = pyglet.window.Window(caption="test_window")
-    oscope = OScope(window)
+    batch = pyglet.graphics.Batch()
+    oscope = OScope(window, batch, theme)
+    assert oscope.n_rectangles == 25
+    window.close()
+
+
+def test_oscope_bars_share_one_vertex_list():
+    window = pyglet.window.Window(caption="test_window")
+    batch = pyglet.graphics.Batch()
+    oscope = OScope(window, batch, theme, n_rectangles=1000)
+    assert oscope.bars.count == 4000
+
+    # Bars fill the border, left to right, without overlapping.
+    x = np.array(oscope.bars.position).reshape(1000, 4, 2)[:, :, 0]
+    assert x.min() == pytest.approx(oscope.x)
+    assert x.max() == pytest.approx(oscope.x + oscope.width, abs=1)
+    assert (x[1:, 0] > x[:-1, 1]).all()
+
+    values = np.linspace(-1, 1, 1000, dtype=np.float32)
+    oscope.set_amplitudes(values)
+    amplitude = np.array(oscope.bars.amplitude).reshape(1000, 4)
+    np.testing.assert_array_equal(amplitude, np.repeat(values[:, None], 4, axis=1))
+    batch.draw()
+    window.close()
+
+
+def draw(window, batch):
+    window.switch_to()
+    window.clear()
+    batch.draw()
+    buffer = pyglet.image.get_buffer_manager().get_color_buffer()
+    data = buffer.get_image_data().get_data("RGBA", window.width * 4)
+    return np.frombuffer(data, np.uint8).reshape(window.height, window.width, 4)
+
+
+def test_shader_scope_draws_trace_from_texture():
+    window = pyglet.window.Window(960, 540, caption="test_window")
+    batch = pyglet.graphics.Batch()
+    scope = ShaderScope(window, batch, theme, n_samples=1024)
+    scope.set_samples(np.full(1024, 0.5, dtype=np.float32))
+    pixels = draw(window, batch)
+
+    x = int(scope.x + scope.width / 2)
+    center_y = int(scope.y + scope.height / 2)
+    column = pixels[:, x, 1]
+    assert column[center_y + 75] == 255  # 0.5 * scale / 2 above center
+    assert column[center_y] == 0 and column[center_y - 75] == 0
+
+    # A short frame is padded with silence.
+    scope.set_samples(np.full(512, -0.5, dtype=np.float32))
+    pixels = draw(window, batch)
+    assert pixels[center_y - 75, int(scope.x + 10), 1] == 255
+    assert pixels[center_y, int(scope.x + scope.width - 10), 1] == 255
+    scope.delete()
+    window.close()
+
+
+def test_shader_scope_bars():
+    window = pyglet.window.Window(960, 540, caption="test_window")
+    batch = pyglet.graphics.Batch()
+    scope = ShaderScope(window, batch, theme, n_rectangles=25, n_samples=25)
+    scope.set_samples(np.linspace(0, 1, 25, dtype=np.float32))
+    pixels = draw(window, batch)
+
+    center_y = int(scope.y + scope.height / 2)
+    last_bar = int(scope.x + scope.width - scope.rectangle_width / 2)
+    gap = int(scope.x + scope.width - scope.rectangle_width * 1.5)
+    assert pixels[center_y + 140, last_bar, 1] > 0
+    assert pixels[center_y + 140, gap, 1] == 0
+    assert pixels[center_y + 140, int(scope.x + 4), 1] == 0  # silent first bar
+    assert pixels[center_y, int(scope.x + 4), 1] > 0  # still 2px tall
+    scope.delete()
+    window.close()
+
+
+def test_shader_scope_rejects_oversized_texture():
+    window = pyglet.window.Window(caption="test_window")
+    with pytest.raises(ValueError):
+        ShaderScope(window, pyglet.graphics.Batch(), theme, n_samples=1 << 30)
+    window.close()
+
+
+@pytest.fixture
+def gl_window():
+    try:
+        window = pyglet.window.Window(960, 540, caption="test_window")
+    except Exception as e:  # no display, or no usable OpenGL context
+        pytest.skip(f"no OpenGL context: {e}")
+    yield window
+    window.close()
+
+
+def test_shader_scope_runs_on_this_context(gl_window):
+    # Compiles the scope shader and draws one frame with whatever GL is
+    # available: llvmpipe when run headless.
+    from pyglet.gl import GL_NO_ERROR, gl_info, glGetError
+
+    batch = pyglet.graphics.Batch()
+    scope = ShaderScope(gl_window, batch, theme, n_rectangles=25, n_samples=2048)
+    samples = np.zeros(2048, dtype=np.float32)
+    samples[12 * 2048 // 25 + 3] = 1.0  # off the middle bar's center sample
+    scope.set_samples(samples)
+    pixels = draw(gl_window, batch)
+    assert glGetError() == GL_NO_ERROR, gl_info.get_renderer()
+
+    center_y = int(scope.y + scope.height / 2)
+    middle_bar = int(scope.x + 24.5 * scope.rectangle_width)
+    previous_bar = int(scope.x + 22.5 * scope.rectangle_width)
+    assert pixels[center_y + 140, middle_bar, 1] > 0, gl_info.get_renderer()
+    assert pixels[center_y + 140, previous_bar, 1] == 0
+    scope.delete()
@@ -0,0 +1,58 @@
+import pytest
+
+import hashlib
+import os
+
+from splice_cooker.content_hash import ContentHasher, HashCache, _hash_worker, hash_file
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i, size in enumerate([0, 10, 3 << 20, 9 << 20]):
+        path = tmp_path / f"sample_{i}.wav"
+        path.write_bytes(os.urandom(size))
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("algorithm", ["blake2b", "md5"])
+def test_hash_file(files, algorithm):
+    for path in files:
+        with open(path, "rb") as f:
+            expected = hashlib.new(algorithm, f.read()).digest()
+        assert hash_file(path, algorithm) == expected
+
+
+def test_unchanged_files_are_not_reread(files, tmp_path):
+    cache = HashCache(str(tmp_path / "hashes.sqlite"))
+    first = ContentHasher(workers=2, cache=cache)
+    digests = first.hash_paths(files + [str(tmp_path / "missing.wav")])
+    assert digests[-1] is None
+    assert (first.hits, first.misses) == (0, 4)
+
+    second = ContentHasher(workers=2, cache=cache)
+    assert second.hash_paths(files) == digests[:-1]
+    assert (second.hits, second.misses, second.bytes_hashed) == (4, 0, 0)
+
+    with open(files[1], "ab") as f:
+        f.write(b"more")
+    third = ContentHasher(workers=2, cache=cache)
+    assert third.hash_paths(files)[1] == hash_file(files[1])
+    assert (third.hits, third.misses) == (3, 1)
+
+    # A different algorithm has its own cache entries.
+    assert ContentHasher("md5", cache=cache).hash_paths(files)[1] == hash_file(
+        files[1], "md5"
+    )
+
+
+def test_unmappable_file_is_skipped(files, monkeypatch):
+    monkeypatch.setattr("splice_cooker.content_hash.MMAP_THRESHOLD", 0)
+    assert _hash_worker((files[0], "blake2b")) is None  # can't mmap 0 bytes
+    assert _hash_worker((files[1], "blake2b")) == hash_file(files[1])
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        ContentHasher("crc32")
@@ -0,0 +1,88 @@
+import pytest
+
+import errno
+import os
+
+from splice_cooker.copier import CopyExecutor, _kernel_copy
+from splice_cooker.samples import SampleTable
+
+
+@pytest.fixture
+def samples(tmp_path):
+    src = tmp_path / "splice" / "pack"
+    src.mkdir(parents=True)
+    dest = tmp_path / "dest" / "One Shot" / "Kicks"
+    dest.mkdir(parents=True)
+
+    sample_list = SampleTable()
+    for i in range(20):
+        (src / f"kick_{i:02d}.wav").write_bytes(os.urandom(1000 + i))
+        sample = sample_list.append(str(src), f"kick_{i:02d}.wav")
+        sample.newdir = str(dest) + "/"
+    sample_list.append(str(src), "unclassified.wav")
+    (src / "unclassified.wav").write_bytes(b"RIFF")
+    return sample_list
+
+
+def test_copy_samples(samples):
+    stats = CopyExecutor(max_workers=4, per_device=2).copy_samples(samples)
+
+    assert (stats.copied, stats.skipped, stats.failed) == (20, 0, 0)
+    assert stats.bytes_copied == sum(1000 + i for i in range(20))
+    assert stats.bytes_per_sec > 0
+    for sample in samples:
+        if sample.newdir is None:
+            assert sample.status == "not_moved"
+            continue
+        dst = os.path.join(sample.newdir, sample.filename)
+        with open(sample.path, "rb") as a, open(dst, "rb") as b:
+            assert a.read() == b.read()
+        assert os.stat(dst).st_mtime_ns == os.stat(sample.path).st_mtime_ns
+        assert sample.status == "copied"
+    assert not any(name.endswith(".part") for name in os.listdir(samples[0].newdir))
+
+
+def test_identical_destinations_are_skipped(samples):
+    CopyExecutor().copy_samples(samples)
+    stats = CopyExecutor().copy_samples(samples)
+
+    assert (stats.copied, stats.skipped) == (0, 20)
+    assert samples[0].status == "skipped"
+
+
+def test_failed_copy_is_reported(samples, tmp_path):
+    os.remove(samples[3].path)
+    stats = CopyExecutor(reflink=False).copy_samples(samples)
+
+    assert (stats.copied, stats.failed) == (19, 1)
+    assert samples[3].status == "failed"
+
+
+@pytest.mark.parametrize("kernel", [True, False])
+def test_short_source_is_an_error(tmp_path, monkeypatch, kernel):
+    if not kernel:
+        monkeypatch.delattr(os, "copy_file_range", raising=False)
+        monkeypatch.delattr(os, "sendfile", raising=False)
+    src, dst = tmp_path / "src.wav", tmp_path / "dst.wav"
+    src.write_bytes(b"x" * 100)
+    # As if the file shrank after it was stat()ed at 200 bytes.
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        with pytest.raises(OSError) as e:
+            _kernel_copy(s.fileno(), d.fileno(), 200)
+    assert e.value.errno == errno.EIO
+
+
+@pytest.mark.parametrize("fallback", ["sendfile", "buffered"])
+def test_kernel_copy_that_copies_nothing_falls_back(tmp_path, monkeypatch, fallback):
+    if not hasattr(os, "copy_file_range"):
+        pytest.skip("no copy_file_range")
+    calls = []
+    monkeypatch.setattr(os, "copy_file_range", lambda *args: calls.append(args) or 0)
+    if fallback == "buffered":
+        monkeypatch.setattr(os, "sendfile", lambda *args: 0, raising=False)
+    src, dst = tmp_path / "src.wav", tmp_path / "dst.wav"
+    src.write_bytes(b"x" * 100)
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        _kernel_copy(s.fileno(), d.fileno(), 100)
+    assert calls
+    assert dst.read_bytes() == b"x" * 100
@@ -0,0 +1,54 @@
+import pytest
+
+import os
+
+from splice_cooker.crawler import LibraryCrawler
+
+
+@pytest.fixture
+def library(tmp_path):
+    for pack in ["pack_a/one_shots/kicks", "pack_a/loops", "pack_b/fx", "empty"]:
+        (tmp_path / pack).mkdir(parents=True)
+    for path in [
+        "pack_a/one_shots/kicks/kick_01.wav",
+        "pack_a/one_shots/kicks/kick_01.wav.asd",
+        "pack_a/loops/loop_120_Cmin.wav",
+        "pack_a/.DS_Store",
+        "pack_b/fx/riser.aif",
+        "pack_b/fx/.DS_Store",
+        "top.wav",
+    ]:
+        (tmp_path / path).write_bytes(b"RIFF")
+    os.symlink(tmp_path / "pack_b", tmp_path / "pack_a" / "linked")
+    return tmp_path
+
+
+def walk_samples(splice_root, ignore):
+    """Reference implementation: the original os.walk based find_samples."""
+    sample_list = []
+    for dirname, _, filenames in os.walk(splice_root):
+        for filename in filenames:
+            if filename not in ignore and not filename.endswith(".asd"):
+                sample_list.append((dirname, filename))
+    return sample_list
+
+
+def test_crawl_matches_os_walk(library):
+    crawler = LibraryCrawler(str(library), [".DS_Store"], max_workers=4)
+    crawled = sorted(crawler.crawl())
+
+    assert crawled == sorted(walk_samples(str(library), [".DS_Store"]))
+    assert len(crawled) == 4
+    assert crawler.files_found == 4
+    assert crawler.queue_depth == 0
+    assert crawler.files_per_sec > 0
+
+
+def test_crawl_is_lazy(library):
+    crawler = LibraryCrawler(library, [".DS_Store"], max_workers=2)
+    samples = crawler.crawl()
+
+    dirname, filename = next(samples)
+    assert filename.endswith(".wav")
+    samples.close()
+    assert crawler.queue_depth == 0
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from splice_cooker.decimate import Decimator  # noqa: E402
+
+
+@pytest.fixture
+def noise():
+    return np.random.default_rng(0).uniform(-1, 1, 100_000).astype(np.float32)
+
+
+def brute_force(samples, edges):
+    bars = [samples[a:b] for a, b in zip(edges[:-1], edges[1:])]
+    return (
+        np.array([bar.min() for bar in bars]),
+        np.array([bar.max() for bar in bars]),
+        np.array([np.sqrt(np.mean(bar.astype(np.float64) ** 2)) for bar in bars]),
+    )
+
+
+@pytest.mark.parametrize("span", [10, 64, 256, 4096])
+def test_bars_match_brute_force(noise, span):
+    decimator = Decimator(noise, block=64, factor=4)
+    start = 3 * 4096
+    if span >= 64:
+        # Silent until the pyramid is built, which bars only starts.
+        assert not any(
+            bar.any() for bar in decimator.bars(start, start + 20 * span, 20)
+        )
+        decimator.wait()
+    lows, highs, rms = decimator.bars(start, start + 20 * span, 20)
+    edges = start + np.arange(21) * span
+    expected = brute_force(noise, edges)
+    np.testing.assert_allclose(lows, expected[0])
+    np.testing.assert_allclose(highs, expected[1])
+    np.testing.assert_allclose(rms, expected[2], rtol=1e-5)
+    assert (decimator._thread is None) == (span < 64)
+
+
+def test_unaligned_bars_cover_their_window(noise):
+    noise[50_000] = -1.5
+    decimator = Decimator(noise)
+    decimator.wait()
+    lows, highs, rms = decimator.bars(1_000, 99_000, 7)
+    assert lows.min() == -1.5
+    assert (highs > 0.99).all() and (lows < -0.99).all()
+    np.testing.assert_allclose(rms, np.sqrt(1 / 3), rtol=0.02)
+
+
+def test_bars_outside_the_source_are_silent(noise):
+    decimator = Decimator(noise)
+    decimator.wait()
+    lows, highs, rms = decimator.bars(-1000, 1000, 10)
+    assert not (lows[:5].any() or highs[:5].any() or rms[:5].any())
+    assert (highs[5:] > 0).all()
+    lows, highs, rms = decimator.bars(99_000, 200_000, 101)
+    assert highs[0] > 0 and not highs[1:].any()
+    assert not Decimator(noise[:0]).bars(0, 100, 4)[2].any()
+
+
+def test_pyramid_levels(noise):
+    levels = Decimator(noise, block=64, factor=4).levels
+    assert [len(level[0]) for level in levels] == [1563, 391, 98, 25, 7, 2, 1]
+    lows, highs, squares = levels[-1]
+    assert lows[0] == noise.min() and highs[0] == noise.max()
+
+
+def test_no_bars(noise):
+    assert [len(bars) for bars in Decimator(noise).bars(0, 1000, 0)] == [0, 0, 0]
+
+
+def test_pyramid_is_built_in_the_background(tmp_path):
+    soundfile = pytest.importorskip("soundfile")
+    from splice_cooker.audio_source import open_audio
+
+    path = tmp_path / "loop.flac"
+    soundfile.write(path, np.full(50_000, 0.5), 8000)
+    ready = threading.Event()
+    with open_audio(path) as source:
+        decimator = Decimator(source, on_ready=ready.set)
+        assert not decimator.bars(0, 50_000, 10)[1].any()
+        assert ready.wait(10)
+        np.testing.assert_allclose(decimator.bars(0, 50_000, 10)[1], 0.5, atol=1e-3)
+        assert source.decoded == 0  # read through its own handle
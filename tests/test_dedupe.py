@@ -0,0 +1,50 @@
+import pytest
+
+import os
+
+from splice_cooker.content_hash import ContentHasher
+from splice_cooker.dedupe import find_duplicates, link_file
+from splice_cooker.samples import SampleTable
+
+
+@pytest.fixture
+def samples(tmp_path):
+    dest = tmp_path / "dest" / "One Shot" / "Kicks"
+    dest.mkdir(parents=True)
+    contents = {
+        "pack_a/kick_01.wav": b"kick" * 100,
+        "pack_b/big_kick.wav": b"kick" * 100,
+        "pack_c/kick_hard.wav": b"kick" * 100,
+        "pack_a/kick_02.wav": b"other kick",
+        "pack_b/kick_02.wav": b"other kick",
+        "pack_c/unique_kick.wav": b"unique",
+    }
+    sample_list = SampleTable()
+    for path, data in contents.items():
+        src = tmp_path / "splice" / path
+        src.parent.mkdir(parents=True, exist_ok=True)
+        src.write_bytes(data)
+        sample = sample_list.append(str(src.parent), src.name)
+        sample.newdir = str(dest)
+    return sample_list
+
+
+def test_find_duplicates(samples):
+    digests = ContentHasher(workers=1).hash_samples(samples)
+    groups = sorted(find_duplicates(samples, digests).values())
+
+    assert groups == [[0, 1, 2], [3, 4]]
+
+
+def test_link_file_replaces_stale_temp(tmp_path):
+    src = tmp_path / "kick.wav"
+    src.write_bytes(b"kick")
+    dst = tmp_path / "big_kick.wav"
+    dst.write_bytes(b"old")
+    # A temp link left by an interrupted run must not block linking.
+    (tmp_path / "big_kick.wav.link.part").write_bytes(b"")
+
+    link_file(str(src), str(dst), "hardlink")
+
+    assert os.path.samefile(src, dst)
+    assert not (tmp_path / "big_kick.wav.link.part").exists()
@@ -0,0 +1,65 @@
+import pytest
+import pyglet
+
+from splice_cooker.frames import FrameScheduler, FrameStats
+
+
+class Player:
+    playing = False
+
+
+def tick(scheduler):
+    scheduler.tick(0.01)
+    scheduler.window.dispatch_events()  # queued until the app loop runs
+
+
+def move_mouse(window):
+    window.dispatch_event("on_mouse_motion", 10, 10, 1, 1)
+    window.dispatch_events()
+
+
+@pytest.fixture
+def window():
+    window = pyglet.window.Window(caption="test_window")
+    window.dispatch_events()
+    yield window
+    window.close()
+
+
+def test_frame_stats():
+    stats = FrameStats()
+    assert stats.mean("update") == 0.0
+    with stats.time("update"):
+        pass
+    with stats.time("update"):
+        sum(range(10000))
+    stats.frames = 2
+    assert 0 < stats.mean("update") <= stats.worst["update"]
+    assert "update" in stats.report() and "Frames: 2" in stats.report()
+
+
+def test_scheduler_draws_only_when_invalid(window):
+    draws, updates = [], []
+    window.push_handlers(on_draw=lambda: draws.append(1))
+    player = Player()
+    scheduler = FrameScheduler(window, player, updates.append)
+    assert scheduler.ticking
+
+    tick(scheduler)
+    assert len(draws) == len(updates) == scheduler.stats.frames == 1
+    tick(scheduler)  # nothing changed: no frame, and ticks stop
+    assert len(draws) == 1 and not scheduler.ticking
+
+    move_mouse(window)
+    assert scheduler.ticking
+    tick(scheduler)
+    assert len(draws) == 2
+
+    player.playing = True
+    for _ in range(3):
+        tick(scheduler)
+    assert len(draws) == 5 and scheduler.ticking
+
+    scheduler.stop()
+    move_mouse(window)
+    assert not scheduler.ticking
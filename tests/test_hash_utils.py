@@ -0,0 +1,194 @@
+import gc
+import hashlib
+import os
+import struct
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import pytest
+
+from splice_cooker import hash_utils
+from splice_cooker.hash_utils import _JSON_VERSION, _VERSION, get_hash, get_hashes
+
+
+@dataclass(frozen=True)
+class Record:
+    filename: str
+    bpm: Optional[int] = None
+    tags: Tuple[str, ...] = ()
+    status: str = "not_moved"
+    _hash_exclude_ = ("status",)
+
+
+@dataclass(frozen=True)
+class RecordV2(Record):
+    key: Optional[str] = None
+    children: Tuple[Record, ...] = ()
+
+
+@dataclass
+class ListRecord:
+    filename: str
+    bpm: Optional[int] = None
+    tags: List[str] = field(default_factory=list)
+
+
+@pytest.mark.parametrize("version", [_JSON_VERSION, _VERSION])
+def test_version_prefix(version):
+    digest = get_hash(Record("kick.wav", 120), version)
+    assert len(digest) == 16
+    assert digest[0] == version
+
+
+@pytest.mark.parametrize("version", [1, 99])
+def test_unknown_version(version):
+    with pytest.raises(ValueError):
+        get_hash(Record("kick.wav"), version)
+
+
+def _blake2b(data):
+    return bytes([_VERSION]) + hashlib.blake2b(data, digest_size=15).digest()
+
+
+def test_binary_format():
+    # Pinned: digests are persisted, so changing these needs a new _VERSION.
+    assert get_hash("kick") == _blake2b(b"Vs" + struct.pack("<I", 4) + b"kick")
+    assert get_hash(Record("kick.wav", 120, ("a", "bc"))) == _blake2b(
+        b"D"
+        + struct.pack("<I", 3)
+        + b"sss"
+        + struct.pack("<3I", 3, 8, 4)
+        + b"bpmfilenametags"
+        + b"isL"
+        + struct.pack("<Iq", 8, 120)
+        + b"kick.wav"
+        + b"L"
+        + struct.pack("<I", 2)
+        + b"ss"
+        + struct.pack("<2I", 1, 2)
+        + b"abc"
+    )
+    assert get_hash([None, 1.5, True, 2**64]) == _blake2b(
+        b"VLL"
+        + struct.pack("<I", 4)
+        + b"nfbI"
+        + struct.pack("<d?", 1.5, True)
+        + struct.pack("<I", 20)
+        + b"18446744073709551616"
+    )
+
+
+def test_record_variants_hash_apart():
+    records = [
+        Record("kick.wav"),
+        Record("kick.wav", 120),
+        Record("kick.wav", 120, ("dusty", "warm")),
+        Record("", 0, ()),
+        Record("kick.wav", 2**63),
+        Record("kick.wav", -(2**63)),
+        Record("kick.wav", tags=("", "dusty")),
+        Record("kick.wav", tags=(1, 2.5)),
+        Record("kïck 🥁.wav", tags=("\udcff",)),
+        RecordV2("kick.wav", children=(Record("snare.wav"),)),
+    ]
+    # The first call for a class builds its plan.
+    first = [get_hash(record) for record in records]
+    assert [get_hash(record) for record in records] == first
+    assert len(set(first)) == len(first)
+
+
+def test_excluded_and_empty_fields_are_ignored():
+    record = Record("kick.wav", 120)
+    assert get_hash(Record("kick.wav", 120, status="copied")) == get_hash(record)
+    assert get_hash(RecordV2("kick.wav", 120)) == get_hash(record)
+    assert get_hash(ListRecord("kick.wav", 120)) == get_hash(record)
+    assert get_hash({"filename": "kick.wav", "bpm": 120}) == get_hash(record)
+    assert get_hash(Record("kick.wav", 120, tags=("a",))) != get_hash(record)
+    assert get_hash(Record("kick.wav", 0)) != get_hash(Record("kick.wav"))
+
+
+def test_lists_and_tuples_hash_alike():
+    assert get_hash(ListRecord("kick.wav", tags=["a", "b"])) == get_hash(
+        Record("kick.wav", tags=("a", "b"))
+    )
+    assert get_hash([1, [2, 3]]) == get_hash((1, (2, 3)))
+
+
+def test_nested_values():
+    assert get_hash({"b": 1, "a": [Record("kick.wav")]}) == get_hash(
+        {"a": ({"filename": "kick.wav"},), "b": 1}
+    )
+    assert get_hash(True) != get_hash(1)
+    assert get_hash(1) != get_hash(1.0)
+    assert get_hash("1") != get_hash(1)
+    assert get_hash(["a", "b"]) != get_hash(["ab"])
+    assert get_hash(2**63) != get_hash(str(2**63))
+    assert get_hash(2**63 - 1) != get_hash(2**63)
+
+
+def test_dataclass_hashes_like_its_dict():
+    records = [
+        Record("kïck 🥁.wav", 2**63, ("\udcff", "")),
+        Record("kick.wav", -1, ("dusty",)),
+    ]
+    for record in records:
+        as_dict = {"filename": record.filename, "bpm": record.bpm}
+        assert get_hash(record) == get_hash({**as_dict, "tags": list(record.tags)})
+
+
+@pytest.mark.parametrize("thing", [{1, 2}, object(), Record, b"bytes"])
+def test_unsupported_types(thing):
+    with pytest.raises(TypeError):
+        get_hash(thing)
+
+
+def test_stable_across_processes():
+    code = (
+        "from splice_cooker.hash_utils import get_hash;"
+        "print(get_hash({'kick': ('dusty', 1.5, None, True)}).hex())"
+    )
+    digests = {
+        subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert digests == {get_hash({"kick": ("dusty", 1.5, None, True)}).hex() + "\n"}
+
+
+def test_get_hashes(monkeypatch):
+    records = [Record(f"kick_{i}.wav", i) for i in range(20)]
+    expected = [get_hash(record) for record in records]
+    assert get_hashes(records) == expected
+    assert get_hashes(records, version=_JSON_VERSION) == [
+        get_hash(record, _JSON_VERSION) for record in records
+    ]
+
+    monkeypatch.setattr(hash_utils, "_CHUNK_SIZE", 3)
+    assert get_hashes(iter(records), workers=2) == expected
+
+
+def test_get_hashes_memo(monkeypatch):
+    hash_utils.clear_memo()
+    frozen = [Record(f"kick_{i}.wav", i) for i in range(5)]
+    mutable = [ListRecord(f"kick_{i}.wav", i) for i in range(5)]
+    expected = get_hashes(frozen + mutable)
+    assert get_hashes(frozen + mutable, memo=True) == expected
+    assert len(hash_utils._memo) == len(frozen)
+
+    calls = []
+    monkeypatch.setattr(
+        hash_utils, "_hash_chunk", lambda args: calls.append(args) or []
+    )
+    assert get_hashes(frozen, memo=True) == expected[:5]
+    assert calls == [([], _VERSION)]
+
+    del frozen
+    gc.collect()
+    assert hash_utils._memo == {}
@@ -0,0 +1,114 @@
+import pytest
+
+import os
+
+from splice_cooker.journal import Journal
+from splice_cooker.plan import Operation, PlanExecutor
+
+
+@pytest.fixture
+def plan(tmp_path):
+    operations = []
+    for i in range(10):
+        src = tmp_path / "splice" / f"pack_{i % 2}" / f"sample_{i}.wav"
+        src.parent.mkdir(parents=True, exist_ok=True)
+        src.write_bytes(b"RIFF" * (i + 1))
+        dst = tmp_path / "dest" / f"sample_{i}.wav"
+        operations.append(Operation("copy", str(src), str(dst), 4 * (i + 1)))
+    return operations
+
+
+def test_journal_round_trip(tmp_path, plan):
+    path = tmp_path / "plan.journal"
+    with Journal(path) as journal:
+        journal.record(plan[0], "copied")
+        journal.record(plan[1], "failed")
+        journal.record(plan[2], "skipped")
+
+    reopened = Journal(path)
+    assert plan[0] in reopened and plan[2] in reopened
+    assert plan[1] not in reopened
+    reopened.close()
+
+
+def test_torn_last_line_is_dropped(tmp_path, plan):
+    path = tmp_path / "plan.journal"
+    with Journal(path) as journal:
+        journal.record(plan[0], "copied")
+    with open(path, "a") as f:
+        f.write('{"op":"copy","src":')
+
+    with Journal(path) as journal:
+        assert len(journal) == 1
+        journal.record(plan[1], "copied")
+    with Journal(path) as journal:
+        assert plan[0] in journal and plan[1] in journal
+
+
+def test_fsyncs_are_batched(tmp_path, plan):
+    with Journal(tmp_path / "plan.journal", sync_every=4, sync_interval=60) as j:
+        for operation in plan:
+            j.record(operation, "copied")
+        assert j.syncs == 2
+    assert j.syncs == 3
+
+
+def test_resume_after_crash(tmp_path, plan):
+    path = tmp_path / "plan.journal"
+    executor = PlanExecutor(batch_size=4, journal=Journal(path))
+    copy = executor.copier.copy
+    copied = []
+
+    def crashing_copy(src, dst):
+        if len(copied) == 6:
+            raise KeyboardInterrupt
+        copied.append(src)
+        return copy(src, dst)
+
+    executor.copier.copy = crashing_copy
+    executor.copier.max_workers = 1
+    with pytest.raises(KeyboardInterrupt):
+        executor.execute(plan)
+    executor.journal.close()
+
+    resumed = PlanExecutor(journal=Journal(path))
+    recopied = []
+    copy = resumed.copier.copy
+    resumed.copier.copy = lambda src, dst: recopied.append(src) or copy(src, dst)
+    stats = resumed.execute(plan)
+    resumed.journal.close()
+
+    assert resumed.resumed == 6
+    assert stats.copied == 4
+    assert not set(recopied) & set(copied)
+    for operation in plan:
+        assert os.path.getsize(operation.dst) == operation.size
+
+
+def test_journal_of_another_plan_is_discarded(tmp_path, plan):
+    path = tmp_path / "plan.journal"
+    with Journal(path, "plan-1") as journal:
+        journal.record(plan[0], "copied")
+
+    with Journal(path, "plan-1") as journal:
+        assert plan[0] in journal and not journal.discarded
+    with Journal(path, "plan-2") as journal:
+        assert len(journal) == 0 and journal.discarded
+        journal.record(plan[1], "copied")
+    with Journal(path, "plan-2") as journal:
+        assert plan[1] in journal and plan[0] not in journal
+
+
+def test_journal_is_removed_after_a_full_run(tmp_path, plan):
+    path = tmp_path / "plan.journal"
+    with Journal(path, "plan-1") as journal:
+        PlanExecutor(journal=journal).execute(plan)
+    assert not path.exists()
+
+    # A later run of the same plan redoes everything, e.g. a deleted copy.
+    os.remove(plan[0].dst)
+    with Journal(path, "plan-1") as journal:
+        executor = PlanExecutor(journal=journal)
+        stats = executor.execute(plan)
+    assert (executor.resumed, stats.copied, stats.skipped) == (0, 1, 9)
+    assert os.path.exists(plan[0].dst)
@@ -0,0 +1,104 @@
+import json
+import os
+
+import pytest
+
+from splice_cooker.merkle import MerkleTree
+from splice_cooker.samples import SampleTable
+
+ROOT = os.path.join(os.sep, "splice", "packs")
+
+
+def library(n_packs=20, files_per_dir=5, skip=(), extra=()):
+    samples = SampleTable()
+    for pack in range(n_packs):
+        for subdir in ("one_shots", "loops"):
+            origdir = os.path.join(ROOT, f"pack_{pack:02d}", subdir)
+            for i in range(files_per_dir):
+                filename = f"sample_{i}.wav"
+                if os.path.join(origdir, filename) not in skip:
+                    samples.append(origdir, filename).sampletype = "One Shot"
+    for path in extra:
+        samples.append(*os.path.split(path))
+    return samples
+
+
+def test_identical_snapshots_compare_at_the_root():
+    old = MerkleTree.build(library(), ROOT)
+    new = MerkleTree.build(library(), ROOT)
+    assert old.hash == new.hash
+    diff = old.diff(new)
+    assert not diff
+    assert diff.nodes_visited == 1
+
+
+def test_diff_only_descends_into_changed_subtrees():
+    old = MerkleTree.build(library(), ROOT)
+
+    changed = os.path.join(ROOT, "pack_07", "loops", "sample_3.wav")
+    removed = os.path.join(ROOT, "pack_07", "loops", "sample_4.wav")
+    added = os.path.join(ROOT, "pack_07", "loops", "sample_9.wav")
+    samples = library(skip={removed}, extra=[added])
+    for sample in samples:
+        if sample.path == changed:
+            sample.sampletype = "Melodic Loop"
+    new = MerkleTree.build(samples, ROOT)
+
+    diff = old.diff(new)
+    assert diff.changed == [changed]
+    assert diff.removed == [removed]
+    assert diff.added == [added]
+    # root, pack_07, and pack_07's two subdirectories; 19 other packs.
+    assert diff.nodes_visited == 1 + 20 + 2
+
+
+def test_new_and_removed_packs():
+    old = MerkleTree.build(library(n_packs=3), ROOT)
+    new = MerkleTree.build(library(n_packs=4), ROOT)
+    diff = old.diff(new)
+    assert len(diff.added) == 10
+    assert all(path.startswith(os.path.join(ROOT, "pack_03")) for path in diff.added)
+    assert len(new.diff(old).removed) == 10
+
+
+def test_status_does_not_change_the_hash():
+    samples = library(n_packs=1)
+    before = MerkleTree.build(samples, ROOT).hash
+    samples[0].status = "copied"
+    assert MerkleTree.build(samples, ROOT).hash == before
+
+
+def test_stats_change_the_hash():
+    samples = library(n_packs=1)
+    stats = {sample.path: (4, 1000, 1) for sample in samples}
+    old = MerkleTree.build(samples, ROOT, stats)
+    stats[samples[0].path] = (8, 2000, 1)
+    new = MerkleTree.build(samples, ROOT, stats)
+    assert old.diff(new).changed == [samples[0].path]
+
+
+def test_save_and_load(tmp_path):
+    tree = MerkleTree.build(library(n_packs=2), ROOT)
+    tree.save(tmp_path / "snapshot.merkle")
+    loaded = MerkleTree.load(tmp_path / "snapshot.merkle")
+    assert loaded.hash == tree.hash
+    assert loaded.splice_root == ROOT
+    assert not loaded.diff(tree)
+
+
+def test_snapshot_is_versioned_json(tmp_path):
+    samples = library(n_packs=1, extra=[os.path.join(ROOT, "päck", "kïck\udcff.wav")])
+    tree = MerkleTree.build(samples, ROOT)
+    path = tmp_path / "snapshot.merkle"
+    tree.save(path)
+    assert (
+        json.loads(path.read_bytes().decode("utf-8", "surrogateescape"))["version"] == 1
+    )
+    assert not MerkleTree.load(path).diff(tree)
+
+    path.write_text(json.dumps({"version": 99}))
+    with pytest.raises(ValueError):
+        MerkleTree.load(path)
+    path.write_bytes(b"\xfb\x00\x00")
+    with pytest.raises(ValueError):
+        MerkleTree.load(path)
@@ -0,0 +1,112 @@
+import pytest
+
+import struct
+import wave
+
+from splice_cooker.peaks import PeakBuilder, PeakCache, compute_peaks
+from splice_cooker.samples import SampleTable
+
+
+def write_wav(path, samples, channels=1, width=2):
+    fmt = {1: "B", 2: "h", 4: "i"}[width]
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(8000)
+        w.writeframes(struct.pack(f"<{len(samples)}{fmt}", *samples))
+
+
+def test_pcm_levels(tmp_path):
+    path = tmp_path / "ramp.wav"
+    # Two blocks of 4 frames: a quiet one and a loud one, in stereo.
+    frames = [100, -100] * 4 + [32767, -32768] * 4
+    write_wav(path, frames, channels=2)
+
+    frames_, rate, channels, levels = compute_peaks(path, block=4, factor=2)
+    assert (frames_, rate, channels) == (8, 8000, 2)
+    assert len(levels) == 2
+    assert struct.unpack("4b", levels[0]) == (-1, 0, -128, 127)
+    assert struct.unpack("2b", levels[1]) == (-128, 127)
+
+
+def test_other_encodings(tmp_path):
+    unsigned = tmp_path / "u8.wav"
+    write_wav(unsigned, [0, 128, 255, 128], width=1)
+    assert compute_peaks(unsigned, block=4)[3][0] == struct.pack("2b", -128, 127)
+
+    aiff = tmp_path / "s24.aif"
+    rate = struct.pack(">HQ", 16383 + 12, 8000 << 51)
+    comm = struct.pack(">hIh", 1, 2, 24) + rate
+    ssnd = struct.pack(">II", 0, 0) + b"\x40\x00\x00" + b"\xc0\x00\x01"
+    chunks = b"COMM" + struct.pack(">I", len(comm)) + comm
+    chunks += b"SSND" + struct.pack(">I", len(ssnd)) + ssnd
+    aiff.write_bytes(b"FORM" + struct.pack(">I", 4 + len(chunks)) + b"AIFF" + chunks)
+    frames, rate, channels, levels = compute_peaks(aiff, block=4)
+    assert (frames, rate, channels) == (2, 8000, 1)
+    assert levels[0] == struct.pack("2b", -64, 64)
+
+    floats = tmp_path / "f32.wav"
+    data = struct.pack("<4f", 0.5, -0.25, 1.5, 0.0)
+    fmt = struct.pack("<HHIIHH", 3, 1, 8000, 32000, 4, 32)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    body += b"data" + struct.pack("<I", len(data)) + data
+    floats.write_bytes(b"RIFF" + struct.pack("<I", len(body)) + body)
+    assert compute_peaks(floats, block=4)[3][0] == struct.pack("2b", -32, 127)
+
+    (tmp_path / "notes.txt").write_text("not audio")
+    assert compute_peaks(tmp_path / "notes.txt") is None
+
+
+def test_cache_round_trip(tmp_path):
+    samples = SampleTable()
+    for i, name in enumerate(["a.wav", "b.wav", "copy_of_a.wav"]):
+        write_wav(tmp_path / name, [(i % 2) * 1000 + j for j in range(1000)])
+        samples.append(str(tmp_path), name)
+    digests = [b"a" * 32, b"b" * 32, b"a" * 32]
+
+    path = tmp_path / "cache" / "peaks.bin"
+    with PeakCache(path) as cache:
+        builder = PeakBuilder(cache, workers=1)
+        assert builder.build_samples(samples, digests) == 2
+        peaks = cache.get(digests[1])
+        assert (peaks.frames, peaks.samplerate, peaks.channels) == (1000, 8000, 1)
+        assert [len(level) // 2 for level in peaks.levels] == [4, 1]
+        assert peaks.thumbnail(2) == [(3, 5), (5, 7)]
+        assert len(peaks.thumbnail(10)) == 10
+
+    with open(path, "ab") as f:
+        f.write(b"PEAK\xff\xff")  # torn append
+    with PeakCache(path) as cache:
+        assert len(cache) == 2
+        builder = PeakBuilder(cache, workers=1)
+        assert builder.build_samples(samples, digests) == 0
+        assert builder.hits == 3
+        assert cache.get(digests[0]).levels[-1].tolist() == [0, 3]
+        assert cache.get(b"c" * 32) is None
+    assert not path.read_bytes().endswith(b"PEAK\xff\xff")
+
+
+@pytest.mark.parametrize("width", [1, 3, 100])
+def test_thumbnail_width(tmp_path, width):
+    write_wav(tmp_path / "short.wav", [0, 1000, -1000])
+    with PeakCache(tmp_path / "peaks.bin") as cache:
+        cache.add(b"d", compute_peaks(tmp_path / "short.wav"))
+        assert cache.get(b"d").thumbnail(width) == [(-4, 3)] * width
+
+
+def test_malformed_header_is_skipped(tmp_path):
+    # block_align 0: no sample width to step through the data with.
+    fmt = struct.pack("<HHIIHH", 1, 2, 8000, 0, 0, 16)
+    body = b"WAVE" + struct.pack("<4sI", b"fmt ", len(fmt)) + fmt
+    body += struct.pack("<4sI", b"data", 8) + b"\0" * 8
+    (tmp_path / "bad.wav").write_bytes(b"RIFF" + struct.pack("<I", len(body)) + body)
+    write_wav(tmp_path / "good.wav", [0, 1000, -1000, 0])
+    assert compute_peaks(tmp_path / "bad.wav") is None
+
+    samples = SampleTable()
+    samples.append(str(tmp_path), "bad.wav")
+    samples.append(str(tmp_path), "good.wav")
+    with PeakCache(tmp_path / "peaks.bin") as cache:
+        builder = PeakBuilder(cache, workers=1)
+        assert builder.build_samples(samples, [b"bad", b"good"]) == 1
+        assert builder.failed == 1 and b"good" in cache
@@ -0,0 +1,60 @@
+import pytest
+
+import os
+import threading
+
+from splice_cooker.content_hash import hash_file, stat_key
+from splice_cooker.pipeline import Pipeline
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "splice"
+    for pack in range(3):
+        one_shots = root / "packs" / "vendor" / f"pack_{pack}" / "one_shots"
+        one_shots.mkdir(parents=True)
+        for i in range(7):
+            (one_shots / f"kick_{pack}_{i}.wav").write_bytes(b"RIFF kick %d" % i)
+        (one_shots / "kick_0_0.wav.asd").write_bytes(b"analysis")
+    return root
+
+
+def test_pipeline_copies_everything(library, tmp_path):
+    batches = []
+
+    def on_batch(chunk, digests, keys):
+        # On the caller's thread, so its SQLite connections can be used.
+        assert threading.current_thread() is threading.main_thread()
+        batches.append((chunk, digests, keys))
+
+    pipeline = Pipeline(
+        library,
+        tmp_path / "dest",
+        workers=2,
+        batch_size=4,
+        queue_size=1,
+        on_batch=on_batch,
+    )
+    stats = pipeline.run()
+
+    assert (stats.scanned, stats.classified, stats.hashed) == (21, 21, 21)
+    assert stats.batches == len(batches) == 6
+    assert stats.copy.copied == 21
+    kicks = tmp_path / "dest" / "One Shot" / "Kicks"
+    assert len(os.listdir(kicks)) == 21
+    for chunk, digests, keys in batches:
+        for sample, digest, key in zip(chunk, digests, keys):
+            assert sample.status == "copied"
+            assert digest == hash_file(sample.path)
+            assert key == stat_key(os.stat(sample.path))
+
+
+def test_copy_failure_stops_the_pipeline(library, tmp_path):
+    pipeline = Pipeline(library, tmp_path / "dest", workers=1, batch_size=2)
+
+    def broken_copy(sample_list):
+        raise RuntimeError("disk on fire")
+
+    pipeline.copier.copy_samples = broken_copy
+    with pytest.raises(RuntimeError):
+        pipeline.run()
@@ -0,0 +1,119 @@
+import pytest
+
+import json
+import os
+
+from splice_cooker.content_hash import ContentHasher
+from splice_cooker.plan import (
+    Operation,
+    PlanExecutor,
+    make_plan,
+    read_plan,
+    write_plan,
+)
+from splice_cooker.samples import SampleTable
+
+
+@pytest.fixture
+def samples(tmp_path):
+    contents = {
+        "pack_b/kick_01.wav": b"kick" * 100,
+        "pack_a/big_kick.wav": b"kick" * 100,
+        "pack_a/snare.wav": b"snare",
+        "pack_b/unfiled.wav": b"???",
+    }
+    sample_list = SampleTable()
+    for path, data in contents.items():
+        src = tmp_path / "splice" / path
+        src.parent.mkdir(parents=True, exist_ok=True)
+        src.write_bytes(data)
+        sample = sample_list.append(str(src.parent), src.name)
+        if src.name != "unfiled.wav":
+            sample.newdir = str(tmp_path / "dest" / "One Shots" / src.stem)
+    return sample_list
+
+
+def test_plan_round_trip(samples, tmp_path):
+    stats = {sample.path: (os.stat(sample.path).st_size, 0, 0) for sample in samples}
+    digests = ContentHasher(workers=1).hash_samples(samples)
+    plan = list(make_plan(samples, stats, digests))
+
+    assert [op.op for op in plan] == ["copy"] * 3
+    assert plan[0] == Operation(
+        "copy",
+        samples[0].path,
+        os.path.join(samples[0].newdir, "kick_01.wav"),
+        400,
+        digests[0].hex(),
+    )
+
+    path = tmp_path / "plan.jsonl"
+    assert write_plan(path, plan) == 3
+    lines = path.read_text().splitlines()
+    assert json.loads(lines[2])["src"] == samples[2].path
+    assert list(read_plan(path)) == plan
+
+
+def test_unknown_operation():
+    with pytest.raises(ValueError):
+        Operation.from_line('{"op":"move","src":"a","dst":"b"}')
+
+
+def test_links_follow_copies(samples):
+    digests = ContentHasher(workers=1).hash_samples(samples)
+    plan = list(make_plan(samples, digests=digests, link_mode="hardlink"))
+
+    assert [op.op for op in plan] == ["copy", "copy", "hardlink"]
+    assert plan[2].src == plan[0].dst
+    assert plan[2].dst == os.path.join(samples[1].newdir, "big_kick.wav")
+
+
+def test_execute_plan(samples, tmp_path):
+    digests = ContentHasher(workers=1).hash_samples(samples)
+    path = tmp_path / "plan.jsonl"
+    write_plan(path, make_plan(samples, digests=digests, link_mode="hardlink"))
+
+    done = []
+    executor = PlanExecutor(batch_size=2)
+    stats = executor.execute(read_plan(path), lambda op, status: done.append(status))
+
+    assert (stats.copied, executor.dedupe.linked) == (2, 1)
+    assert (executor.dedupe.groups, executor.dedupe.bytes_saved) == (1, 400)
+    assert sorted(done) == ["copied", "copied", "linked"]
+    kick = os.path.join(samples[0].newdir, "kick_01.wav")
+    big_kick = os.path.join(samples[1].newdir, "big_kick.wav")
+    assert os.path.samefile(kick, big_kick)
+    with open(os.path.join(samples[2].newdir, "snare.wav"), "rb") as f:
+        assert f.read() == b"snare"
+
+    again = PlanExecutor().execute(read_plan(path))
+    assert (again.copied, again.skipped) == (0, 2)
+
+
+def test_failed_leader_is_replaced(samples, tmp_path):
+    src = tmp_path / "splice" / "pack_c" / "hard_kick.wav"
+    src.parent.mkdir()
+    src.write_bytes(b"kick" * 100)
+    third = samples.append(str(src.parent), src.name)
+    third.newdir = str(tmp_path / "dest" / "One Shots" / "hard_kick")
+    digests = ContentHasher(workers=1).hash_samples(samples)
+    plan = list(make_plan(samples, digests=digests, link_mode="hardlink"))
+    os.remove(samples[0].path)  # the group's copy will fail
+
+    executor = PlanExecutor()
+    stats = executor.execute(plan)
+
+    assert (stats.copied, stats.failed) == (2, 1)  # big_kick promoted, snare
+    assert (executor.dedupe.linked, executor.dedupe.failed) == (1, 0)
+    assert os.path.samefile(plan[-2].dst, plan[-1].dst)
+    assert "1 duplicate groups" in executor.report()
+
+
+def test_batches_are_ordered_by_source_directory(samples):
+    order = []
+    executor = PlanExecutor()
+    executor.copier.copy = lambda src, dst: order.append(src) or "copied"
+    executor.copier.max_workers = 1
+    executor.execute(make_plan(samples))
+
+    assert order == sorted(order)
@@ -0,0 +1,91 @@
+import pytest
+
+import sys
+
+from splice_cooker.samples import SampleTable
+
+
+def test_sample_view_round_trip():
+    samples = SampleTable()
+    kick = samples.append("/splice/pack/one_shots", "kick_01.wav")
+    samples.append("/splice/pack/one_shots", "snare_01.wav")
+
+    assert kick.as_dict() == {
+        "filename": "kick_01.wav",
+        "origdir": "/splice/pack/one_shots",
+        "newdir": None,
+        "sampletype": None,
+        "isdrum": None,
+        "drumtype": None,
+        "isinst": None,
+        "insttype": None,
+        "key": None,
+        "bpm": None,
+        "status": "not_moved",
+        "sample_match_failed": False,
+        "samplerate": None,
+        "channels": None,
+        "bitdepth": None,
+        "frames": None,
+        "loop_start": None,
+        "loop_end": None,
+        "root_note": None,
+        "beats": None,
+    }
+
+    kick.newdir = "/dest/One Shot/Kicks/"
+    kick.sampletype = "One Shot"
+    kick.drumtype = "Kick"
+    kick.isdrum = True
+    kick.key = "Cmin"
+    kick.bpm = 120
+    kick.sample_match_failed = True
+    kick.sample_match_failed = False
+
+    kick = samples[0]
+    assert kick.newdir == "/dest/One Shot/Kicks/"
+    assert (kick.sampletype, kick.drumtype, kick.insttype) == ("One Shot", "Kick", None)
+    assert (kick.isdrum, kick.isinst, kick.sample_match_failed) == (True, None, False)
+    assert (kick.key, kick.bpm) == ("Cmin", 120)
+    assert kick.path == "/splice/pack/one_shots/kick_01.wav"
+    assert samples[-1].filename == "snare_01.wav"
+    assert len(samples.dirs) == 2  # None + one interned directory
+
+    with pytest.raises(KeyError):
+        kick.sampletype = "Not A Type"
+    with pytest.raises(IndexError):
+        samples[2]
+
+
+def test_false_and_fractional_values_round_trip():
+    samples = SampleTable()
+    samples.extend([("/splice/pack/loops", "bass_01.wav")] * 3)
+    bass = samples[0]
+    bass.isdrum = False
+    bass.isinst = True
+    bass.bpm = 93.37
+    assert (bass.isdrum, bass.isinst, bass.bpm) == (False, True, 93.37)
+
+    chunk = samples.take(0, 1)
+    assert (chunk[0].isdrum, chunk[0].isinst, chunk[0].bpm) == (False, True, 93.37)
+    samples.import_meta(2, chunk.export_meta())
+    assert samples[2].as_dict() == bass.as_dict()
+    assert (samples[1].isdrum, samples[1].isinst) == (None, None)
+
+    bass.isdrum = None
+    assert bass.isdrum is None
+
+
+def test_table_is_compact():
+    n = 10_000
+    dirs = [f"/splice/packs/pack_{i // 500:03d}/one_shots/drums" for i in range(n)]
+    names = [f"PACK_kick_punchy_{i:06d}_one_shot.wav" for i in range(n)]
+
+    samples = SampleTable()
+    samples.extend(zip(dirs, names))
+
+    dict_bytes = sum(
+        sys.getsizeof(sample.as_dict()) + sys.getsizeof(sample.filename) + 8
+        for sample in samples
+    )
+    assert dict_bytes / samples.nbytes() >= 5
@@ -0,0 +1,86 @@
+import pytest
+
+from splice_cooker.catalog import SampleCatalog
+from splice_cooker.classify import classify_table
+from splice_cooker.samples import SampleTable
+from splice_cooker.tempo_key import (
+    TempoKeyAnalyzer,
+    TempoKeyCache,
+    estimate_key,
+    parse_tempo_key,
+)
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [
+        ("SO_CR_120_Cmin_synth_loop.wav", (120.0, "Cmin")),
+        ("KSHMR_bass_loop_128_F#m.wav", (128.0, "F#min")),
+        ("pad_loop_Ebmaj_90bpm.wav", (90.0, "Ebmaj")),
+        ("chords_loop_A_minor_100.wav", (100.0, "Amin")),
+        ("keys-loop-Db-85.5BPM.aif", (85.5, "C#maj")),
+        ("vocal_loop_bpm140_G.wav", (140.0, "Gmaj")),
+        ("guitar_loop_174_bpm_Bbm.wav", (174.0, "Bbmin")),
+        ("drum_loop_01_a.wav", (None, None)),
+        ("fm_bass_loop_808.wav", (None, None)),
+    ],
+)
+def test_parse_tempo_key(filename, expected):
+    assert parse_tempo_key(filename) == expected
+
+
+def test_bare_values_need_context():
+    assert parse_tempo_key("kick_120_A.wav", loop=False, pitched=False) == (
+        None,
+        None,
+    )
+    assert parse_tempo_key("kick_120bpm_Amin.wav", loop=False, pitched=False) == (
+        120.0,
+        "Amin",
+    )
+
+
+def test_classification_fills_bpm_and_key():
+    samples = SampleTable()
+    loop = samples.append("/splice/packs/pack/loops", "PACK_120_Cmin_synth_loop.wav")
+    kick = samples.append("/splice/packs/pack/one_shots", "PACK_kick_120_A.wav")
+    classify_table(samples, "/splice", "/dest")
+
+    assert (loop.bpm, loop.key) == (120, "Cmin")
+    assert (kick.bpm, kick.key) == (None, None)
+
+
+def test_estimate_key():
+    # A C minor triad.
+    chroma = [1.0, 0, 0, 1.0, 0, 0, 0, 1.0, 0, 0, 0, 0]
+    assert estimate_key(chroma) == "Cmin"
+
+
+def fake_analysis(args):
+    path, loop, pitched = args
+    return (95.0 if loop else None), "Amin"
+
+
+def test_analysis_runs_once_per_content(tmp_path):
+    samples = SampleTable()
+    for dirname in ("pack_a", "pack_b"):
+        sample = samples.append(f"/splice/{dirname}/loops", "texture.wav")
+        sample.sampletype = "Melodic Loop"
+    named = samples.append("/splice/pack_a/loops", "texture_120_Cmin.wav")
+    named.bpm, named.key = 120, "Cmin"
+    digests = [b"same", b"same", b"other"]
+
+    with SampleCatalog(tmp_path / "catalog.sqlite") as catalog:
+        analyzer = TempoKeyAnalyzer(
+            workers=1, cache=TempoKeyCache(catalog.db), analyze=fake_analysis
+        )
+        assert analyzer.analyze_samples(samples, digests) == 2
+        assert (analyzer.hits, analyzer.misses) == (0, 1)
+        assert (samples[1].bpm, samples[1].key) == (95, "Amin")
+        assert (named.bpm, named.key) == (120, "Cmin")
+
+        samples[0].bpm = samples[1].bpm = None
+        samples[0].key = samples[1].key = None
+        again = TempoKeyAnalyzer(cache=TempoKeyCache(catalog.db), analyze=None)
+        assert again.analyze_samples(samples, digests) == 2
+        assert (again.hits, again.misses) == (1, 0)
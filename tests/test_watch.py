@@ -0,0 +1,108 @@
+import pytest
+
+import os
+
+from splice_cooker.catalog import SampleCatalog
+from splice_cooker.watch import (
+    InotifyBackend,
+    LibraryWatcher,
+    PollingBackend,
+    sync_changes,
+)
+
+
+def inotify_backend(root):
+    try:
+        return InotifyBackend(str(root))
+    except OSError:
+        pytest.skip("inotify not available")
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def make_backend(request):
+    if request.param == "inotify":
+        return inotify_backend
+    return lambda root: PollingBackend(str(root), interval=0.1)
+
+
+def test_new_pack_is_reported_once(tmp_path, make_backend):
+    root = tmp_path / "splice"
+    (root / "old_pack").mkdir(parents=True)
+    (root / "old_pack" / "old.wav").write_bytes(b"RIFF")
+    batches = []
+    watcher = LibraryWatcher(
+        root, lambda c, r: batches.append((sorted(c), r)), backend=make_backend(root)
+    )
+
+    pack = root / "new_pack" / "one_shots"
+    pack.mkdir(parents=True)
+    for name in ["kick_01.wav", "snare_01.wav", "kick_01.wav.asd"]:
+        (pack / name).write_bytes(b"RIFF")
+    os.remove(root / "old_pack" / "old.wav")
+
+    while not batches:
+        assert watcher.poll(3.0)
+    watcher.close()
+
+    changed, removed = batches[0]
+    assert changed == [str(pack / "kick_01.wav"), str(pack / "snare_01.wav")]
+    assert removed == [str(root / "old_pack" / "old.wav")]
+
+
+def test_sync_changes_copies_new_files(tmp_path):
+    root = tmp_path / "splice"
+    pack = root / "packs" / "vendor" / "pack_a" / "one_shots"
+    pack.mkdir(parents=True)
+    (pack / "kick_01.wav").write_bytes(b"RIFF kick")
+
+    synced = sync_changes(str(root), str(tmp_path / "dest"))(
+        [str(pack / "kick_01.wav"), str(pack / "gone.wav")], []
+    )
+
+    assert len(synced) == 1
+    assert synced[0].status == "copied"
+    copied = tmp_path / "dest" / "One Shot" / "Kicks" / "kick_01.wav"
+    assert copied.read_bytes() == b"RIFF kick"
+
+
+def test_sync_changes_deletes_copies_of_removed_files(tmp_path):
+    root = tmp_path / "splice"
+    pack = root / "packs" / "vendor" / "pack_a" / "one_shots"
+    pack.mkdir(parents=True)
+    for name in ["kick_01.wav", "kick_02.wav"]:
+        (pack / name).write_bytes(b"RIFF " + name.encode())
+    dest = tmp_path / "dest" / "One Shot" / "Kicks"
+
+    with SampleCatalog(tmp_path / "catalog.sqlite") as catalog:
+        sync = sync_changes(
+            str(root), str(tmp_path / "dest"), catalog=catalog, delete_copies=True
+        )
+        sync([str(pack / "kick_01.wav"), str(pack / "kick_02.wav")], [])
+        assert len(catalog) == 2
+        # Not our copy any more: it is kept.
+        os.utime(dest / "kick_02.wav", ns=(0, 0))
+
+        for name in ["kick_01.wav", "kick_02.wav"]:
+            os.remove(pack / name)
+        sync([], [str(pack / "kick_01.wav"), str(pack / "kick_02.wav")])
+        assert len(catalog) == 0
+
+    assert not (dest / "kick_01.wav").exists()
+    assert (dest / "kick_02.wav").exists()
+
+
+def test_sync_changes_keeps_copies_by_default(tmp_path):
+    root = tmp_path / "splice"
+    pack = root / "packs" / "vendor" / "pack_a" / "one_shots"
+    pack.mkdir(parents=True)
+    (pack / "kick_01.wav").write_bytes(b"RIFF kick")
+    copy = tmp_path / "dest" / "One Shot" / "Kicks" / "kick_01.wav"
+
+    with SampleCatalog(tmp_path / "catalog.sqlite") as catalog:
+        sync = sync_changes(str(root), str(tmp_path / "dest"), catalog=catalog)
+        sync([str(pack / "kick_01.wav")], [])
+        os.remove(pack / "kick_01.wav")
+        sync([], [str(pack / "kick_01.wav")])
+        assert len(catalog) == 0
+
+    assert copy.read_bytes() == b"RIFF kick"